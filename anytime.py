@@ -0,0 +1,119 @@
+import heapq
+import time
+from math import inf
+from engine import SearchResult, moves, trace_back
+import heuristics
+from metrics import Metrics
+
+# Anytime Repairing A* (Likhachev, Gordon and Thrun) over the padded flat
+# grid. The first pass is weighted A*, ordered by g + weight * h, which finds
+# a path quickly that costs at most weight times the optimum. The weight is
+# then lowered by step and the search carries on from where it stopped: only
+# the open nodes and the nodes whose g improved after they were expanded are
+# looked at again, so each pass costs far less than a fresh search.
+#
+# Every pass ends with a path and its bound, min(weight, cost / the smallest
+# g + h still to be expanded); the path costs at most bound times the
+# optimum. Passes go on until the bound reaches 1 or the budget - seconds of
+# search, expansions or both - runs out, and the best path so far is
+# returned. h is heuristics' estimate toward the goal, the Manhattan distance
+# (octile with diagonals) times the smallest cost on the grid, so it never
+# overestimates and the bound holds.
+
+WEIGHT = 3.0
+WEIGHT_STEP = 0.5
+# Expansions between clock reads when a time limit is set.
+CHECK_EVERY = 256
+
+def search(grid, start_point, goal_node, diagonals=False, weight=WEIGHT, step=WEIGHT_STEP, time_limit=None, max_expanded=None, observer=None):
+    assert weight >= 1, "weight must be at least 1"
+    assert step > 0, "step must be positive"
+    start = time.perf_counter()
+    stop_at = start + time_limit if time_limit is not None else inf
+    max_expanded = inf if max_expanded is None else max_expanded
+    width, cost = grid.flat_costs()
+    steps = moves(width, diagonals)
+    source = grid.node_id(start_point)
+    target = grid.node_id(goal_node)
+    heuristic = heuristics.toward(grid, goal_node, diagonals=diagonals)
+
+    distances = {source: 0}
+    parents = {}
+    open_set = [(weight * heuristic(source), 0, source)]
+    closed = set()
+    inconsistent = set()
+    expanded = generated = pushes = stale_pops = 0
+    peak_open = 1
+    path, distance, bound = [], inf, inf
+    solutions = []
+    solved_weight = weight
+    out_of_budget = False
+
+    while True:
+        # One pass of weighted A*, until no open node could give a cheaper
+        # path to the goal than the one it has.
+        while open_set and distances.get(target, inf) > open_set[0][0]:
+            if expanded >= max_expanded or (expanded % CHECK_EVERY == 0 and time.perf_counter() >= stop_at):
+                out_of_budget = True
+                break
+            priority, negative_distance, current_node = heapq.heappop(open_set)
+            if current_node in closed or -negative_distance != distances[current_node]:
+                stale_pops += 1
+                continue
+            closed.add(current_node)
+            expanded += 1
+            if observer and current_node != source:
+                observer('visit', grid.node_at(current_node))
+            current_distance = distances[current_node]
+            for move, length in steps:
+                neighbour = current_node + move
+                modifier = cost[neighbour]
+                if modifier == inf:
+                    continue
+                generated += 1
+                new_distance = current_distance + length * modifier
+                if new_distance < distances.get(neighbour, inf):
+                    distances[neighbour] = new_distance
+                    parents[neighbour] = current_node
+                    if neighbour in closed:
+                        inconsistent.add(neighbour)
+                    else:
+                        pushes += 1
+                        heapq.heappush(open_set, (new_distance + weight * heuristic(neighbour), -new_distance, neighbour))
+            if len(open_set) > peak_open:
+                peak_open = len(open_set)
+
+        if out_of_budget or target not in distances:
+            break
+        if distances[target] < distance:
+            path = trace_back(target, source, parents)
+            distance = distances[target]
+        waiting = {node for priority, negative_distance, node in open_set if node not in closed and -negative_distance == distances[node]}
+        waiting |= inconsistent
+        lowest = min([distances[node] + heuristic(node) for node in waiting], default=inf)
+        bound = 1.0 if distance == 0 or lowest == inf else max(min(weight, distance / lowest), 1.0)
+        solutions.append((time.perf_counter() - start, distance, bound))
+        solved_weight = weight
+        if bound <= 1:
+            break
+
+        # Lower the weight, put the inconsistent nodes back with the open
+        # ones, and key them all again for the next pass.
+        weight = max(weight - step, 1.0)
+        open_set = [(distances[node] + weight * heuristic(node), -distances[node], node) for node in waiting]
+        heapq.heapify(open_set)
+        closed = set()
+        inconsistent = set()
+
+    stats = Metrics(expanded=expanded, generated=generated, pushes=pushes + 1, stale_pops=stale_pops, peak_open=peak_open, queue='heap',
+                    weight=solved_weight, bound=bound, passes=len(solutions), solutions=solutions, out_of_budget=out_of_budget,
+                    first_solution_time=solutions[0][0] if solutions else None)
+    finished = stats.end_search(start)
+    if not path:
+        return SearchResult(False, [], inf, stats)
+    path = [grid.node_at(node_id) for node_id in path]
+    stats.end_path(finished)
+    if observer:
+        for node in path:
+            observer('path', node)
+    return SearchResult(True, path, distance, stats)
@@ -0,0 +1,241 @@
+import argparse
+import json
+import random
+import sys
+import time
+from math import inf
+from multiprocessing import Pool
+import numpy as np
+import components
+import landmarks
+import maps
+import solvers
+import tiles
+from metrics import COUNTERS, JsonLines, measure
+
+# Headless batch runner: loads a map and a list of queries, runs them through
+# one or more algorithms and reports latency percentiles, nodes expanded,
+# throughput and, when the scenario gives one under the same moves, path
+# length correctness. MovingAI .scen lengths are for a move model the solvers
+# do not have (see checkable), so those checks are skipped.
+#
+#   python batch.py arena.map -s arena.map.scen -a astar -a jps --diagonals
+#   python batch.py maze.txt --random 5000 --workers 8
+#   python batch.py arena.map --random 200 -a ara --time-limit 0.01
+#   python batch.py big.grid --random 1000 --workers 8
+#
+# Binary .grid maps are memory-mapped, so the workers share one copy of the
+# cells instead of each reading its own. With --tiled they are read a tile at
+# a time instead, for maps too big to hold:
+#
+#   python batch.py huge.grid --tiled --random 100 --tile-cache 512
+
+def random_queries(grid, count, seed=0):
+    rng = random.Random(seed)
+    if isinstance(grid, tiles.TiledGrid):
+        return _random_tiled_queries(grid, count, rng)
+    open_cells = np.argwhere(grid.cost != inf)
+    queries = []
+    for query in range(count):
+        start = tuple(int(i) for i in open_cells[rng.randrange(len(open_cells))])
+        goal = tuple(int(i) for i in open_cells[rng.randrange(len(open_cells))])
+        queries.append((start, goal, None))
+    return queries
+
+def _random_tiled_queries(grid, count, rng):
+    # Open cells drawn by rejection, since a tiled map cannot be scanned.
+    def open_cell():
+        for attempt in range(10000):
+            node = (rng.randrange(grid.rows), rng.randrange(grid.columns))
+            if grid.is_passable(node):
+                return node
+        assert False, "could not find an open cell"
+    return [(open_cell(), open_cell(), None) for query in range(count)]
+
+def load_grid(path, tiled=False, tile_size=tiles.TILE_SIZE, tile_cache=tiles.MAX_TILES):
+    if tiled:
+        return tiles.TiledGrid(path, tile_size, tile_cache)
+    return maps.load(path)
+
+def run_queries(grid, algorithm, queries, diagonals=False, memory=False, budget=None):
+    # budget holds time_limit and max_expanded for the solvers in
+    # solvers.BUDGETED and is ignored by the rest.
+    solve = tiles.solve if isinstance(grid, tiles.TiledGrid) else solvers.solve
+    options = budget if budget and algorithm in solvers.BUDGETED else {}
+    if solve is solvers.solve:
+        # Labelled once up front, so no query's latency includes it. Queries
+        # between components then skip the search. Landmark tables likewise.
+        components.index(grid, diagonals).build()
+        if algorithm == 'alt':
+            landmarks.index(grid, diagonals).build()
+    records = []
+    for start, goal, optimal in queries:
+        began = time.perf_counter()
+        result, stats = measure(solve, grid, algorithm, start, goal, diagonals=diagonals, memory=memory, **options)
+        latency = time.perf_counter() - began
+        records.append((latency, stats, result.distance, optimal))
+    return records
+
+_worker_grid = None
+
+def _start_worker(map_path, tiling):
+    global _worker_grid
+    _worker_grid = load_grid(map_path, *tiling)
+
+def _run_chunk(job):
+    algorithm, queries, diagonals, memory, budget = job
+    return run_queries(_worker_grid, algorithm, queries, diagonals, memory, budget)
+
+def run_parallel(map_path, algorithm, queries, diagonals=False, workers=2, memory=False, tiling=(False,), budget=None):
+    # tiling is load_grid's (tiled, tile_size, tile_cache); each worker has
+    # its own tile cache.
+    chunk = max(1, len(queries) // (workers * 4))
+    jobs = [(algorithm, queries[i:i + chunk], diagonals, memory, budget) for i in range(0, len(queries), chunk)]
+    with Pool(workers, initializer=_start_worker, initargs=(map_path, tiling)) as pool:
+        return [record for records in pool.map(_run_chunk, jobs) for record in records]
+
+def checkable(scenario_path):
+    # MovingAI .scen optimal lengths assume 8-connected moves with sqrt 2
+    # diagonals that never cut a corner. The solvers here move 4-connected or
+    # cut corners diagonally, so neither setting matches and those lengths
+    # are logged but the checks are skipped.
+    return not (scenario_path and scenario_path.endswith('.scen'))
+
+def summarise(algorithm, records, wall_time, tolerance=1e-3, check=True):
+    latencies = np.array([record[0] for record in records]) * 1000
+    correct = wrong = unchecked = unreachable = skipped = 0
+    worst = 0
+    for latency, stats, distance, optimal in records:
+        if distance == inf:
+            unreachable += 1
+        if stats.get('mode') == 'components':
+            skipped += 1
+        if optimal is None or not check:
+            unchecked += 1
+        elif abs(distance - optimal) <= tolerance:
+            correct += 1
+        else:
+            wrong += 1
+            worst = max(worst, abs(distance - optimal))
+    summary = {
+        'algorithm': algorithm,
+        'queries': len(records),
+        'queries_per_second': len(records) / wall_time if wall_time else inf,
+        'latency_ms': {name: float(np.percentile(latencies, q)) for name, q in (('p50', 50), ('p90', 90), ('p99', 99), ('max', 100))},
+        'mean_expanded': float(np.mean([record[1]['expanded'] for record in records])),
+        'mean': {name: float(np.mean([record[1][name] for record in records])) for name in COUNTERS},
+        'search_time': float(sum(record[1]['search_time'] for record in records)),
+        'path_time': float(sum(record[1]['path_time'] for record in records)),
+        'unreachable': unreachable,
+        'skipped': skipped,
+        'correct': correct,
+        'wrong': wrong,
+        'unchecked': unchecked,
+        'checked': check,
+        'worst_error': worst,
+    }
+    # Queries the component index answered never reach the anytime search,
+    # so their stats have no bound.
+    anytime = [record[1] for record in records if 'bound' in record[1]]
+    if anytime:
+        bounds = [stats['bound'] for stats in anytime if stats['bound'] != inf]
+        summary['anytime'] = {
+            'out_of_budget': sum(1 for stats in anytime if stats['out_of_budget']),
+            'mean_bound': float(np.mean(bounds)) if bounds else inf,
+            'worst_bound': max(bounds, default=inf),
+        }
+    if records and 'tile_hits' in records[0][1]:
+        hits = sum(record[1]['tile_hits'] for record in records)
+        misses = sum(record[1]['tile_misses'] for record in records)
+        summary['tiles'] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'evictions': sum(record[1]['tile_evictions'] for record in records),
+            'peak_tile_bytes': max(record[1]['peak_tile_bytes'] for record in records),
+            'peak_rss': max(record[1]['peak_rss'] for record in records),
+        }
+    return summary
+
+def print_summary(summary):
+    latency = summary['latency_ms']
+    print(f"{summary['algorithm']:>10}: {summary['queries']} queries, {summary['queries_per_second']:.1f} q/s, "
+          f"latency ms p50 {latency['p50']:.3f} p90 {latency['p90']:.3f} p99 {latency['p99']:.3f} max {latency['max']:.3f}, "
+          f"mean expanded {summary['mean_expanded']:.1f}")
+    mean = summary['mean']
+    print(f"{'':>10}  mean generated {mean['generated']:.1f} pushes {mean['pushes']:.1f} stale pops {mean['stale_pops']:.1f} peak open {mean['peak_open']:.1f}, "
+          f"search {summary['search_time']:.3f} s path {summary['path_time']:.3f} s")
+    if summary['correct'] or summary['wrong']:
+        print(f"{'':>10}  optimal length: {summary['correct']} correct, {summary['wrong']} wrong (worst error {summary['worst_error']:.4f})")
+    if summary['unreachable']:
+        print(f"{'':>10}  {summary['unreachable']} queries had no path, {summary['skipped']} of them answered by the component index")
+    if 'anytime' in summary:
+        anytime = summary['anytime']
+        print(f"{'':>10}  {anytime['out_of_budget']} queries ran out of budget, suboptimality bound mean {anytime['mean_bound']:.3f} worst {anytime['worst_bound']:.3f}")
+    if 'tiles' in summary:
+        tile = summary['tiles']
+        print(f"{'':>10}  tiles: {tile['hits']} hits, {tile['misses']} misses ({tile['hit_rate']:.2%} hit rate), {tile['evictions']} evictions, "
+              f"peak cache {tile['peak_tile_bytes'] / 2**20:.1f} MiB, peak resident {tile['peak_rss'] / 2**20:.1f} MiB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run path queries over a map without the GUI.")
+    parser.add_argument('map', help="MovingAI .map file or text grid")
+    parser.add_argument('-s', '--scenarios', help="MovingAI .scen file or text list of 'row column row column [optimal]'")
+    parser.add_argument('-r', '--random', type=int, default=0, help="number of random queries when no scenario file is given")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-a', '--algorithm', action='append', choices=sorted(solvers.ALGORITHMS), help="may be repeated; default astar")
+    parser.add_argument('-d', '--diagonals', action='store_true')
+    parser.add_argument('-w', '--workers', type=int, default=1, help="size of the process pool")
+    parser.add_argument('-l', '--limit', type=int, default=0, help="only run the first N queries")
+    parser.add_argument('--tolerance', type=float, default=1e-3)
+    parser.add_argument('--time-limit', type=float, help="seconds per query for anytime solvers (ara)")
+    parser.add_argument('--max-expanded', type=int, help="expansions per query for anytime solvers (ara)")
+    parser.add_argument('--json', action='store_true', help="print one JSON summary per algorithm")
+    parser.add_argument('-m', '--metrics', help="append every query's metrics to this file as JSON lines")
+    parser.add_argument('--memory', action='store_true', help="trace peak memory per query (slow)")
+    parser.add_argument('-t', '--tiled', action='store_true', help="read a binary .grid map a tile at a time (dijkstra and astar only)")
+    parser.add_argument('--tile-size', type=int, default=tiles.TILE_SIZE, help="tile side in cells, a power of two")
+    parser.add_argument('--tile-cache', type=int, default=tiles.MAX_TILES, help="most tiles held at once")
+    args = parser.parse_args(argv)
+
+    tiling = (args.tiled, args.tile_size, args.tile_cache)
+    budget = {'time_limit': args.time_limit, 'max_expanded': args.max_expanded}
+    if args.tiled:
+        assert maps.is_binary(args.map), "--tiled needs a binary .grid map; convert one with maps.py"
+        assert set(args.algorithm or ['astar']) <= set(tiles.ALGORITHMS), f"tiled maps support: {list(tiles.ALGORITHMS)}"
+    grid = load_grid(args.map, *tiling)
+    if args.scenarios:
+        queries = maps.load_scenarios(args.scenarios)
+    else:
+        queries = random_queries(grid, args.random or 1000, args.seed)
+    if args.limit:
+        queries = queries[:args.limit]
+    check = checkable(args.scenarios)
+    if not check and not args.json:
+        print(f"skipping optimal length checks for {args.scenarios}: MovingAI scenarios assume diagonal moves that do not cut corners, "
+              "which no solver here makes")
+
+    summaries = []
+    for algorithm in args.algorithm or ['astar']:
+        began = time.perf_counter()
+        if args.workers > 1:
+            records = run_parallel(args.map, algorithm, queries, args.diagonals, args.workers, args.memory, tiling, budget)
+        else:
+            records = run_queries(grid, algorithm, queries, args.diagonals, args.memory, budget)
+        summary = summarise(algorithm, records, time.perf_counter() - began, args.tolerance, check)
+        if args.metrics:
+            log = JsonLines(args.metrics)
+            for (start, goal, optimal), (latency, stats, distance, expected) in zip(queries, records):
+                assert expected == optimal, "records are out of step with the queries"
+                correct = abs(distance - optimal) <= args.tolerance if check and optimal is not None else None
+                log.write(stats, map=args.map, algorithm=algorithm, start=start, goal=goal, distance=distance, optimal=optimal, correct=correct, latency=latency)
+            log.close()
+        summaries.append(summary)
+        if args.json:
+            print(json.dumps(summary))
+        else:
+            print_summary(summary)
+    return summaries
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,81 @@
+import sys
+import time
+from math import inf
+import numpy as np
+from grid import Grid, BLANK, MUD, WALL
+from engine import moves
+from priority_queue import AStarQueue, IndexedHeap
+
+# Runs the same full Dijkstra sweep over a random mud/wall grid with the old
+# lazy-deletion AStarQueue and with IndexedHeap, and prints time, pops, stale
+# pops and peak heap size for each. Usage: python bench_priority_queue.py [rows]
+
+def make_grid(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    grid = Grid(rows)
+    noise = rng.random(grid.shape)
+    grid.cells[noise < 0.2] = WALL
+    grid.cells[(noise >= 0.2) & (noise < 0.5)] = MUD
+    grid.cells[0, 0] = BLANK
+    grid.refresh()
+    return grid
+
+def lazy_sweep(width, cost, source, diagonals):
+    queue = AStarQueue()
+    queue.push(0, 0, source)
+    distances = {source: 0}
+    done = set()
+    pops = stale = peak = 0
+    while queue.show():
+        peak = max(peak, len(queue.show()))
+        priority, distance, node = queue.pop()
+        pops += 1
+        if node in done:
+            stale += 1
+            continue
+        done.add(node)
+        for step, length in moves(width, diagonals):
+            neighbour = node + step
+            if cost[neighbour] == inf or neighbour in done:
+                continue
+            new_distance = distance + length * cost[neighbour]
+            if new_distance < distances.get(neighbour, inf):
+                distances[neighbour] = new_distance
+                queue.push(new_distance, new_distance, neighbour)
+    return pops, stale, peak
+
+def indexed_sweep(width, cost, source, diagonals):
+    queue = IndexedHeap(len(cost))
+    queue.push(0, source)
+    distances = {source: 0}
+    done = set()
+    pops = peak = 0
+    while len(queue):
+        peak = max(peak, len(queue))
+        distance, node = queue.pop()
+        pops += 1
+        done.add(node)
+        for step, length in moves(width, diagonals):
+            neighbour = node + step
+            if cost[neighbour] == inf or neighbour in done:
+                continue
+            new_distance = distance + length * cost[neighbour]
+            if new_distance < distances.get(neighbour, inf):
+                distances[neighbour] = new_distance
+                queue.push(new_distance, neighbour)
+    return pops, 0, peak
+
+def main(rows=300):
+    grid = make_grid(rows)
+    width, cost = grid.flat_costs()
+    source = grid.node_id((0, 0))
+    for diagonals in (False, True):
+        print(f"{rows}x{rows}, diagonals={diagonals}")
+        for name, sweep in (('lazy AStarQueue', lazy_sweep), ('IndexedHeap', indexed_sweep)):
+            start = time.perf_counter()
+            pops, stale, peak = sweep(width, cost, source, diagonals)
+            elapsed = time.perf_counter() - start
+            print(f"  {name:16} {elapsed:8.4f}s  pops={pops:8d}  stale={stale:8d}  peak heap={peak:7d}")
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,95 @@
+import time
+from math import inf
+from engine import SearchResult, moves, trace_back
+import heuristics
+from priority_queue import IndexedHeap
+from metrics import Metrics
+
+# Bidirectional Dijkstra / A* over the padded flat grid. Moving u -> v costs
+# the step length times the cost of v, so the backward search leaving v pays
+# v's cost.
+#
+# A* uses the average potential p(v) = (h_goal(v) - h_start(v)) / 2 on both
+# sides (Ikeda et al.), which keeps both searches consistent on the same
+# reduced graph. Forward keys are g + p and backward keys g - p, and the search
+# stops once the two smallest keys together reach the best meeting cost found.
+# Plain Dijkstra is the same with p = 0. h is heuristics' default for the
+# moves, worked out toward the goal and the start for each node pushed.
+
+def search(grid, start_point, goal_node, diagonals=False, astar=False, observer=None):
+    start = time.perf_counter()
+    width, cost = grid.flat_costs()
+    steps = moves(width, diagonals)
+    source = grid.node_id(start_point)
+    target = grid.node_id(goal_node)
+
+    if astar:
+        to_goal = heuristics.toward(grid, goal_node, diagonals=diagonals)
+        to_start = heuristics.toward(grid, start_point, diagonals=diagonals)
+        potential = lambda node: (to_goal(node) - to_start(node)) / 2
+    else:
+        potential = lambda node: 0
+
+    distances = ({source: 0}, {target: 0})
+    parents = ({}, {})
+    closed = (set(), set())
+    queues = (IndexedHeap(len(cost)), IndexedHeap(len(cost)))
+    signs = (1, -1)
+    queues[0].push(potential(source), source)
+    queues[1].push(-potential(target), target)
+
+    best = inf if source != target else 0
+    meeting = source
+    generated = 0
+    pushes = peak_open = 2
+
+    while len(queues[0]) and len(queues[1]):
+        if queues[0].peek()[0] + queues[1].peek()[0] >= best:
+            break
+        side = 0 if queues[0].peek()[0] <= queues[1].peek()[0] else 1
+        other = 1 - side
+        priority, current_node = queues[side].pop()
+        closed[side].add(current_node)
+        current_distance = distances[side][current_node]
+        if observer and current_node != source and current_node != target:
+            observer('visit', grid.node_at(current_node))
+
+        leaving = cost[current_node]
+        for step, length in steps:
+            neighbour = current_node + step
+            if cost[neighbour] == inf or neighbour in closed[side]:
+                continue
+            generated += 1
+            distance = current_distance + length * (cost[neighbour] if side == 0 else leaving)
+            if distance < distances[side].get(neighbour, inf):
+                pushes += 1
+                distances[side][neighbour] = distance
+                parents[side][neighbour] = current_node
+                queues[side].push(distance + signs[side] * potential(neighbour), neighbour)
+                if neighbour in distances[other] and distance + distances[other][neighbour] < best:
+                    best = distance + distances[other][neighbour]
+                    meeting = neighbour
+        if len(queues[0]) + len(queues[1]) > peak_open:
+            peak_open = len(queues[0]) + len(queues[1])
+
+    stats = Metrics(
+        expanded=len(closed[0]) + len(closed[1]),
+        generated=generated,
+        pushes=pushes,
+        peak_open=peak_open,
+        expanded_forward=len(closed[0]),
+        expanded_backward=len(closed[1]),
+    )
+    finished = stats.end_search(start)
+    if best == inf:
+        return SearchResult(False, [], inf, stats)
+
+    forward = trace_back(meeting, source, parents[0])
+    backward = trace_back(meeting, target, parents[1])
+    backward.reverse()
+    path = [grid.node_at(node_id) for node_id in forward + backward[1:]]
+    stats.end_path(finished)
+    if observer:
+        for node in path:
+            observer('path', node)
+    return SearchResult(True, path, best, stats)
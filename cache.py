@@ -0,0 +1,180 @@
+import weakref
+from collections import OrderedDict
+import numpy as np
+from engine import SearchResult
+from metrics import Metrics
+import solvers
+
+# LRU cache of path queries keyed by (grid generation, algorithm, start, goal,
+# diagonals). Each entry remembers the cells its search read: every expanded
+# cell, the path and their neighbours. A single cell edit only evicts entries
+# that read that cell, since the search would replay identically on the rest.
+# A whole-grid rewrite (Grid.refresh) starts a new generation and drops every
+# entry for that grid. Solvers whose observer events do not cover the cells
+# they read (jump point search scans) depend on the whole grid, and so do
+# answers the component index gave without a search.
+
+TRACKED = {'dijkstra', 'astar', 'dfs', 'bfs', 'bidijkstra', 'biastar', 'ara'}
+ENTRY_OVERHEAD = 256
+
+STRAIGHT = np.array([(0, 0), (1, 0), (-1, 0), (0, 1), (0, -1)])
+ALL = np.array([(row, column) for row in (-1, 0, 1) for column in (-1, 0, 1)])
+
+class _Entry():
+    def __init__(self, result, dependencies, bounds):
+        self.path = np.array(result.path, dtype=np.int32).reshape(-1, 2)
+        self.found = result.found
+        self.distance = result.distance
+        self.stats = Metrics(result.stats)
+        self.dependencies = dependencies
+        self.bounds = bounds
+        self.nbytes = ENTRY_OVERHEAD + self.path.nbytes + (dependencies.nbytes if dependencies is not None else 0)
+
+    def depends_on(self, node):
+        if self.dependencies is None:
+            return True
+        top, left, bottom, right, columns = self.bounds
+        if not (top <= node[0] <= bottom and left <= node[1] <= right):
+            return False
+        flat = node[0] * columns + node[1]
+        index = np.searchsorted(self.dependencies, flat)
+        return index < self.dependencies.size and self.dependencies[index] == flat
+
+class _Recorder():
+    def __init__(self, observer):
+        self.observer = observer
+        self.nodes = []
+        self.layers = []
+
+    def __call__(self, event, node):
+        if event == 'layer':
+            self.layers.append(np.asarray(node))
+        elif event in ('visit', 'path'):
+            self.nodes.append(node)
+        if self.observer:
+            self.observer(event, node)
+
+class PathCache():
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.by_grid = {}
+        self.generations = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def stats(self):
+        return {
+            'entries': len(self.entries),
+            'bytes': self.nbytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+    def _watch(self, grid):
+        grid_id = id(grid)
+        if grid_id not in self.generations:
+            self.generations[grid_id] = 0
+            self.by_grid[grid_id] = set()
+            reference = weakref.ref(self)
+            def listener(node):
+                cache = reference()
+                if cache is not None:
+                    cache._grid_changed(grid_id, node)
+            grid.subscribe(listener)
+            weakref.finalize(grid, self._forget, grid_id)
+        return grid_id
+
+    def _forget(self, grid_id):
+        for key in list(self.by_grid.get(grid_id, ())):
+            self._drop(key)
+        self.by_grid.pop(grid_id, None)
+        self.generations.pop(grid_id, None)
+
+    def _grid_changed(self, grid_id, node):
+        if node is None:
+            self.generations[grid_id] += 1
+            for key in list(self.by_grid[grid_id]):
+                self._drop(key)
+                self.invalidations += 1
+            return
+        for key in list(self.by_grid[grid_id]):
+            if self.entries[key].depends_on(node):
+                self._drop(key)
+                self.invalidations += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key)
+        self.nbytes -= entry.nbytes
+        self.by_grid[key[0]].discard(key)
+
+    def _key(self, grid, algorithm, start_point, goal_node, diagonals):
+        grid_id = self._watch(grid)
+        return (grid_id, self.generations[grid_id], algorithm, tuple(start_point), tuple(goal_node), bool(diagonals))
+
+    def _dependencies(self, grid, algorithm, recorder, result, start_point, goal_node, diagonals):
+        if algorithm not in TRACKED or result.stats.get('mode') == 'components':
+            return None, None
+        nodes = [np.array([start_point, goal_node])]
+        if recorder.nodes:
+            nodes.append(np.array(recorder.nodes).reshape(-1, 2))
+        nodes += [layer.reshape(-1, 2) for layer in recorder.layers]
+        cells = np.concatenate(nodes)
+        offsets = ALL if diagonals else STRAIGHT
+        cells = (cells[:, None, :] + offsets).reshape(-1, 2)
+        rows, columns = grid.shape
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < rows) & (cells[:, 1] >= 0) & (cells[:, 1] < columns)
+        cells = cells[inside]
+        flat = np.unique(cells[:, 0].astype(np.int64) * columns + cells[:, 1])
+        bounds = (cells[:, 0].min(), cells[:, 1].min(), cells[:, 0].max(), cells[:, 1].max(), columns)
+        return flat, bounds
+
+    def lookup(self, grid, algorithm, start_point, goal_node, diagonals=False):
+        key = self._key(grid, algorithm, start_point, goal_node, diagonals)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        stats = Metrics(entry.stats)
+        stats['cached'] = True
+        return SearchResult(entry.found, [tuple(int(i) for i in node) for node in entry.path], entry.distance, stats)
+
+    def solve(self, grid, algorithm, start_point, goal_node, diagonals=False, observer=None):
+        result = self.lookup(grid, algorithm, start_point, goal_node, diagonals)
+        if result is not None:
+            if observer:
+                for node in result.path:
+                    observer('path', node)
+            return result
+
+        recorder = _Recorder(observer)
+        result = solvers.solve(grid, algorithm, start_point, goal_node, diagonals=diagonals, observer=recorder)
+        dependencies, bounds = self._dependencies(grid, algorithm, recorder, result, start_point, goal_node, diagonals)
+        key = self._key(grid, algorithm, start_point, goal_node, diagonals)
+        if key in self.entries:
+            self._drop(key)
+        entry = _Entry(result, dependencies, bounds)
+        self.entries[key] = entry
+        self.by_grid[key[0]].add(key)
+        self.nbytes += entry.nbytes
+        self._evict()
+        result.stats['cached'] = False
+        return result
+
+    def _evict(self):
+        while self.entries and (len(self.entries) > self.max_entries or self.nbytes > self.max_bytes):
+            key = next(iter(self.entries))
+            self._drop(key)
+            self.evictions += 1
+
+    def clear(self):
+        for key in list(self.entries):
+            self._drop(key)
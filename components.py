@@ -0,0 +1,204 @@
+from collections import deque
+import numpy as np
+
+# Connected components of the passable cells, so a query whose endpoints lie
+# in different components is answered "no path" without searching at all.
+# Without it a walled off goal is the worst case for every solver: the whole
+# reachable side is explored before it gives up.
+#
+# Labels are found a whole grid at a time over the padded flat ids. Every
+# run of open cells starts as its own root; each round hooks the larger root
+# of every edge whose ends are still apart onto the smaller one, then pointer
+# jumping flattens the trees again. Edges already inside one tree are
+# dropped, so the rounds get cheaper as they go.
+#
+# Labels are kept per grid and diagonals setting in grid.indexes and follow
+# edits through a listener. Opening a cell joins the components around it
+# with a union over their labels. Closing a cell can only split its
+# component. That is left until a query needs to tell the component's cells
+# apart, so a stroke of wall is checked once rather than cell by cell. The
+# check floods out from the open cells next to every cell closed since, all
+# floods in step, and the floods that meet are joined. A flood that runs dry
+# while another is still going is a piece cut off from the rest and gets a
+# label of its own, so the work is about the size of the smaller pieces. If
+# LOCAL_LIMIT cells are flooded before it is settled, the whole grid is
+# labelled again instead. Different labels always mean no path; equal labels
+# mean a path once the component has no closed cells left to check.
+
+LOCAL_LIMIT = 2**15
+
+def label_cells(open_cells, width, diagonals=False):
+    # open_cells is a flat bool array over the padded grid. Returns, for each
+    # id, the smallest id in its component, or -1 for closed cells. Each run
+    # of open cells along a row is one node, so only the edges between rows
+    # are hooked.
+    heads = open_cells.copy()
+    heads[1:] &= ~open_cells[:-1]
+    runs = np.cumsum(heads) - 1
+    heads = np.flatnonzero(heads)
+    ids = np.flatnonzero(open_cells)
+    shifts = (width - 1, width, width + 1) if diagonals else (width,)
+    firsts = [ids[open_cells[ids + shift]] for shift in shifts]
+    first = np.concatenate([runs[ends] for ends in firsts])
+    second = np.concatenate([runs[ends + shift] for ends, shift in zip(firsts, shifts)])
+    # Two runs that touch along several cells give neighbouring duplicates.
+    distinct = np.ones(first.size, dtype=bool)
+    distinct[1:] = (first[1:] != first[:-1]) | (second[1:] != second[:-1])
+    first, second = first[distinct], second[distinct]
+    roots = np.arange(heads.size)
+    while first.size:
+        a, b = roots[first], roots[second]
+        apart = a != b
+        first, second, a, b = first[apart], second[apart], a[apart], b[apart]
+        if not first.size:
+            break
+        np.minimum.at(roots, np.maximum(a, b), np.minimum(a, b))
+        jumping = np.flatnonzero(roots[roots] != roots)
+        while jumping.size:
+            roots[jumping] = roots[roots[jumping]]
+            jumping = jumping[roots[roots[jumping]] != roots[jumping]]
+    labels = np.full(open_cells.size, -1, dtype=np.int64)
+    labels[ids] = heads[roots[runs[ids]]]
+    return labels
+
+class Components():
+    def __init__(self, grid, diagonals=False):
+        self.grid = grid
+        self.diagonals = diagonals
+        self.width = grid.columns + 2
+        self.steps = (1, -1, self.width, -self.width)
+        if diagonals:
+            self.steps += (self.width + 1, self.width - 1, -self.width + 1, -self.width - 1)
+        self.labels = None
+        self.merged = {}
+        self.closed = {}
+        self.next_label = 0
+        self.builds = 0
+        self.relabels = 0
+        grid.subscribe(self.cell_changed)
+
+    def close(self):
+        self.grid.unsubscribe(self.cell_changed)
+
+    def build(self):
+        # Labels the whole grid, unless the labels are already current.
+        if self.labels is not None:
+            return
+        open_cells = np.pad(self.grid.cost != np.inf, 1, constant_values=False).ravel()
+        self.labels = label_cells(open_cells, self.width, self.diagonals)
+        self.merged = {}
+        self.closed = {}
+        # Labels made after this never collide with a cell id.
+        self.next_label = open_cells.size
+        self.builds += 1
+
+    def _find(self, label):
+        merged = self.merged
+        while label in merged:
+            parent = merged[label]
+            if parent in merged:
+                merged[label] = merged[parent]
+            label = parent
+        return label
+
+    def cell_changed(self, node):
+        if node is None:
+            self.labels = None
+            return
+        if self.labels is None:
+            return
+        node_id = self.grid.node_id(node)
+        now_open = self.grid.cost[node] != np.inf
+        label = self.labels[node_id]
+        if now_open and label < 0:
+            around = {self._find(int(self.labels[node_id + step])) for step in self.steps if self.labels[node_id + step] >= 0}
+            if not around:
+                self.labels[node_id] = self.next_label
+                self.next_label += 1
+                return
+            keep = around.pop()
+            for other in around:
+                self.merged[other] = keep
+                if other in self.closed:
+                    self.closed.setdefault(keep, set()).update(self.closed.pop(other))
+            self.labels[node_id] = keep
+        elif not now_open and label >= 0:
+            self.labels[node_id] = -1
+            self.closed.setdefault(self._find(int(label)), set()).add(node_id)
+
+    def _separate(self, root):
+        # Settles root's component after cells in it were closed, giving each
+        # piece cut off from the rest a label of its own. Returns False if the
+        # floods ran past LOCAL_LIMIT cells first.
+        labels, steps = self.labels, self.steps
+        seeds = {cell + step for cell in self.closed.pop(root) for step in steps if labels[cell + step] >= 0}
+        owner = {seed: seed for seed in seeds}
+        fronts = {seed: deque([seed]) for seed in seeds}
+        joined = {}
+
+        def find(flood):
+            while flood in joined:
+                flood = joined[flood]
+            return flood
+
+        flooded = 0
+        while len(fronts) > 1:
+            for flood in list(fronts):
+                front = fronts.get(flood)
+                if front is None:
+                    continue
+                if not front:
+                    piece = [cell for cell, first in owner.items() if find(first) == flood]
+                    labels[piece] = self.next_label
+                    self.next_label += 1
+                    self.relabels += 1
+                    del fronts[flood]
+                    if len(fronts) == 1:
+                        break
+                    continue
+                node = front.popleft()
+                flooded += 1
+                for step in steps:
+                    neighbour = node + step
+                    if labels[neighbour] < 0:
+                        continue
+                    other = owner.get(neighbour)
+                    if other is None:
+                        owner[neighbour] = flood
+                        front.append(neighbour)
+                    else:
+                        other = find(other)
+                        if other != flood:
+                            joined[other] = flood
+                            front.extend(fronts.pop(other))
+            if flooded > LOCAL_LIMIT:
+                return False
+        return True
+
+    def component(self, node):
+        # Label of node's component, or -1 when node is closed. Cells of a
+        # component with closed cells still to check share its label until
+        # connected() settles it.
+        self.build()
+        label = int(self.labels[self.grid.node_id(node)])
+        return self._find(label) if label >= 0 else -1
+
+    def connected(self, a, b):
+        first, second = self.component(a), self.component(b)
+        if first < 0 or second < 0 or first != second:
+            return False
+        if first in self.closed:
+            if not self._separate(first):
+                self.labels = None
+            return self.component(a) == self.component(b)
+        return True
+
+def index(grid, diagonals=False):
+    indexes = grid.indexes.setdefault('components', {})
+    key = bool(diagonals)
+    if key not in indexes:
+        indexes[key] = Components(grid, diagonals)
+    return indexes[key]
+
+def connected(grid, a, b, diagonals=False):
+    return index(grid, diagonals).connected(a, b)
@@ -0,0 +1,515 @@
+import time
+import random
+from collections import deque
+from math import inf
+import numpy as np
+from grid import Grid, BLANK, START, END, WALL, MUD, DORMANT, PROTECTED
+from priority_queue import IndexedHeap, BucketQueue, TiedBucketQueue
+import heuristics
+from heuristics import DIAGONAL
+from metrics import Metrics
+
+# Solvers never touch the display. Anything that wants to watch a run passes an
+# observer, called as observer(event, node) with event one of:
+#   'visit'  - node expanded by a solver
+#   'path'   - node on the final path
+#   'carve'  - generator turned node into a passage
+#   'wall'   - generator turned node into a wall
+#   'terrain'- generator changed the terrain of node
+#   'layer'  - a whole breadth first layer expanded at once; node is an (n, 2)
+#              array of (row, column) pairs
+
+class SearchResult():
+    def __init__(self, found, path, distance, stats):
+        self.found = found
+        self.path = path
+        self.distance = distance
+        self.stats = stats
+
+    def __bool__(self):
+        return self.found
+
+    def __repr__(self):
+        return f"SearchResult(found={self.found}, distance={self.distance}, length={len(self.path)}, stats={self.stats})"
+
+def get_neighbours(node, max_width, diagonals=False):
+    if not diagonals:
+        neighbours = (
+            ((min(max_width,node[0]+1),node[1]),"+"),
+            ((max(0,node[0]-1),node[1]),"+"),
+            ((node[0],min(max_width,node[1]+1)),"+"),
+            ((node[0],max(0,node[1]-1)),"+")
+        )
+    else:
+        neighbours = (
+            ((min(max_width,node[0]+1),node[1]),"+"),
+            ((max(0,node[0]-1),node[1]),"+"),
+            ((node[0],min(max_width,node[1]+1)),"+"),
+            ((node[0],max(0,node[1]-1)),"+"),
+            ((min(max_width,node[0]+1),min(max_width,node[1]+1)),"x"),
+            ((min(max_width,node[0]+1),max(0,node[1]-1)),"x"),
+            ((max(0,node[0]-1),min(max_width,node[1]+1)),"x"),
+            ((max(0,node[0]-1),max(0,node[1]-1)),"x")
+        )
+
+    return (neighbour for neighbour in neighbours if neighbour[0] != node)
+
+
+def moves(width, diagonals=False):
+    straight = ((width, 1), (-width, 1), (1, 1), (-1, 1))
+    if not diagonals:
+        return straight
+    return straight + ((width+1, DIAGONAL), (width-1, DIAGONAL), (-width+1, DIAGONAL), (-width-1, DIAGONAL))
+
+def trace_back(goal_node, start_node, parents):
+    path = [goal_node]
+    current_node = goal_node
+    while current_node != start_node:
+        current_node = parents[current_node]
+        path.append(current_node)
+    path.reverse()
+    return path
+
+def _finish(grid, source, target, parents, distance, stats, start, observer):
+    finished = stats.end_search(start)
+    if distance == inf:
+        return SearchResult(False, [], inf, stats)
+    path = [grid.node_at(node_id) for node_id in trace_back(target, source, parents)]
+    stats.end_path(finished)
+    if observer:
+        for node in path:
+            observer('path', node)
+    return SearchResult(True, path, distance, stats)
+
+def use_buckets(grid, diagonals=False):
+    return not diagonals and grid.integer_cost_bound() is not None
+
+def dijkstra(grid, start_point=(0,0), goal_node=False, diagonals=False, astar=False, observer=None, buckets=None, heuristic=None):
+    # heuristic is the name of one in heuristics.HEURISTICS, worked out for
+    # each node as it is pushed, or a consistent estimate of the cost to the
+    # goal indexed by padded flat id; astar alone takes the default for
+    # diagonals. Among equal f the node with the larger g is expanded first,
+    # which keeps A* on one path across open ground instead of widening the
+    # whole front. The heap rounds f, so sums of diagonal steps that differ
+    # only in their last bits still tie.
+    start = time.perf_counter()
+    if not goal_node:
+        goal_node = (grid.rows-1, grid.columns-1)
+    if astar and heuristic is None:
+        heuristic = heuristics.default(diagonals)
+    if isinstance(heuristic, str):
+        if buckets is None and not heuristics.integral(grid, heuristic):
+            buckets = False
+        estimate = heuristics.toward(grid, goal_node, heuristic, diagonals)
+    else:
+        estimate = heuristic.__getitem__ if heuristic is not None else None
+    if buckets is None:
+        buckets = use_buckets(grid, diagonals)
+
+    width, cost = grid.flat_costs()
+    steps = moves(width, diagonals)
+    source = grid.node_id(start_point)
+    target = grid.node_id(goal_node)
+
+    # Integer costs on a 4-connected grid give integer f values, so a ring of
+    # buckets replaces the heap. A consistent heuristic can rise by up to the
+    # cost of the cell left, so f grows by at most twice the max cost a step.
+    source_heuristic = estimate(source) if estimate is not None else 0
+    if buckets:
+        span = grid.integer_cost_bound() * (2 if estimate is not None else 1) + 2
+        source_heuristic = int(source_heuristic)
+        queue = TiedBucketQueue(span, cursor=source_heuristic) if estimate is not None else BucketQueue(span, cursor=source_heuristic)
+        queue.push(source_heuristic, source)
+    else:
+        queue = IndexedHeap(len(cost))
+        queue.push((source_heuristic, 0), source)
+    v_distances = {source: 0}
+    parents = {}
+    visited_nodes = set()
+    generated = pushes = stale_pops = 0
+    peak_open = 1
+
+    while len(queue) > 0:
+        priority, current_node = queue.pop()
+        if current_node in visited_nodes:
+            stale_pops += 1
+            continue
+        visited_nodes.add(current_node)
+        current_distance = v_distances[current_node]
+
+        if current_node == target:
+            break
+
+        if observer and current_node != source:
+            observer('visit', grid.node_at(current_node))
+
+        for step, length in steps:
+            neighbour = current_node + step
+            modifier = cost[neighbour]
+            if modifier == inf or neighbour in visited_nodes:
+                continue
+            generated += 1
+            distance = current_distance + length * modifier
+            if distance < v_distances.get(neighbour, inf):
+                pushes += 1
+                v_distances[neighbour] = distance
+                parents[neighbour] = current_node
+                remaining = estimate(neighbour) if estimate is not None else 0
+                if not buckets:
+                    queue.push((round(distance+remaining, 9), -distance), neighbour)
+                elif estimate is not None:
+                    queue.push(int(distance+remaining), neighbour, -distance)
+                else:
+                    queue.push(int(distance), neighbour)
+        if len(queue) > peak_open:
+            peak_open = len(queue)
+
+    distance = v_distances[target] if target in visited_nodes else inf
+    stats = Metrics(expanded=len(visited_nodes), generated=generated, pushes=pushes + 1, stale_pops=stale_pops, peak_open=peak_open, queue='bucket' if buckets else 'heap')
+    return _finish(grid, source, target, parents, distance, stats, start, observer)
+
+def sweep(grid, start_point, diagonals=False, targets=None, reverse=False):
+    # One to many Dijkstra. Returns (distances, parents) keyed by flat node id,
+    # stopping once every id in targets is settled; distances of nodes left in
+    # the queue at that point are only upper bounds. With reverse the distances
+    # run to start_point instead of from it, so a step pays the cost of the
+    # cell it leaves.
+    width, cost = grid.flat_costs()
+    steps = moves(width, diagonals)
+    source = grid.node_id(start_point)
+    remaining = set(targets) if targets is not None else None
+
+    queue = IndexedHeap(len(cost))
+    queue.push(0, source)
+    distances = {source: 0}
+    parents = {}
+    settled = set()
+
+    while len(queue) > 0:
+        current_distance, current_node = queue.pop()
+        settled.add(current_node)
+        if remaining is not None:
+            remaining.discard(current_node)
+            if not remaining:
+                break
+        for step, length in steps:
+            neighbour = current_node + step
+            if cost[neighbour] == inf or neighbour in settled:
+                continue
+            distance = current_distance + length * (cost[current_node] if reverse else cost[neighbour])
+            if distance < distances.get(neighbour, inf):
+                distances[neighbour] = distance
+                parents[neighbour] = current_node
+                queue.push(distance, neighbour)
+
+    return distances, parents
+
+def xfs(grid, start_point, goal_node, x, diagonals=False, observer=None):
+    assert x == 'b' or x == 'd', "x should equal 'b' or 'd' to make this bfs or dfs"
+    start = time.perf_counter()
+    width, cost = grid.flat_costs()
+    steps = moves(width, diagonals)
+    source = grid.node_id(start_point)
+    target = grid.node_id(goal_node)
+
+    mydeque = deque()
+    mydeque.append(source)
+    visited_nodes = set([])
+    path_dict = {source: None}
+    stats = Metrics(pushes=1, peak_open=1)
+
+    while len(mydeque) > 0:
+        if x == 'd':
+            current_node = mydeque.pop()
+        elif x == 'b':
+            current_node = mydeque.popleft()
+
+        if current_node == target:
+            stats['expanded'] = len(visited_nodes)
+            hops = len(trace_back(target, source, path_dict)) - 1
+            return _finish(grid, source, target, path_dict, hops, stats, start, observer)
+
+        if cost[current_node] == inf or current_node in visited_nodes:
+            stats['stale_pops'] += 1
+            continue
+
+        if current_node not in visited_nodes:
+            visited_nodes.add(current_node)
+            if observer:
+                observer('visit', grid.node_at(current_node))
+
+            for step, length in steps:
+                neighbour = current_node + step
+                mydeque.append(neighbour)
+                if neighbour not in visited_nodes:
+                    path_dict[neighbour] = current_node
+            stats['generated'] += len(steps)
+            stats['pushes'] += len(steps)
+            if len(mydeque) > stats['peak_open']:
+                stats['peak_open'] = len(mydeque)
+
+    stats['expanded'] = len(visited_nodes)
+    return _finish(grid, source, target, path_dict, inf, stats, start, observer)
+
+# Every generator takes a seed and draws only from its own random number
+# generator, so the same seed always gives the same maze. The Prim mazes grow
+# on a flat copy of the cells inside a one cell OUTSIDE border, held in a
+# bytearray, so a neighbour is the current id plus a fixed step and no bounds
+# checks are needed.
+
+OUTSIDE = 255
+UNPROTECTED = np.ones(256, dtype=bool)
+UNPROTECTED[list(PROTECTED)] = False
+
+class Frontier():
+    # Set of flat ids with O(1) add and O(1) removal of a random member: the
+    # drawn member is swapped with the last one and popped.
+    def __init__(self, size, rng):
+        self.items = []
+        self.member = bytearray(size)
+        self.random = rng.random
+
+    def add(self, item):
+        if not self.member[item]:
+            self.member[item] = 1
+            self.items.append(item)
+
+    def drain(self):
+        # Yields random members, removing each, until none are left; members
+        # added in the meantime are drawn as well.
+        items, member, random = self.items, self.member, self.random
+        while items:
+            index = int(random() * len(items))
+            item = items[index]
+            last = items.pop()
+            if index < len(items):
+                items[index] = last
+            member[item] = 0
+            yield item
+
+def _padded(grid):
+    rows, columns = grid.shape
+    padded = np.full((rows + 2, columns + 2), OUTSIDE, dtype=np.uint8)
+    padded[1:-1, 1:-1] = grid.cells
+    return bytearray(padded.tobytes()), (columns + 2, -(columns + 2), 1, -1)
+
+def _unpad(grid, cells):
+    grid.cells[:] = np.frombuffer(cells, dtype=np.uint8).reshape(grid.rows + 2, -1)[1:-1, 1:-1]
+
+def prim(rows, start_point, end_point, origin=False, observer=None, seed=None):
+    rng = random.Random(seed)
+    grid = Grid(rows, nodetype='wall')
+    n = rows - 1
+
+    if not origin:
+        origin = (rng.randrange(0,n,2),rng.randrange(0,n,2))
+
+    # The origin itself stays a wall but is neither counted nor carved, so it
+    # is set apart as OUTSIDE while the maze grows.
+    cells, steps = _padded(grid)
+    root = grid.node_id(origin)
+    cells[root] = OUTSIDE
+    walls = Frontier(len(cells), rng)
+    for step in steps:
+        if cells[root + step] == WALL:
+            walls.add(root + step)
+
+    down, up, right, left = steps
+    for wall in walls.drain():
+        neighbours = (wall + down, wall + up, wall + right, wall + left)
+        passages = 0
+        for neighbour in neighbours:
+            if cells[neighbour] == BLANK:
+                passages += 1
+
+        if passages <= 1:
+            cells[wall] = BLANK
+            if observer:
+                observer('carve', grid.node_at(wall))
+            for neighbour in neighbours:
+                if cells[neighbour] == WALL:
+                    walls.add(neighbour)
+
+    cells[root] = WALL
+    _unpad(grid, cells)
+    grid.cells[end_point] = END
+    grid.cells[start_point] = START
+    grid.refresh()
+    return grid
+
+def better_prim(rows, start_point, end_point, origin=False, observer=None, seed=None):
+    rng = random.Random(seed)
+    grid = Grid(rows, nodetype='wall')
+    grid.cells[1::2, 1::2] = DORMANT
+    n = rows - 1
+
+    if not origin:
+        origin = (rng.randrange(1,n,2),rng.randrange(1,n,2))
+    grid.cells[origin] = BLANK
+    if observer:
+        observer('carve', origin)
+
+    cells, steps = _padded(grid)
+    root = grid.node_id(origin)
+    walls = Frontier(len(cells), rng)
+    for step in steps:
+        if cells[root + step] == WALL:
+            walls.add(root + step)
+
+    for wall in walls.drain():
+        visited = 0
+        for step in steps:
+            if cells[wall + step] == BLANK:
+                visited += 1
+        if visited > 1:
+            continue
+
+        cells[wall] = BLANK
+        if observer:
+            observer('carve', grid.node_at(wall))
+
+        # Of the dormant cells next to the wall, the last one found joins.
+        cell = None
+        for step in steps:
+            if cells[wall + step] == DORMANT:
+                cell = wall + step
+        if cell is None:
+            continue
+        cells[cell] = BLANK
+        if observer:
+            observer('carve', grid.node_at(cell))
+        for step in steps:
+            if cells[cell + step] == WALL:
+                walls.add(cell + step)
+
+    _unpad(grid, cells)
+    grid.cells[end_point] = END
+    grid.cells[start_point] = START
+    grid.refresh()
+    return grid
+
+def offset_gaps(rows):
+    return [x for x in range(2, rows, 3)]
+
+def recursive_division(grid, observer=None, halving=True, seed=None):
+    # Chambers are rows of (left, top, width, height), with left and width
+    # along the first axis. Every chamber of one level is split at once: the
+    # dividers and gaps of the whole level are built as index arrays and set
+    # in one go, and the quarters too small to split are dropped. Without
+    # halving the dividers go at random positions.
+    rng = np.random.default_rng(seed)
+    cells = grid.cells
+    gaps_to_offset = np.zeros(max(cells.shape) + 1, dtype=bool)
+    gaps_to_offset[offset_gaps(len(gaps_to_offset))] = True
+    chambers = np.array([[0, 0, cells.shape[0], cells.shape[1]]], dtype=np.int64)
+
+    while len(chambers):
+        left, top, width, height = chambers.T
+        if halving:
+            x_divide = width // 2
+            y_divide = height // 2
+        else:
+            x_divide = np.where(width >= 3, 1 + _below(rng, width - 2), width // 2)
+            y_divide = np.where(height >= 3, 1 + _below(rng, height - 2), height // 2)
+        vertical = width >= 3
+        horizontal = height >= 3
+
+        rows, columns = _runs(left + x_divide, top, height, vertical)
+        _fill(cells, rows, columns, WALL, 'wall', observer)
+        columns, rows = _runs(top + y_divide, left, width, horizontal)
+        _fill(cells, rows, columns, WALL, 'wall', observer)
+
+        # Gap pieces as columns of (left, top, width, height, shift), where
+        # shift moves a gap off a line later dividers will cross. A chamber
+        # with both dividers opens three of its four pieces, one with a single
+        # divider opens that divider anywhere along it.
+        both = vertical & horizontal
+        closed = _below(rng, np.full(len(chambers), 4))
+        pieces = (
+            (both & (closed != 0),  (left,                  top + y_divide,     x_divide,               1,                      -1)),
+            (both & (closed != 1),  (left + x_divide + 1,   top + y_divide,     width - x_divide - 1,   1,                      1)),
+            (both & (closed != 2),  (left + x_divide,       top,                1,                      y_divide,               -1)),
+            (both & (closed != 3),  (left + x_divide,       top + y_divide + 1, 1,                      height - y_divide - 1,  1)),
+            (vertical & ~both,      (left + x_divide,       top,                1,                      height,                 1)),
+            (horizontal & ~both,    (left,                  top + y_divide,     width,                  1,                      1)),
+        )
+        gaps = np.concatenate([np.stack(np.broadcast_arrays(*piece), axis=1)[chosen] for chosen, piece in pieces])
+        piece_left, piece_top, piece_width, piece_height, shift = gaps.T
+        x = piece_left + _below(rng, piece_width)
+        y = piece_top + _below(rng, piece_height)
+        offset = gaps_to_offset[x] & gaps_to_offset[y]
+        along = offset & (piece_height == 1)
+        x[along] = np.clip(x + shift, piece_left, piece_left + piece_width - 1)[along]
+        across = offset & (piece_height != 1)
+        y[across] = np.clip(y + shift, piece_top, piece_top + piece_height - 1)[across]
+        _fill(cells, x, y, BLANK, 'carve', observer)
+
+        chambers = np.concatenate([
+            np.stack(quarter, axis=1) for quarter in (
+                (left,                  top,                x_divide,               y_divide),
+                (left + x_divide + 1,   top,                width - x_divide - 1,   y_divide),
+                (left,                  top + y_divide + 1, x_divide,               height - y_divide - 1),
+                (left + x_divide + 1,   top + y_divide + 1, width - x_divide - 1,   height - y_divide - 1),
+            )
+        ])
+        width, height = chambers[:, 2], chambers[:, 3]
+        chambers = chambers[(width > 0) & (height > 0) & ((width >= 3) | (height >= 3))]
+
+    grid.refresh()
+    return grid
+
+def _below(rng, n):
+    # Uniform ints in [0, n) for an array of n.
+    return (rng.random(len(n)) * n).astype(np.int64)
+
+def _runs(fixed, start, length, chosen):
+    # Cells of straight runs, one per chosen chamber: fixed on one axis and
+    # start, start + 1, ... start + length - 1 on the other.
+    fixed, start, length = fixed[chosen], start[chosen], length[chosen]
+    first = np.cumsum(length) - length
+    offsets = np.arange(length.sum()) - np.repeat(first, length)
+    return np.repeat(fixed, length), np.repeat(start, length) + offsets
+
+def _fill(cells, rows, columns, code, event, observer):
+    # Sets the given cells, leaving the start and end alone.
+    keep = UNPROTECTED[cells[rows, columns]]
+    cells[rows[keep], columns[keep]] = code
+    if observer:
+        for node in zip(rows.tolist(), columns.tolist()):
+            observer(event, node)
+
+def random_terrain(grid, num_patches=False, observer=None, seed=None):
+    rng = random.Random(seed)
+    cells = grid.cells
+    rows = grid.rows
+    if not num_patches:
+        num_patches = rng.randrange(int(rows/10),int(rows/4))
+
+    terrain_nodes = set([])
+
+    for patch in range(num_patches+1):
+        neighbour_cycles = 0
+        centre_point = (rng.randrange(1,rows-1),rng.randrange(1,rows-1))
+        patch_type = MUD
+        terrain_nodes.add(centre_point)
+
+        while len(terrain_nodes) > 0:
+            node = terrain_nodes.pop()
+
+            if cells[node] not in PROTECTED:
+                cells[node] = patch_type
+                if observer:
+                    observer('terrain', node)
+
+            neighbour_cycles += 1
+
+            for node, ntype in get_neighbours(node, rows-1):
+                if cells[node] == MUD:
+                    continue
+                threshold = 700-(neighbour_cycles*10)
+
+                if rng.randrange(1,101) <= threshold:
+                    terrain_nodes.add(node)
+
+    grid.refresh()
+    return grid
@@ -0,0 +1,109 @@
+import time
+from collections import OrderedDict
+from math import inf
+import numpy as np
+from engine import SearchResult, sweep
+from metrics import Metrics
+
+# Single source distance fields. A field is one full Dijkstra sweep from a
+# root together with its parent map, so the shortest path between the root
+# and any other cell is a walk along parents rather than a new search. A
+# reverse field holds distances to the root instead of from it.
+#
+# Fields are cached per grid and (root, diagonals, reverse), and each is valid
+# for one grid version. Edits that leave every movement cost as it was, such
+# as moving the start or end marker, carry the fields over to the new version;
+# any other edit drops them.
+
+MAX_FIELDS = 8
+
+class DistanceField():
+    def __init__(self, grid, root, diagonals=False, reverse=False):
+        start = time.perf_counter()
+        self.grid = grid
+        self.root = tuple(root)
+        self.diagonals = diagonals
+        self.reverse = reverse
+        self.distances, self.parents = sweep(grid, root, diagonals, reverse=reverse)
+        self.version = grid.version
+        self._array = None
+        self.time = time.perf_counter() - start
+
+    def distance(self, node):
+        return self.distances.get(self.grid.node_id(node), inf)
+
+    def path(self, node, observer=None):
+        # Path between the root and node in the direction of travel: from the
+        # root for a forward field, to the root for a reverse one.
+        start = time.perf_counter()
+        grid = self.grid
+        target = grid.node_id(node)
+        root = grid.node_id(self.root)
+        distance = self.distances.get(target, inf)
+        stats = Metrics(mode='field')
+        if distance == inf:
+            return SearchResult(False, [], inf, stats)
+
+        walk = [target]
+        while walk[-1] != root:
+            walk.append(self.parents[walk[-1]])
+        if not self.reverse:
+            walk.reverse()
+        path = [grid.node_at(node_id) for node_id in walk]
+        stats['walked'] = len(path)
+        stats.end_path(start)
+        if observer:
+            for step in path:
+                observer('path', step)
+        return SearchResult(True, path, distance, stats)
+
+    def array(self):
+        # Distances as a (rows, columns) float array, inf where unreachable.
+        # Built on first use and kept, since the distances never change.
+        if self._array is None:
+            width = self.grid.columns + 2
+            flat = np.full((self.grid.rows + 2) * width, inf)
+            flat[list(self.distances)] = list(self.distances.values())
+            self._array = flat.reshape(-1, width)[1:-1, 1:-1]
+            self._array.flags.writeable = False
+        return self._array
+
+class FieldCache():
+    def __init__(self, grid, max_fields=MAX_FIELDS):
+        self.grid = grid
+        self.max_fields = max_fields
+        self.fields = OrderedDict()
+        self.cost = grid.cost.copy()
+        self.built = 0
+        grid.subscribe(self.cell_changed)
+
+    def close(self):
+        self.grid.unsubscribe(self.cell_changed)
+
+    def cell_changed(self, node):
+        if node is not None and self.cost[node] == self.grid.cost[node]:
+            for field in self.fields.values():
+                field.version = self.grid.version
+            return
+        self.fields.clear()
+        if node is None:
+            self.cost = self.grid.cost.copy()
+        else:
+            self.cost[node] = self.grid.cost[node]
+
+    def field(self, root, diagonals=False, reverse=False):
+        key = (tuple(root), bool(diagonals), bool(reverse))
+        field = self.fields.get(key)
+        if field is None or field.version != self.grid.version:
+            field = DistanceField(self.grid, root, diagonals, reverse)
+            self.built += 1
+        self.fields[key] = field
+        self.fields.move_to_end(key)
+        while len(self.fields) > self.max_fields:
+            self.fields.popitem(last=False)
+        return field
+
+def field(grid, root, diagonals=False, reverse=False):
+    if 'fields' not in grid.indexes:
+        grid.indexes['fields'] = FieldCache(grid)
+    return grid.indexes['fields'].field(root, diagonals, reverse)
@@ -0,0 +1,92 @@
+import numpy as np
+import fields
+
+# Flow fields for moving many agents to one goal. A flow field is read off
+# the reverse distance field of the goal: every cell that can reach the goal
+# points at the neighbour its shortest path takes next, so the whole route of
+# any agent costs one sweep, however many agents there are. next holds that
+# neighbour for every padded flat id and each cell that cannot move, the goal
+# included, points at itself, so moving a whole crowd one step is a single
+# array lookup.
+#
+# Flow fields are cached per grid, goal and diagonals alongside the distance
+# field they came from, and are rebuilt whenever that field is.
+
+class FlowField():
+    def __init__(self, field):
+        grid = field.grid
+        self.field = field
+        self.grid = grid
+        self.goal = grid.node_id(field.root)
+        self.width = grid.columns + 2
+        size = (grid.rows + 2) * self.width
+        self.next = np.arange(size, dtype=np.int64)
+        if field.parents:
+            cells = np.fromiter(field.parents.keys(), dtype=np.int64, count=len(field.parents))
+            self.next[cells] = np.fromiter(field.parents.values(), dtype=np.int64, count=len(field.parents))
+        self.reachable = np.zeros(size, dtype=bool)
+        self.reachable[np.fromiter(field.distances.keys(), dtype=np.int64, count=len(field.distances))] = True
+
+    def direction(self, node):
+        # (row step, column step) towards the goal; (0, 0) at the goal or
+        # where the goal cannot be reached.
+        node_id = self.grid.node_id(node)
+        row_step, column_step = divmod(int(self.next[node_id]) - node_id + self.width + 1, self.width)
+        return (row_step - 1, column_step - 1)
+
+    def directions(self):
+        # (rows, columns, 2) array of every cell's direction.
+        ids = np.arange(self.next.size)
+        rows, columns = np.divmod(self.next - ids + self.width + 1, self.width)
+        steps = np.stack([rows - 1, columns - 1], axis=-1).reshape(self.grid.rows + 2, self.width, 2)
+        return steps[1:-1, 1:-1]
+
+    def step(self, positions):
+        return self.next[positions]
+
+def flow_field(grid, goal, diagonals=False):
+    field = fields.field(grid, goal, diagonals, reverse=True)
+    flows = grid.indexes.setdefault('flows', {})
+    key = (tuple(goal), bool(diagonals))
+    flow = flows.get(key)
+    if flow is None or flow.field is not field:
+        live = {id(cached) for cached in grid.indexes['fields'].fields.values()}
+        for old in [old for old, cached in flows.items() if id(cached.field) not in live]:
+            del flows[old]
+        flow = flows[key] = FlowField(field)
+    return flow
+
+class Agents():
+    # A crowd of agents as an array of padded flat ids, all stepped at once.
+    def __init__(self, grid, positions):
+        self.grid = grid
+        self.positions = np.array([grid.node_id(node) for node in positions], dtype=np.int64)
+        self.steps = 0
+
+    @classmethod
+    def scatter(cls, flow, count, seed=None):
+        # count agents on distinct random cells that can reach the goal.
+        rng = np.random.default_rng(seed)
+        cells = np.flatnonzero(flow.reachable)
+        chosen = rng.choice(cells, size=min(count, cells.size), replace=False)
+        agents = cls(flow.grid, [])
+        agents.positions = chosen.astype(np.int64)
+        return agents
+
+    def __len__(self):
+        return self.positions.size
+
+    def step(self, flow):
+        # Moves every agent one cell along flow and returns how many moved.
+        moved = flow.step(self.positions)
+        count = int(np.count_nonzero(moved != self.positions))
+        self.positions = moved
+        self.steps += 1
+        return count
+
+    def arrived(self, flow):
+        return int(np.count_nonzero(self.positions == flow.goal))
+
+    def nodes(self):
+        # (n, 2) array of (row, column) pairs.
+        return np.stack(np.divmod(self.positions, self.grid.columns + 2), axis=1) - 1
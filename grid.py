@@ -0,0 +1,237 @@
+import numpy as np
+from node import Node
+
+NODETYPES = Node.nodetypes
+CELL = {nodetype: code for code, nodetype in enumerate(NODETYPES)}
+BLANK, START, END, WALL, MUD, DORMANT = (CELL[nodetype] for nodetype in ('blank', 'start', 'end', 'wall', 'mud', 'dormant'))
+SAND, FOREST, WATER = (CELL[nodetype] for nodetype in ('sand', 'forest', 'water'))
+
+COSTS = np.array([Node.distance_modifiers[nodetype] for nodetype in NODETYPES], dtype=np.float32)
+PALETTE = {state: np.array([Node.colors[state][nodetype] for nodetype in NODETYPES], dtype=np.uint8) for state in Node.colors}
+
+PROTECTED = (START, END)
+TERRAIN = (MUD, SAND, FOREST, WATER)
+# Share of the cells past which the changed cells are no longer listed one by
+# one and the whole grid counts as changed.
+DIRTY_LIMIT = 0.25
+
+class Grid():
+    # cells is the uint8 cell-type array and cost the float32 movement cost
+    # derived from it. Both may be written directly as long as refresh() is
+    # called afterwards; set() keeps them in step for single cell edits. cost
+    # is only built on first use, so a grid over a memory-mapped cell array
+    # opens without touching the cells.
+    # Search structures that keep themselves up to date through listeners
+    # live in indexes, so they are shared by every caller and go with the grid.
+    # Cells whose type or shading changed are listed for the renderer, which
+    # takes them once a frame; code that writes cells, visited or path
+    # directly calls touch() for what it wrote, or refresh() for the cells.
+    def __init__(self, rows, columns=None, nodetype='blank'):
+        if columns is None:
+            columns = rows
+        self.cells = np.full((rows, columns), CELL[nodetype], dtype=np.uint8)
+        self._cost = None
+        self.visited = np.zeros((rows, columns), dtype=bool)
+        self.path = np.zeros((rows, columns), dtype=bool)
+        self.version = 0
+        self._derived = {}
+        self.listeners = []
+        self.indexes = {}
+        self.dirty = None
+        self.dirty_count = 0
+
+    @classmethod
+    def from_cells(cls, cells):
+        grid = cls.__new__(cls)
+        grid.cells = np.ascontiguousarray(cells, dtype=np.uint8)
+        grid._cost = None
+        grid.visited = np.zeros(grid.cells.shape, dtype=bool)
+        grid.path = np.zeros(grid.cells.shape, dtype=bool)
+        grid.version = 0
+        grid._derived = {}
+        grid.listeners = []
+        grid.indexes = {}
+        grid.dirty = None
+        grid.dirty_count = 0
+        return grid
+
+    @property
+    def cost(self):
+        if self._cost is None:
+            self._cost = COSTS[self.cells]
+        return self._cost
+
+    @property
+    def shape(self):
+        return self.cells.shape
+
+    @property
+    def rows(self):
+        return self.cells.shape[0]
+
+    @property
+    def columns(self):
+        return self.cells.shape[1]
+
+    def __len__(self):
+        return self.rows
+
+    def in_bounds(self, node):
+        return 0 <= node[0] < self.rows and 0 <= node[1] < self.columns
+
+    def nodetype(self, node):
+        return NODETYPES[self.cells[node]]
+
+    def is_passable(self, node):
+        return self.cost[node] != np.inf
+
+    def set(self, node, nodetype):
+        code = CELL[nodetype]
+        old = self.cells[node]
+        if old == code or (old in PROTECTED and (code == WALL or code in TERRAIN)):
+            return False
+        self.cells[node] = code
+        self.cost[node] = COSTS[code]
+        self.version += 1
+        self._keep_flat(self.node_id(node), COSTS[code])
+        self.touch(node[0], node[1])
+        self._notify((int(node[0]), int(node[1])))
+        return True
+
+    def _keep_flat(self, node_id, cost):
+        # The padded lists take O(rows x columns) to build, so a single edit
+        # writes through to them; everything else derived is worked out again.
+        derived, self._derived = self._derived, {}
+        if 'flat' in derived:
+            derived['flat'][1][node_id] = float(cost)
+            self._derived['flat'] = derived['flat']
+        if 'passable' in derived:
+            derived['passable'][node_id] = bool(cost != np.inf)
+            self._derived['passable'] = derived['passable']
+
+    def refresh(self):
+        self._cost = None
+        self.version += 1
+        self._derived = {}
+        self.dirty = None
+        self._notify(None)
+
+    def touch(self, rows, columns):
+        # Records cells, given as row and column indices or index arrays, as
+        # changed since the renderer last took them.
+        if self.dirty is None:
+            return
+        rows, columns = (np.ravel(indices) for indices in np.broadcast_arrays(rows, columns))
+        self.dirty.append((rows, columns))
+        self.dirty_count += rows.size
+        if self.dirty_count > DIRTY_LIMIT * self.cells.size:
+            self.dirty = None
+
+    def take_dirty(self):
+        # (rows, columns) of the cells changed since the last call, or None
+        # when any cell may have changed.
+        dirty = self.dirty
+        self.dirty = []
+        self.dirty_count = 0
+        if dirty is None:
+            return None
+        if not dirty:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        rows = np.concatenate([rows for rows, columns in dirty]).astype(np.intp, copy=False)
+        columns = np.concatenate([columns for rows, columns in dirty]).astype(np.intp, copy=False)
+        return rows, columns
+
+    def subscribe(self, listener):
+        # listener(node) is called after every edit with the changed cell, or
+        # with None after refresh() when any cell may have changed.
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, node):
+        for listener in self.listeners:
+            listener(node)
+
+    def find(self, nodetype):
+        found = np.argwhere(self.cells == CELL[nodetype])
+        return tuple(int(i) for i in found[0]) if len(found) else None
+
+    def clear_search(self):
+        if self.dirty is not None:
+            self.touch(*np.nonzero(self.visited | self.path))
+        self.visited[:] = False
+        self.path[:] = False
+
+    def mark_visited(self, rows, columns):
+        self.visited[rows, columns] = True
+        self.touch(rows, columns)
+
+    def mark_path(self, path, marked=True):
+        for node in path:
+            self.path[node] = marked
+        if path:
+            self.touch(*np.array(path).T)
+
+    def color(self, node):
+        state = 'path' if self.path[node] else 'visited' if self.visited[node] else 'regular'
+        return tuple(int(channel) for channel in PALETTE[state][self.cells[node]])
+
+    def colors(self):
+        rgb = PALETTE['regular'][self.cells]
+        rgb[self.visited] = PALETTE['visited'][self.cells[self.visited]]
+        rgb[self.path] = PALETTE['path'][self.cells[self.path]]
+        return rgb
+
+    def flat_costs(self):
+        # Row-major costs with a one cell border of walls, so solvers can step
+        # between integer node ids without bounds checks. Built once and kept
+        # in step by set(); refresh() builds it again.
+        if 'flat' not in self._derived:
+            padded = np.pad(self.cost, 1, constant_values=np.inf)
+            self._derived['flat'] = (padded.shape[1], padded.ravel().tolist())
+        return self._derived['flat']
+
+    def flat_passable(self):
+        if 'passable' not in self._derived:
+            self._derived['passable'] = np.pad(self.cost != np.inf, 1, constant_values=False).ravel().tolist()
+        return self._derived['passable']
+
+    def integer_cost_bound(self):
+        # Largest passable cost if every passable cost is a whole number,
+        # otherwise None. Used to pick a bucket queue over a heap.
+        if 'max_cost' not in self._derived:
+            finite = self.cost[self.cost != np.inf]
+            if finite.size == 0:
+                self._derived['max_cost'] = 1
+            elif np.all(finite == np.floor(finite)) and finite.min() >= 0:
+                self._derived['max_cost'] = int(finite.max())
+            else:
+                self._derived['max_cost'] = None
+        return self._derived['max_cost']
+
+    def min_cost(self):
+        # Smallest passable cost, or 1 when nothing is passable. Scales the
+        # distance heuristics so that they never overestimate.
+        if 'min_cost' not in self._derived:
+            finite = self.cost[self.cost != np.inf]
+            self._derived['min_cost'] = float(finite.min()) if finite.size else 1.0
+        return self._derived['min_cost']
+
+    def uniform_cost(self):
+        # The single cost shared by every passable cell, or None if they differ.
+        if 'uniform' not in self._derived:
+            finite = self.cost[self.cost != np.inf]
+            if finite.size and np.all(finite == finite[0]):
+                self._derived['uniform'] = float(finite[0])
+            else:
+                self._derived['uniform'] = None
+        return self._derived['uniform']
+
+    def node_id(self, node):
+        return (node[0] + 1) * (self.columns + 2) + node[1] + 1
+
+    def node_at(self, node_id):
+        row, column = divmod(node_id, self.columns + 2)
+        return (row - 1, column - 1)
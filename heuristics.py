@@ -0,0 +1,91 @@
+import numpy as np
+
+# Distance heuristics for A* over the padded flat ids. Each one is
+# a lower bound on the number of unit steps between a cell and the goal,
+# times the smallest passable cost on the grid, so that it never
+# overestimates whatever terrain lies between:
+#   'manhattan' - rows + columns apart; exact for 4-connected moves, but too
+#                 high once diagonals cut corners
+#   'octile'    - max + (sqrt 2 - 1) * min; exact for 8-connected moves with
+#                 diagonals that cost sqrt 2
+#   'euclidean' - the straight line; below both of the above
+#   'chebyshev' - max of rows and columns apart; below octile, as if a
+#                 diagonal cost the same as a straight step
+# Each is consistent for the moves it admits, so A* with it settles every
+# cell once. The tighter the bound the fewer cells A* expands, which makes
+# manhattan the default without diagonals and octile the default with them.
+#
+# Searches take an estimate for one cell at a time, built on STEPS, so a
+# query pays only for the cells it looks at. A table over the whole grid at
+# once is only built when a caller asks for one, as a numpy array indexed by
+# padded flat id, and is never kept.
+
+DIAGONAL = 2**0.5
+
+HEURISTICS = {
+    'manhattan': lambda rows, columns: rows + columns,
+    'octile': lambda rows, columns: np.maximum(rows, columns) + (DIAGONAL - 1) * np.minimum(rows, columns),
+    'euclidean': lambda rows, columns: np.hypot(rows, columns),
+    'chebyshev': lambda rows, columns: np.maximum(rows, columns),
+}
+STEPS = {
+    'manhattan': lambda rows, columns: rows + columns,
+    'octile': lambda rows, columns: max(rows, columns) + (DIAGONAL - 1) * min(rows, columns),
+    'euclidean': lambda rows, columns: (rows * rows + columns * columns) ** 0.5,
+    'chebyshev': lambda rows, columns: max(rows, columns),
+}
+# Whole numbers of steps, so integer costs give integer estimates and A* can
+# keep a bucket queue.
+INTEGRAL = {'manhattan', 'chebyshev'}
+
+def default(diagonals=False):
+    return 'octile' if diagonals else 'manhattan'
+
+def admissible(name, diagonals=False):
+    return name != 'manhattan' or not diagonals
+
+def integral(grid, name):
+    return name in INTEGRAL and grid.min_cost() == int(grid.min_cost())
+
+def _checked(name, diagonals):
+    name = name or default(diagonals)
+    assert name in HEURISTICS, f"heuristic must be one of: {list(HEURISTICS)}"
+    assert admissible(name, diagonals), f"{name} overestimates with diagonal moves"
+    return name
+
+def estimator(grid, name=None, diagonals=False, scale=None):
+    # estimate(a, b) between two padded flat ids of grid, times scale, which
+    # is the smallest passable cost unless given.
+    steps = STEPS[_checked(name, diagonals)]
+    width = grid.columns + 2
+    scale = grid.min_cost() if scale is None else scale
+
+    def estimate(a, b):
+        row_a, column_a = divmod(a, width)
+        row_b, column_b = divmod(b, width)
+        return scale * steps(abs(row_a - row_b), abs(column_a - column_b))
+    return estimate
+
+def toward(grid, goal_node, name=None, diagonals=False, scale=None):
+    # estimate(node) from a padded flat id to goal_node, the one-sided form
+    # of estimator for searches with a fixed goal.
+    steps = STEPS[_checked(name, diagonals)]
+    width = grid.columns + 2
+    scale = grid.min_cost() if scale is None else scale
+    goal_row, goal_column = divmod(grid.node_id(goal_node), width)
+
+    def estimate(node):
+        row, column = divmod(node, width)
+        return scale * steps(abs(row - goal_row), abs(column - goal_column))
+    return estimate
+
+def table(grid, goal_node, name=None, diagonals=False):
+    # Estimates of the cost to goal_node for every padded flat id, as a flat
+    # numpy array; engine.dijkstra takes it in place of a name.
+    name = _checked(name, diagonals)
+    width = grid.columns + 2
+    goal_row, goal_column = divmod(grid.node_id(goal_node), width)
+    rows = np.abs(np.arange(grid.rows + 2) - goal_row)[:, None]
+    columns = np.abs(np.arange(width) - goal_column)[None, :]
+    steps = np.broadcast_to(HEURISTICS[name](rows, columns), (grid.rows + 2, width))
+    return (grid.min_cost() * steps).ravel()
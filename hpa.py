@@ -0,0 +1,319 @@
+import time
+from math import inf
+from engine import SearchResult, dijkstra, sweep
+from grid import Grid
+from priority_queue import IndexedHeap
+import heuristics
+from heuristics import DIAGONAL
+from metrics import Metrics
+
+# Hierarchical path finding (HPA*, Botea et al.) for large maps. The grid is
+# cut into square clusters. Wherever two neighbouring clusters touch, each run
+# of open cell pairs across the border is an entrance, crossed at its middle,
+# or at both ends when the run is long. The cells either side of a crossing
+# are the abstract nodes; crossings are the inter edges and the cheapest path
+# inside a cluster between two of its nodes is an intra edge.
+#
+# Everything is built lazily: a border's crossings when a cluster next to it
+# is first used, and a node's intra edges (one Dijkstra sweep of its cluster)
+# when the abstract search first expands it. Cell paths are only refined for
+# the abstract path that is returned. An edit drops the edited cluster, and
+# the clusters on the far side of any border whose crossings it changed.
+#
+# With diagonals a diagonal crossing is kept wherever neither of its straight
+# crossings is open, and clusters meeting at a corner get a corner crossing,
+# so the abstract graph connects everything the cell grid does. Paths are
+# near optimal: they always pass through entrance crossing points.
+
+CLUSTER_SIZE = 16
+LONG_ENTRANCE = 6
+
+OTHER_SIDE = {'east': (0, 1), 'south': (1, 0), 'southeast': (1, 1), 'southwest': (1, -1)}
+
+class _Cluster():
+    def __init__(self, grid, top, left, bottom, right):
+        self.top = top
+        self.left = left
+        self.sub = Grid.from_cells(grid.cells[top:bottom, left:right])
+        self.links = {}
+        self.edges = {}
+        self.segments = {}
+
+    def link(self, node, other, cost):
+        links = self.links.setdefault(node, {})
+        if cost < links.get(other, inf):
+            links[other] = cost
+
+class Hierarchy():
+    def __init__(self, grid, diagonals=False, cluster_size=CLUSTER_SIZE):
+        assert cluster_size >= 2, "cluster_size must be at least 2"
+        self.grid = grid
+        self.diagonals = diagonals
+        self.size = cluster_size
+        self.shape = (-(-grid.rows // cluster_size), -(-grid.columns // cluster_size))
+        self.borders = {}
+        self.clusters = {}
+        self.changed = set()
+        self.stale = False
+        self.swept = 0
+        grid.subscribe(self.cell_changed)
+
+    def close(self):
+        self.grid.unsubscribe(self.cell_changed)
+
+    def cell_changed(self, node):
+        if node is None:
+            self.stale = True
+        else:
+            self.changed.add(node)
+
+    def _update(self):
+        rebuilt = 0
+        if self.stale:
+            rebuilt = len(self.clusters)
+            self.borders = {}
+            self.clusters = {}
+            self.changed = set()
+            self.stale = False
+        for row, column in self.changed:
+            key = (row // self.size, column // self.size)
+            dropped = {key}
+            for border in self._borders_of(key):
+                if border in self.borders:
+                    crossings = self._find_crossings(border)
+                    if crossings != self.borders[border]:
+                        self.borders[border] = crossings
+                        dropped.update(self._sides(border))
+            for cluster in dropped:
+                if self.clusters.pop(cluster, None) is not None:
+                    rebuilt += 1
+        self.changed = set()
+        return rebuilt
+
+    def cluster_of(self, node_id):
+        row, column = self.grid.node_at(node_id)
+        return (row // self.size, column // self.size)
+
+    def _sides(self, border):
+        i, j, kind = border
+        down, across = OTHER_SIDE[kind]
+        return (i, j), (i + down, j + across)
+
+    def _borders_of(self, key):
+        i, j = key
+        candidates = [(i, j, 'east'), (i, j - 1, 'east'), (i, j, 'south'), (i - 1, j, 'south')]
+        if self.diagonals:
+            candidates += [(i, j, 'southeast'), (i - 1, j - 1, 'southeast'), (i, j, 'southwest'), (i - 1, j + 1, 'southwest')]
+        rows, columns = self.shape
+        return [border for border in candidates if all(0 <= a < rows and 0 <= b < columns for a, b in self._sides(border))]
+
+    def _border_cells(self, border):
+        # Parallel lists of cells on the near and far side of the border.
+        i, j, kind = border
+        size = self.size
+        rows, columns = self.grid.shape
+        if kind == 'east':
+            column = (j + 1) * size - 1
+            line = range(i * size, min((i + 1) * size, rows))
+            return [(row, column) for row in line], [(row, column + 1) for row in line]
+        if kind == 'south':
+            row = (i + 1) * size - 1
+            line = range(j * size, min((j + 1) * size, columns))
+            return [(row, column) for column in line], [(row + 1, column) for column in line]
+        row = (i + 1) * size - 1
+        if kind == 'southeast':
+            return [(row, (j + 1) * size - 1)], [(row + 1, (j + 1) * size)]
+        return [(row, j * size)], [(row + 1, j * size - 1)]
+
+    def _find_crossings(self, border):
+        # [(near, far, near to far cost, far to near cost)] with flat node ids.
+        near, far = self._border_cells(border)
+        cost = self.grid.cost
+        near_open = [cost[cell] != inf for cell in near]
+        far_open = [cost[cell] != inf for cell in far]
+        pairs = []
+        if border[2] in ('southeast', 'southwest'):
+            if near_open[0] and far_open[0]:
+                pairs.append((0, 0, DIAGONAL))
+        else:
+            straight = [a and b for a, b in zip(near_open, far_open)]
+            count = len(straight)
+            first = 0
+            while first < count:
+                if not straight[first]:
+                    first += 1
+                    continue
+                last = first
+                while last + 1 < count and straight[last + 1]:
+                    last += 1
+                if last - first + 1 >= LONG_ENTRANCE:
+                    pairs += [(first, first, 1), (last, last, 1)]
+                else:
+                    pairs.append(((first + last) // 2, (first + last) // 2, 1))
+                first = last + 1
+            if self.diagonals:
+                for a in range(count):
+                    if near_open[a] and not straight[a]:
+                        for b in (a - 1, a + 1):
+                            if 0 <= b < count and far_open[b] and not straight[b]:
+                                pairs.append((a, b, DIAGONAL))
+        node_id = self.grid.node_id
+        return [(node_id(near[a]), node_id(far[b]), length * float(cost[far[b]]), length * float(cost[near[a]])) for a, b, length in pairs]
+
+    def _crossings(self, border):
+        if border not in self.borders:
+            self.borders[border] = self._find_crossings(border)
+        return self.borders[border]
+
+    def _cluster(self, key):
+        cluster = self.clusters.get(key)
+        if cluster is None:
+            i, j = key
+            size = self.size
+            cluster = _Cluster(self.grid, i * size, j * size, min((i + 1) * size, self.grid.rows), min((j + 1) * size, self.grid.columns))
+            for border in self._borders_of(key):
+                near_side = self._sides(border)[0] == key
+                for near, far, there, back in self._crossings(border):
+                    if near_side:
+                        cluster.link(near, far, there)
+                    else:
+                        cluster.link(far, near, back)
+            self.clusters[key] = cluster
+        return cluster
+
+    def precompute(self):
+        # Builds every cluster and intra edge up front instead of on demand.
+        self._update()
+        rows, columns = self.shape
+        for key in ((i, j) for i in range(rows) for j in range(columns)):
+            for node_id in list(self._cluster(key).links):
+                self._intra(node_id)
+
+    def _local(self, cluster, node_id):
+        row, column = self.grid.node_at(node_id)
+        return (row - cluster.top, column - cluster.left)
+
+    def _sweep(self, cluster, node_id, targets, reverse=False):
+        # Distances inside the cluster from node_id to each target (or from
+        # each target to node_id with reverse), keyed by flat node id.
+        sub = cluster.sub
+        local = {sub.node_id(self._local(cluster, target)): target for target in targets if target != node_id}
+        self.swept += 1
+        distances, parents = sweep(sub, self._local(cluster, node_id), self.diagonals, targets=local, reverse=reverse)
+        found = {target: distances[local_id] for local_id, target in local.items() if distances.get(local_id, inf) != inf}
+        if node_id in targets:
+            found[node_id] = 0
+        return found
+
+    def _intra(self, node_id):
+        cluster = self._cluster(self.cluster_of(node_id))
+        if node_id not in cluster.edges:
+            cluster.edges[node_id] = self._sweep(cluster, node_id, cluster.links)
+            cluster.edges[node_id].pop(node_id, None)
+        return cluster.edges[node_id]
+
+    def search(self, start_point, goal_node, observer=None):
+        start = time.perf_counter()
+        rebuilt = self._update()
+        self.swept = 0
+        grid = self.grid
+        source = grid.node_id(start_point)
+        target = grid.node_id(goal_node)
+        stats = Metrics(mode='hpa', rebuilt=rebuilt, swept=0)
+
+        if not grid.is_passable(start_point) or not grid.is_passable(goal_node):
+            stats.end_search(start)
+            return SearchResult(False, [], inf, stats)
+
+        source_cluster = self._cluster(self.cluster_of(source))
+        target_key = self.cluster_of(target)
+        target_cluster = self._cluster(target_key)
+        same_cluster = self.cluster_of(source) == target_key
+        leaving = self._sweep(source_cluster, source, set(source_cluster.links) | ({target} if same_cluster else set()))
+        arriving = self._sweep(target_cluster, target, target_cluster.links, reverse=True)
+
+        estimate = heuristics.estimator(grid, diagonals=self.diagonals)
+        # Abstract nodes are padded flat ids, only a few of them spread over
+        # the whole map, so the heap keeps their positions in a dict.
+        queue = IndexedHeap()
+        queue.push((estimate(source, target), 0), source)
+        stats['pushes'] += 1
+        distances = {source: 0}
+        parents = {}
+        closed = set()
+
+        while len(queue) > 0:
+            if len(queue) > stats['peak_open']:
+                stats['peak_open'] = len(queue)
+            priority, current_node = queue.pop()
+            closed.add(current_node)
+            if current_node == target:
+                break
+            if observer and current_node != source:
+                observer('visit', grid.node_at(current_node))
+
+            cluster = self._cluster(self.cluster_of(current_node))
+            if current_node == source:
+                edges = list(leaving.items())
+            elif current_node in cluster.links:
+                edges = list(self._intra(current_node).items())
+            else:
+                edges = []
+            edges += cluster.links.get(current_node, {}).items()
+            if current_node in arriving:
+                edges.append((target, arriving[current_node]))
+
+            current_distance = distances[current_node]
+            for neighbour, cost in edges:
+                if neighbour in closed:
+                    continue
+                stats['generated'] += 1
+                distance = current_distance + cost
+                if distance < distances.get(neighbour, inf):
+                    stats['pushes'] += 1
+                    distances[neighbour] = distance
+                    parents[neighbour] = current_node
+                    queue.push((distance + estimate(neighbour, target), -distance), neighbour)
+
+        stats.update(expanded=len(closed), swept=self.swept)
+        finished = stats.end_search(start)
+        if target not in closed:
+            return SearchResult(False, [], inf, stats)
+
+        abstract = [target]
+        while abstract[-1] != source:
+            abstract.append(parents[abstract[-1]])
+        abstract.reverse()
+        path = self._refine(abstract)
+        stats['abstract'] = len(abstract)
+        stats.end_path(finished)
+        if observer:
+            for node in path:
+                observer('path', node)
+        return SearchResult(True, path, distances[target], stats)
+
+    def _refine(self, abstract):
+        path = [self.grid.node_at(abstract[0])]
+        for node, following in zip(abstract, abstract[1:]):
+            key = self.cluster_of(node)
+            if key != self.cluster_of(following):
+                path.append(self.grid.node_at(following))
+                continue
+            cluster = self._cluster(key)
+            segment = cluster.segments.get((node, following))
+            if segment is None:
+                result = dijkstra(cluster.sub, self._local(cluster, node), self._local(cluster, following), diagonals=self.diagonals)
+                segment = [(row + cluster.top, column + cluster.left) for row, column in result.path[1:]]
+                if node in cluster.links and following in cluster.links:
+                    cluster.segments[(node, following)] = segment
+            path += segment
+        return path
+
+def hierarchy(grid, diagonals=False, cluster_size=CLUSTER_SIZE):
+    key = ('hpa', bool(diagonals), cluster_size)
+    if key not in grid.indexes:
+        grid.indexes[key] = Hierarchy(grid, diagonals, cluster_size)
+    return grid.indexes[key]
+
+def search(grid, start_point, goal_node, diagonals=False, observer=None, cluster_size=CLUSTER_SIZE):
+    return hierarchy(grid, diagonals, cluster_size).search(start_point, goal_node, observer)
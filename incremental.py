@@ -0,0 +1,191 @@
+import time
+from math import inf
+from engine import SearchResult, moves
+from priority_queue import IndexedHeap
+import heuristics
+from metrics import Metrics
+
+# D* Lite (Koenig & Likhachev) over the padded flat grid. The search is rooted
+# at one endpoint and keeps g/rhs values between calls, so wall and mud edits
+# and moves of the other endpoint (the head) only repair what they affect.
+#
+# The root is the goal to begin with. If the root itself is dragged while the
+# head stays put, the planner re-roots once at the head and then the dragged
+# endpoint is the cheap one to move. With the root at the start the search
+# runs forwards, so a step x <- y costs the length times the cost of x rather
+# than of y.
+#
+# The heuristic is heuristics' default for the moves, scaled by the smallest
+# cost on the grid when the search starts. An edit that brings a cost below
+# that scale would let it overestimate, so it starts the search again.
+
+class Planner():
+    def __init__(self, grid, diagonals=False, heuristic=True):
+        self.grid = grid
+        self.diagonals = diagonals
+        self.heuristic = heuristic
+        self.width = grid.columns + 2
+        self.steps = moves(self.width, diagonals)
+        self.root = None
+        self.head = None
+        self.forward_root = False
+        self.scale = 0
+        grid.subscribe(self.cell_changed)
+        self._reset()
+
+    def close(self):
+        self.grid.unsubscribe(self.cell_changed)
+
+    def _reset(self):
+        self.cost = list(self.grid.flat_costs()[1])
+        self.g = {}
+        self.rhs = {}
+        self.queue = IndexedHeap(len(self.cost))
+        self.km = 0
+        self.changed = set()
+        self.stale = False
+        self.expanded = 0
+        self.pushes = 0
+        self.peak_open = 0
+
+    def cell_changed(self, node):
+        if node is None or self.grid.cost[node] < self.scale:
+            self.stale = True
+        else:
+            self.changed.add(self.grid.node_id(node))
+
+    def _step_cost(self, node, nearer, length):
+        # Cost of the step between node and its neighbour nearer the root,
+        # travelled in the direction of the actual path.
+        if self.cost[node] == inf or self.cost[nearer] == inf:
+            return inf
+        return length * (self.cost[node] if self.forward_root else self.cost[nearer])
+
+    def _key(self, node):
+        best = min(self.g.get(node, inf), self.rhs.get(node, inf))
+        return (best + self.estimate(self.head, node) + self.km, best)
+
+    def _update_vertex(self, node):
+        if node != self.root:
+            best = inf
+            g = self.g
+            for step, length in self.steps:
+                neighbour = node + step
+                candidate = self._step_cost(node, neighbour, length) + g.get(neighbour, inf)
+                if candidate < best:
+                    best = candidate
+            self.rhs[node] = best
+        self.queue.remove(node)
+        if self.g.get(node, inf) != self.rhs.get(node, inf):
+            self.queue.push(self._key(node), node)
+            self.pushes += 1
+            if len(self.queue) > self.peak_open:
+                self.peak_open = len(self.queue)
+
+    def _compute(self):
+        queue, g, rhs, head = self.queue, self.g, self.rhs, self.head
+        while len(queue) and (queue.peek()[0] < self._key(head) or rhs.get(head, inf) != g.get(head, inf)):
+            old_key, node = queue.peek()
+            new_key = self._key(node)
+            if old_key < new_key:
+                queue.remove(node)
+                queue.push(new_key, node)
+                continue
+            queue.pop()
+            self.expanded += 1
+            if g.get(node, inf) > rhs.get(node, inf):
+                g[node] = rhs[node]
+                for step, length in self.steps:
+                    if self.cost[node + step] != inf:
+                        self._update_vertex(node + step)
+            else:
+                g[node] = inf
+                self._update_vertex(node)
+                for step, length in self.steps:
+                    if self.cost[node + step] != inf:
+                        self._update_vertex(node + step)
+
+    def _start_search(self, root, head, forward_root):
+        self._reset()
+        self.root = root
+        self.head = head
+        self.forward_root = forward_root
+        if self.heuristic:
+            self.scale = self.grid.min_cost()
+            self.estimate = heuristics.estimator(self.grid, diagonals=self.diagonals, scale=self.scale)
+        else:
+            self.estimate = lambda a, b: 0
+        self.rhs[root] = 0
+        self.queue.push(self._key(root), root)
+
+    def _apply_changes(self):
+        cost = self.cost
+        flat = self.grid.cost
+        for node in self.changed:
+            row, column = self.grid.node_at(node)
+            cost[node] = float(flat[row, column])
+        for node in self.changed:
+            self._update_vertex(node)
+            for step, length in self.steps:
+                if cost[node + step] != inf:
+                    self._update_vertex(node + step)
+        self.changed = set()
+
+    def _move_head(self, head):
+        if head != self.head:
+            self.km += self.estimate(self.head, head)
+            self.head = head
+
+    def plan(self, start_point, goal_node):
+        start = time.perf_counter()
+        source = self.grid.node_id(start_point)
+        target = self.grid.node_id(goal_node)
+        self.expanded = self.pushes = self.peak_open = 0
+
+        if self.stale or self.root is None:
+            self._start_search(target, source, False)
+        elif self.root == target and not self.forward_root:
+            self._move_head(source)
+        elif self.root == source and self.forward_root:
+            self._move_head(target)
+        elif self.head == source:
+            # the root moved but the head did not: root the search at the head
+            self._start_search(source, target, True)
+        else:
+            # the start moved off a forward root, or both endpoints moved
+            self._start_search(target, source, False)
+
+        if self.changed:
+            self._apply_changes()
+        self._compute()
+
+        stats = Metrics(expanded=self.expanded, pushes=self.pushes, peak_open=self.peak_open, settled=len(self.g))
+        finished = stats.end_search(start)
+        distance = self.g.get(self.head, inf)
+        if distance == inf:
+            return SearchResult(False, [], inf, stats)
+
+        path = self._walk()
+        if self.forward_root:
+            path.reverse()
+        path = [self.grid.node_at(node) for node in path]
+        stats.end_path(finished)
+        return SearchResult(True, path, distance, stats)
+
+    def _walk(self):
+        node = self.head
+        path = [node]
+        g = self.g
+        while node != self.root:
+            best, following = inf, None
+            for step, length in self.steps:
+                neighbour = node + step
+                candidate = self._step_cost(node, neighbour, length) + g.get(neighbour, inf)
+                if candidate < best:
+                    best, following = candidate, neighbour
+            node = following
+            path.append(node)
+        return path
+
+    def settled_nodes(self):
+        return [self.grid.node_at(node) for node, value in self.g.items() if value != inf]
@@ -0,0 +1,210 @@
+import time
+from math import inf
+from engine import SearchResult, dijkstra
+from priority_queue import IndexedHeap
+import heuristics
+from metrics import Metrics
+
+# Jump Point Search over the padded flat grid (see Grid.flat_costs). Only valid
+# when every passable cell costs the same; search() falls back to A* otherwise.
+#
+# 8-connected moves follow Harabor & Grastien: diagonal moves may cut corners,
+# the same as dijkstra(diagonals=True). The 4-connected variant prefers
+# horizontal-then-vertical paths: a horizontal move keeps both vertical
+# neighbours, a vertical move only keeps a horizontal neighbour when the cell
+# behind it is blocked, and horizontal jumps stop wherever a vertical jump
+# would find something.
+
+class _Jumper():
+    def __init__(self, width, passable, goal):
+        self.width = width
+        self.passable = passable
+        self.goal = goal
+        self.scanned = 0
+
+    def straight4(self, node, dr):
+        width, passable, goal = self.width, self.passable, self.goal
+        step = dr * width
+        while True:
+            node += step
+            self.scanned += 1
+            if not passable[node]:
+                return None
+            if node == goal:
+                return node
+            for side in (1, -1):
+                if passable[node + side] and not passable[node - step + side]:
+                    return node
+
+    def across4(self, node, dc):
+        passable, goal = self.passable, self.goal
+        while True:
+            node += dc
+            self.scanned += 1
+            if not passable[node]:
+                return None
+            if node == goal:
+                return node
+            if self.straight4(node, 1) is not None or self.straight4(node, -1) is not None:
+                return node
+
+    def straight8(self, node, dr, dc):
+        width, passable, goal = self.width, self.passable, self.goal
+        step = dr * width + dc
+        side = width if dc else 1
+        while True:
+            node += step
+            self.scanned += 1
+            if not passable[node]:
+                return None
+            if node == goal:
+                return node
+            if (passable[node + side + step] and not passable[node + side]) or \
+               (passable[node - side + step] and not passable[node - side]):
+                return node
+
+    def diagonal8(self, node, dr, dc):
+        width, passable, goal = self.width, self.passable, self.goal
+        step = dr * width + dc
+        while True:
+            node += step
+            self.scanned += 1
+            if not passable[node]:
+                return None
+            if node == goal:
+                return node
+            if (passable[node + dr * width - dc] and not passable[node - dc]) or \
+               (passable[node - dr * width + dc] and not passable[node - dr * width]):
+                return node
+            if self.straight8(node, dr, 0) is not None or self.straight8(node, 0, dc) is not None:
+                return node
+
+def _sign(value):
+    # int() first, since numpy bools do not subtract.
+    return int(value > 0) - int(value < 0)
+
+def _directions4(width, passable, node, parent):
+    if parent is None:
+        return ((1, 0), (-1, 0), (0, 1), (0, -1))
+    pr, pc = divmod(parent, width)
+    nr, nc = divmod(node, width)
+    dr, dc = _sign(nr - pr), _sign(nc - pc)
+    if dc:
+        return ((0, dc), (1, 0), (-1, 0))
+    directions = [(dr, 0)]
+    for side in (1, -1):
+        if passable[node + side] and not passable[node - dr * width + side]:
+            directions.append((0, side))
+    return directions
+
+def _directions8(width, passable, node, parent):
+    if parent is None:
+        return ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+    pr, pc = divmod(parent, width)
+    nr, nc = divmod(node, width)
+    dr, dc = _sign(nr - pr), _sign(nc - pc)
+    directions = []
+    if dr and dc:
+        directions += [(dr, 0), (0, dc), (dr, dc)]
+        if not passable[node - dc]:
+            directions.append((dr, -dc))
+        if not passable[node - dr * width]:
+            directions.append((-dr, dc))
+    elif dr:
+        directions.append((dr, 0))
+        for side in (1, -1):
+            if not passable[node + side]:
+                directions.append((dr, side))
+    else:
+        directions.append((0, dc))
+        for side in (1, -1):
+            if not passable[node + side * width]:
+                directions.append((side, dc))
+    return directions
+
+def _expand_path(grid, width, jump_points):
+    # Consecutive jump points always lie on one straight or diagonal line.
+    path = [grid.node_at(jump_points[0])]
+    for a, b in zip(jump_points, jump_points[1:]):
+        ar, ac = divmod(a, width)
+        br, bc = divmod(b, width)
+        dr, dc = _sign(br - ar), _sign(bc - ac)
+        while (ar, ac) != (br, bc):
+            ar += dr
+            ac += dc
+            path.append((ar - 1, ac - 1))
+    return path
+
+def search(grid, start_point, goal_node, diagonals=False, observer=None):
+    unit = grid.uniform_cost()
+    if unit is None:
+        result = dijkstra(grid, start_point, goal_node, diagonals=diagonals, astar=True, observer=observer)
+        result.stats['mode'] = 'astar'
+        return result
+
+    start = time.perf_counter()
+    width, cost = grid.flat_costs()
+    passable = grid.flat_passable()
+    source = grid.node_id(start_point)
+    target = grid.node_id(goal_node)
+    jumper = _Jumper(width, passable, target)
+    directions = _directions8 if diagonals else _directions4
+    # Steps between two cells with no obstacle between them, which is what
+    # consecutive jump points are, as well as the estimate to the goal.
+    steps = heuristics.estimator(grid, diagonals=diagonals, scale=1)
+
+    queue = IndexedHeap(len(cost))
+    queue.push((unit * steps(source, target), 0), source)
+    distances = {source: 0}
+    parents = {source: None}
+    closed = set()
+    generated = pushes = 0
+    peak_open = 1
+
+    while len(queue) > 0:
+        priority, current_node = queue.pop()
+        current_distance = distances[current_node]
+        closed.add(current_node)
+        if current_node == target:
+            break
+        if observer and current_node != source:
+            observer('visit', grid.node_at(current_node))
+
+        for dr, dc in directions(width, passable, current_node, parents[current_node]):
+            if diagonals:
+                if dr and dc:
+                    jump_point = jumper.diagonal8(current_node, dr, dc)
+                else:
+                    jump_point = jumper.straight8(current_node, dr, dc)
+            elif dr:
+                jump_point = jumper.straight4(current_node, dr)
+            else:
+                jump_point = jumper.across4(current_node, dc)
+            if jump_point is None or jump_point in closed:
+                continue
+            generated += 1
+            distance = current_distance + unit * steps(current_node, jump_point)
+            if distance < distances.get(jump_point, inf):
+                pushes += 1
+                distances[jump_point] = distance
+                parents[jump_point] = current_node
+                heuristic = unit * steps(jump_point, target)
+                queue.push((distance + heuristic, -distance), jump_point)
+        if len(queue) > peak_open:
+            peak_open = len(queue)
+
+    stats = Metrics(expanded=len(closed), generated=generated, pushes=pushes + 1, peak_open=peak_open, scanned=jumper.scanned, mode='jps')
+    finished = stats.end_search(start)
+    if target not in closed:
+        return SearchResult(False, [], inf, stats)
+
+    jump_points = [target]
+    while parents[jump_points[-1]] is not None:
+        jump_points.append(parents[jump_points[-1]])
+    jump_points.reverse()
+    path = _expand_path(grid, width, jump_points)
+    stats.end_path(finished)
+    if observer:
+        for node in path:
+            observer('path', node)
+    return SearchResult(True, path, distances[target], stats)
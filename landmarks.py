@@ -0,0 +1,139 @@
+from collections import OrderedDict
+from math import inf
+import numpy as np
+import components
+from engine import sweep
+
+# ALT heuristics (A*, landmarks and the triangle inequality; Goldberg and
+# Harrelson). A few landmark cells each keep a table of their distance to
+# every cell, from one Dijkstra sweep. Since d(L, t) <= d(L, n) + d(n, t) for
+# any landmark L, d(L, t) - d(L, n) never overestimates the cost from n to t,
+# and neither does d(n, L) - d(t, L). The heuristic is the largest such bound
+# over all landmarks. On mazes, where the Manhattan distance is far below the
+# true cost, it keeps A* close to the path.
+#
+# A straight step pays the cost of the cell it enters, so on a 4-connected
+# grid a path and its reverse differ by the costs of their ends and
+# d(n, L) = d(L, n) + cost(L) - cost(n): the forward table gives both bounds.
+# Diagonal steps weight the cells differently each way, so with diagonals
+# every landmark gets a second, reverse sweep.
+#
+# Landmarks are picked farthest first: the first is the cell farthest from a
+# cell of the largest component, and each next one the cell farthest from all
+# landmarks so far. Each landmark holds two float64 tables over the padded
+# flat ids, so max_bytes caps how many there are. They are kept per grid and diagonals setting in
+# grid.indexes. An edit that only raises costs leaves every bound admissible
+# and consistent, just looser, so the tables are kept; one that lowers a cost
+# marks them stale, and they are rebuilt when next used.
+
+LANDMARKS = 8
+MAX_BYTES = 64 * 2**20
+MAX_GOALS = 4
+
+class Landmarks():
+    def __init__(self, grid, diagonals=False, count=LANDMARKS, max_bytes=MAX_BYTES):
+        self.grid = grid
+        self.diagonals = diagonals
+        self.count = count
+        self.max_bytes = max_bytes
+        self.nodes = []
+        self.tables = None
+        self.backward = None
+        self.cost = None
+        self.goals = OrderedDict()
+        self.builds = 0
+        grid.subscribe(self.cell_changed)
+
+    def close(self):
+        self.grid.unsubscribe(self.cell_changed)
+
+    @property
+    def nbytes(self):
+        return self.tables.nbytes + self.backward.nbytes if self.tables is not None else 0
+
+    def cell_changed(self, node):
+        if self.tables is None:
+            return
+        if node is None:
+            lowered = bool(np.any(np.pad(self.grid.cost, 1, constant_values=inf).ravel() < self.cost))
+        else:
+            lowered = self.grid.cost[node] < self.cost[self.grid.node_id(node)]
+        if lowered:
+            self.tables = None
+            self.goals.clear()
+
+    def _table(self, node_id, reverse=False):
+        distances = sweep(self.grid, self.grid.node_at(node_id), self.diagonals, reverse=reverse)[0]
+        table = np.full(self.cost.size, inf)
+        table[list(distances)] = list(distances.values())
+        return table
+
+    def build(self):
+        # Picks the landmarks and sweeps their tables, unless they are current.
+        if self.tables is not None:
+            return
+        grid = self.grid
+        self.cost = np.pad(grid.cost.astype(np.float64), 1, constant_values=inf).ravel()
+        size = self.cost.size
+        count = min(self.count, self.max_bytes // (size * 16))
+        self.nodes = []
+        tables = []
+        reverse = []
+        labels = components.index(grid, self.diagonals)
+        labels.build()
+        open_labels = labels.labels[labels.labels >= 0]
+        if count > 0 and open_labels.size:
+            values, sizes = np.unique(open_labels, return_counts=True)
+            seed = int(np.flatnonzero(labels.labels == values[sizes.argmax()])[0])
+            nearest = self._table(seed)
+            for landmark in range(count):
+                reached = np.isfinite(nearest)
+                farthest = int(np.flatnonzero(reached)[nearest[reached].argmax()])
+                if tables and nearest[farthest] == 0:
+                    break
+                table = self._table(farthest)
+                self.nodes.append(farthest)
+                tables.append(table)
+                if self.diagonals:
+                    reverse.append(self._table(farthest, reverse=True))
+                nearest = table if landmark == 0 else np.minimum(nearest, table)
+        # Unreached cells are nan, which fmax passes over. backward holds
+        # d(n, L), less cost(L) when it comes from the forward table, which
+        # cancels out of the bound.
+        tables = np.array(tables).reshape(len(tables), size)
+        tables[~np.isfinite(tables)] = np.nan
+        if self.diagonals:
+            backward = np.array(reverse).reshape(len(reverse), size)
+            backward[~np.isfinite(backward)] = np.nan
+        else:
+            backward = tables - self.cost
+        self.tables = tables
+        self.backward = backward
+        self.goals.clear()
+        self.builds += 1
+
+    def heuristic(self, goal_node):
+        # Estimates of the cost to goal_node for every padded flat id, as a
+        # list for engine.dijkstra. The last few goals are kept.
+        self.build()
+        goal = self.grid.node_id(goal_node)
+        estimates = self.goals.get(goal)
+        if estimates is None:
+            tables, backward = self.tables, self.backward
+            bounds = np.fmax(tables[:, goal:goal + 1] - tables, backward - backward[:, goal:goal + 1])
+            estimates = np.fmax.reduce(bounds, axis=0, initial=0).tolist()
+            self.goals[goal] = estimates
+            while len(self.goals) > MAX_GOALS:
+                self.goals.popitem(last=False)
+        self.goals.move_to_end(goal)
+        return estimates
+
+def index(grid, diagonals=False):
+    indexes = grid.indexes.setdefault('landmarks', {})
+    key = bool(diagonals)
+    if key not in indexes:
+        indexes[key] = Landmarks(grid, diagonals)
+    return indexes[key]
+
+def heuristic(grid, goal_node, diagonals=False):
+    return index(grid, diagonals).heuristic(goal_node)
@@ -1,24 +1,24 @@
 import pygame
+import sys
 import time
-from priority_queue import PrioritySet, PriorityQueue, AStarQueue
-from math import inf
 import random
-from collections import deque
-
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-GREEN = (0, 255, 0)
-RED = (255, 0, 0)
-BLUE = (0, 0, 255)
-LIGHT_BLUE = (0, 111, 255)
-ORANGE = (255, 128, 0)
-PURPLE = (128, 0, 255)
-YELLOW = (255, 255, 0)
-GREY = (143, 143, 143)
-BROWN = (186, 127, 50)
-DARK_GREEN = (0, 128, 0)
-DARKER_GREEN = (0, 50, 0)
-DARK_BLUE = (0, 0, 128)
+import numpy as np
+from node import BLACK, WHITE, GREY, ORANGE
+from grid import Grid, BLANK, START, END, DORMANT
+import engine
+import terrain
+import maps
+import incremental
+import fields
+import heuristics
+import components
+import flow
+import solvers
+import playback
+import worker
+from metrics import Metrics, JsonLines
+from cache import PathCache
+from renderer import GridRenderer
 
 class Button():
     def __init__(self, color, x, y, width, height, text=''):
@@ -47,67 +47,19 @@ class Button():
             
         return False
 
-class Node():
-
-    nodetypes = ['blank', 'start', 'end', 'wall', 'mud', 'dormant']
-
-    colors = {  'regular': {'blank': WHITE, 'start': RED, 'end': LIGHT_BLUE, 'wall': BLACK, 'mud': BROWN, 'dormant': GREY},
-                'visited': {'blank': GREEN, 'start': RED, 'end': LIGHT_BLUE, 'wall': BLACK, 'mud': DARK_GREEN, 'dormant': GREY},
-                'path': {'blank': BLUE, 'start': RED, 'end': LIGHT_BLUE, 'wall': BLACK, 'mud': DARK_BLUE, 'dormant': GREY}
-            }
-
-    distance_modifiers = {'blank': 1, 'start': 1, 'end': 1, 'wall': inf, 'mud': 3, 'dormant': inf}
-
-    def __init__(self, nodetype, text='', colors=colors, dmf=distance_modifiers):
-        self.nodetype = nodetype
-        self.rcolor = colors['regular'][self.nodetype]
-        self.vcolor = colors['visited'][self.nodetype]
-        self.pcolor = colors['path'][self.nodetype]
-        self.is_visited = True if nodetype == 'start' else True if nodetype == 'end' else False
-        self.is_path = True if nodetype == 'start' else True if nodetype == 'end' else False
-        self.distance_modifier = dmf[self.nodetype]
-        self.color = self.pcolor if self.is_path else self.vcolor if self.is_visited else self.rcolor
-
-    def update(self, nodetype=False, is_visited='unchanged', is_path='unchanged', colors=colors, dmf=distance_modifiers, nodetypes=nodetypes):
-        if nodetype:
-            assert nodetype in nodetypes, f"nodetype must be one of: {nodetypes}"
-            if (self.nodetype == ('start' or 'end')) and (nodetype == ('wall' or 'mud')):
-                pass
-            else:
-                self.nodetype = nodetype        
-
-        if is_visited != 'unchanged':
-            assert type(is_visited) == bool, "'is_visited' must be boolean: True or False" 
-            self.is_visited = is_visited
-
-        if is_path != 'unchanged':
-            assert type(is_path) == bool, "'is_path' must be boolean: True or False" 
-            self.is_path = is_path
-
-        self.rcolor = colors['regular'][self.nodetype]
-        self.vcolor = colors['visited'][self.nodetype]
-        self.pcolor = colors['path'][self.nodetype]
-        self.distance_modifier = dmf[self.nodetype]
-        self.color = self.pcolor if self.is_path else self.vcolor if self.is_visited else self.rcolor
-
 WIDTH = 6
 HEIGHT = WIDTH
 BUTTON_HEIGHT = 40
 MARGIN = 0
 
-grid = []
 ROWS = 90
-
-for row in range(ROWS):
-    grid.append([])
-    for column in range(ROWS):
-        grid[row].append(Node('blank')) 
+grid = Grid(ROWS)
 
 START_POINT = (random.randrange(2,ROWS-1,2)-1,random.randrange(2,ROWS-1,2)-1)
 END_POINT = (random.randrange(2,ROWS-1,2),random.randrange(2,ROWS-1,2))
 
-grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-grid[END_POINT[0]][END_POINT[1]].update(nodetype='end')
+grid.set(START_POINT, 'start')
+grid.set(END_POINT, 'end')
 
 DIAGONALS = False
 VISUALISE = True
@@ -117,9 +69,46 @@ drag_end_point = False
 
 path_found = False
 algorithm_run = False
+planner = None
+dragged_path = None
+path_cache = PathCache()
+player = None
+job = None
+job_finished = None
+playback_speed = playback.SPEED
+
+# Set to an int to make every generated maze and terrain the same. Otherwise
+# each gets a fresh seed, printed so a layout can be made again.
+MAZE_SEED = None
+# 'noise' lays whole noise maps of several terrain classes, 'patches' grows
+# random mud patches.
+TERRAIN_MODE = 'noise'
+# S saves the grid here and O opens it again.
+MAP_FILE = 'saved.grid'
+# The A* button runs this: 'astar' with the Manhattan distance (octile with
+# diagonals), or 'alt' with bounds from landmark distance tables, which hold
+# much tighter in mazes.
+ASTAR = 'astar'
+# F scatters this many agents and walks them to the end along its flow field.
+AGENTS = 300
+AGENT_COLOR = ORANGE
+FLOW_COLOR = GREY
+
+SHOW_HUD = True
+METRICS_LOG = None
+metrics_log = JsonLines(METRICS_LOG) if METRICS_LOG else None
+last_metrics = None
+last_label = ''
+hud_rect = None
+hud_dirty = False
+crowd = None
+crowd_done = False
+flow_overlay = None
+overlay_flow = None
 
 pygame.init()
 FONT = pygame.font.SysFont('arial', 6)
+HUD_FONT = pygame.font.SysFont('arial', 12)
 
 SCREEN_WIDTH = ROWS * (WIDTH + MARGIN) + MARGIN * 2
 SCREEN_HEIGHT = SCREEN_WIDTH + BUTTON_HEIGHT * 3
@@ -140,131 +129,497 @@ visToggleButton = Button(GREY, SCREEN_WIDTH/3, SCREEN_WIDTH + BUTTON_HEIGHT*2, S
 pygame.display.set_caption("Pathfinder")
 done = False
 clock = pygame.time.Clock()
+sys.setswitchinterval(worker.SWITCH_INTERVAL)
+
+renderer = GridRenderer(grid, screen, WIDTH, HEIGHT, MARGIN, background=BLACK)
+
+def show_status():
+    if job is not None:
+        pygame.display.set_caption(f"Pathfinder - running {job.label} ({job.events} events)")
+    elif player is None:
+        pygame.display.set_caption("Pathfinder")
+    else:
+        paused = " (paused)" if player.paused else ""
+        pygame.display.set_caption(f"Pathfinder - {player.speed} nodes/frame{paused}")
+
+def play(trace, view, final_grid):
+    # Replays trace onto view a few events per frame, then shows final_grid.
+    global player
+    def finished(player):
+        renderer.set_grid(final_grid)
+        print(f"Drew {len(player.codes)} events in {player.frames} frames ({player.elapsed:.2f} seconds).")
+    renderer.set_grid(view)
+    player = playback.Player(trace, view, speed=playback_speed, on_finish=finished, final=final_grid)
+    show_status()
+
+def finish_playback():
+    global player
+    if player is not None:
+        player.finish()
+        player = None
+        show_status()
+
+def save_map():
+    maps.save(grid, MAP_FILE)
+    print(f"Saved the grid to {MAP_FILE}.")
+
+def open_map():
+    # Returns the saved grid, or None when it does not fit this window or has
+    # no start and end. The cells are copied out of the file, so saving again
+    # never writes under a live mapping.
+    try:
+        header = maps.read_header(MAP_FILE)
+    except FileNotFoundError:
+        print(f"No saved grid at {MAP_FILE}.")
+        return None
+    if header['shape'] != grid.shape or header['start'] is None or header['end'] is None:
+        print(f"{MAP_FILE} is {header['shape'][0]}x{header['shape'][1]}; this window needs a {grid.rows}x{grid.columns} grid with a start and end.")
+        return None
+    print(f"Opened {MAP_FILE}.")
+    return Grid.from_cells(np.array(maps.open_cells(MAP_FILE)))
+
+def start_job(new_job, finished):
+    # Runs new_job in the background in place of any job still running.
+    # poll_job calls finished(value, trace, seconds) when it is done.
+    global job, job_finished
+    cancel_job()
+    job, job_finished = new_job.start(), finished
+    show_status()
+
+def cancel_job():
+    # Stops the running job, if any, before the grid it reads is changed.
+    global job
+    if job is not None:
+        if job.running:
+            job.cancel()
+            print(f"Cancelled {job.label} after {job.events} events.")
+        job = None
+        show_status()
+
+def poll_job():
+    global job
+    if job is None:
+        return
+    for kind, value in job.poll():
+        if kind == 'progress':
+            show_status()
+        elif kind in ('done', 'failed'):
+            job = None
+            show_status()
+            if kind == 'failed':
+                raise value
+            job_finished(*value)
+
+def generate(generator, *args, view):
+    # Generators run on grids of their own and the finished grid replaces
+    # the current one. view is a copy of the grid as the generator starts
+    # from it.
+    seed = MAZE_SEED if MAZE_SEED is not None else random.randrange(2**32)
+    visualise = VISUALISE
+    def finished(value, trace, seconds):
+        global grid
+        grid = value
+        if visualise:
+            play(trace, view, grid)
+        else:
+            renderer.set_grid(grid)
+        print(f"Generated in {seconds:.4f} seconds with seed {seed}.")
+        record_metrics(Metrics(search_time=seconds, time=seconds), generator.__name__)
+    start_job(worker.Job(generator, *args, seed=seed), finished)
+
+def report(result, label=''):
+    stats = result.stats
+    num_visited = max(stats['expanded'], 1)
+    print(f"Program finished in {stats['time']:.4f} seconds after checking {num_visited} nodes. That is {stats['time']/num_visited:.8f} seconds per node.")
+    record_metrics(stats, label)
+
+def record_metrics(stats, label):
+    # The HUD shows the latest run; its render time keeps counting while it
+    # is drawn, so a run is only logged once the next one replaces it.
+    global last_metrics, last_label, hud_dirty
+    if metrics_log and last_metrics is not None:
+        metrics_log.write(last_metrics, run=last_label)
+    last_metrics, last_label, hud_dirty = stats, label, True
+
+def current_flow():
+    return flow.flow_field(grid, END_POINT, DIAGONALS)
+
+def toggle_crowd():
+    global crowd, crowd_done
+    if crowd is not None:
+        crowd = None
+        update_gui(draw_buttons=False)
+        return
+    crowd = flow.Agents.scatter(current_flow(), AGENTS)
+    crowd_done = False
+    print(f"Walking {len(crowd)} agents to the end along its flow field.")
+
+def draw_flow(rects, whole=False):
+    # Draws a short line from each cell towards its next cell, over the
+    # screen rectangles the renderer just drew. The lines are drawn once per
+    # flow field onto a transparent surface and copied from there. Returns
+    # the whole grid's rectangle when all of it was drawn.
+    global flow_overlay, overlay_flow
+    field = current_flow()
+    if overlay_flow is not field:
+        flow_overlay = pygame.Surface(renderer.size, pygame.SRCALPHA)
+        steps = field.directions()
+        for row, column in np.argwhere(steps.any(axis=-1)):
+            rect = renderer.cell_rect(row, column)
+            row_step, column_step = steps[row, column]
+            end = (rect.centerx + column_step * (rect.width // 2), rect.centery + row_step * (rect.height // 2))
+            pygame.draw.line(flow_overlay, FLOW_COLOR, rect.center, end)
+        overlay_flow = field
+        whole = True
+    if whole:
+        rects = [pygame.Rect(renderer.origin, renderer.size)]
+    for rect in rects:
+        screen.blit(flow_overlay, rect, rect.move(-renderer.origin[0], -renderer.origin[1]))
+    return rects if whole else []
+
+def draw_agents():
+    # Agents are painted straight onto their cells, which the renderer
+    # repaints from the grid on the next frame.
+    return [renderer.paint(node, AGENT_COLOR) for node in crowd.nodes()]
+
+def step_crowd():
+    global crowd_done
+    field = current_flow()
+    crowd.step(field)
+    arrived = crowd.arrived(field)
+    if arrived == len(crowd) and not crowd_done:
+        print(f"All {arrived} agents arrived after {crowd.steps} steps.")
+    crowd_done = arrived == len(crowd)
+
+def draw_hud():
+    # Puts the grid back under the old overlay, then draws the new one.
+    # Returns the screen rectangles touched.
+    global hud_rect, hud_dirty
+    touched = []
+    if hud_rect is not None:
+        screen.blit(renderer.surface, hud_rect, hud_rect)
+        touched.append(hud_rect)
+        hud_rect = None
+    if SHOW_HUD and last_metrics is not None:
+        lines = [HUD_FONT.render(line, True, WHITE) for line in [last_label] + last_metrics.lines() if line]
+        hud_rect = pygame.Rect(4, 4, max(line.get_width() for line in lines) + 8, sum(line.get_height() for line in lines) + 8)
+        panel = pygame.Surface(hud_rect.size)
+        panel.set_alpha(190)
+        panel.fill(BLACK)
+        screen.blit(panel, hud_rect)
+        y = hud_rect.y + 4
+        for line in lines:
+            screen.blit(line, (hud_rect.x + 4, y))
+            y += line.get_height()
+        touched.append(hud_rect)
+    hud_dirty = False
+    return touched
+
+def mark_visited(event, node):
+    if event == 'visit':
+        grid.mark_visited(*node)
+    elif event == 'layer':
+        grid.mark_visited(node[:, 0], node[:, 1])
+
+def run_algorithm(algorithm, visualise=True):
+    # Starts algorithm in the background. Visualised runs are played back
+    # when it finishes; otherwise its visited cells and path are shown at
+    # once.
+    def finished(result, trace, seconds):
+        global path_found, algorithm_run
+        if visualise:
+            play(trace, grid, grid)
+        else:
+            playback.Player(trace, grid).finish()
+        report(result, algorithm)
+        path_found, algorithm_run = result.found, algorithm
+    solve = solvers.solve if visualise else path_cache.solve
+    start_job(worker.Job(solve, grid, algorithm, START_POINT, END_POINT, diagonals=DIAGONALS, label=algorithm), finished)
+
+def solve_now(algorithm):
+    result = path_cache.solve(grid, algorithm, START_POINT, END_POINT, diagonals=DIAGONALS, observer=mark_visited)
+    grid.mark_path(result.path)
+    report(result, algorithm)
+    return result.found
+
+def clear_visited():
+    dormant = grid.cells == DORMANT
+    if dormant.any():
+        grid.cells[dormant] = BLANK
+        grid.refresh()
+    grid.clear_search()
+    update_gui(draw_background=False, draw_buttons=False)
+
+def reset_grid():
+    grid.cells[(grid.cells != START) & (grid.cells != END)] = BLANK
+    grid.refresh()
+    grid.clear_search()
+
+def update_path():
+
+    if algorithm_run in ('dijkstra', 'astar') and (drag_start_point or drag_end_point):
+        return drag_path()
+
+    clear_visited()
+
+    valid_algorithms = ['dijkstra', 'astar', 'dfs', 'bfs', 'alt']
+
+    assert algorithm_run in valid_algorithms, f"last algorithm used ({algorithm_run}) is not in valid algorithms: {valid_algorithms}"
+
+    if not components.connected(grid, START_POINT, END_POINT, DIAGONALS):
+        # Walled off: nothing to search.
+        path_found = False
+        record_metrics(Metrics(mode='components'), f"{algorithm_run} (no path)")
+    elif algorithm_run in ('dijkstra', 'astar'):
+        result = get_planner(algorithm_run).plan(START_POINT, END_POINT)
+        settled = planner.settled_nodes()
+        if settled:
+            grid.mark_visited(*np.array(settled).T)
+        grid.mark_path(result.path)
+        path_found = result.found
+        record_metrics(result.stats, f"{algorithm_run} (replanned)")
+    else:
+        path_found = solve_now(algorithm_run)
+    update_gui(draw_background=False, draw_buttons=False)
+    return path_found
+
+def drag_field():
+    # While an endpoint is dragged the other one stays put, so keep a distance
+    # field rooted at the fixed endpoint. Returns it with the moving endpoint.
+    if drag_end_point:
+        return fields.field(grid, START_POINT, DIAGONALS), END_POINT
+    return fields.field(grid, END_POINT, DIAGONALS, reverse=True), START_POINT
+
+def drag_path():
+    # Runs on every move of a dragged endpoint, so it only walks the field's
+    # parents and swaps the old path for the new one, in time proportional to
+    # their length. The cells the search would have expanded are shaded once
+    # the drag ends.
+    global dragged_path
+    if dragged_path is None:
+        clear_visited()
+    else:
+        grid.mark_path(dragged_path, marked=False)
+    field, moving = drag_field()
+    result = field.path(moving)
+    grid.mark_path(result.path)
+    dragged_path = result.path
+    record_metrics(result.stats, f"{algorithm_run} (distance field)")
+    update_gui(draw_background=False, draw_buttons=False)
+    return result.found
+
+def end_drag():
+    # Shades the cells the search would have expanded, read off the field:
+    # those no further from the fixed endpoint than the path, plus the
+    # heuristic for A*.
+    global dragged_path
+    if dragged_path is None:
+        return
+    dragged_path = None
+    field, moving = drag_field()
+    expanded = field.array()
+    if algorithm_run == 'astar':
+        estimates = heuristics.table(grid, moving, diagonals=DIAGONALS).reshape(grid.rows + 2, -1)
+        expanded = expanded + estimates[1:-1, 1:-1]
+    shaded = np.isfinite(expanded) & (expanded <= field.distance(moving))
+    grid.touch(*np.nonzero(shaded != grid.visited))
+    grid.visited[:] = shaded
+    update_gui(draw_background=False, draw_buttons=False)
+
+def get_planner(algorithm):
+    global planner
+    heuristic = algorithm == 'astar'
+    if planner is None or planner.grid is not grid or planner.diagonals != DIAGONALS or planner.heuristic != heuristic:
+        if planner is not None:
+            planner.close()
+        planner = incremental.Planner(grid, diagonals=DIAGONALS, heuristic=heuristic)
+    return planner
+
+def update_gui(draw_background=True, draw_buttons=True, draw_grid=True):
+    global hud_dirty
+
+    if draw_background:
+        screen.fill(BLACK)
+
+    if draw_buttons:
+        visToggleButton = Button(GREY, SCREEN_WIDTH/3, SCREEN_WIDTH + BUTTON_HEIGHT*2, SCREEN_WIDTH/3, BUTTON_HEIGHT, f"Visualise: {str(VISUALISE)}")
+        dijkstraButton.draw(screen, (0,0,0))
+        dfsButton.draw(screen, (0,0,0))
+        bfsButton.draw(screen, (0,0,0))
+        astarButton.draw(screen, (0,0,0))
+        resetButton.draw(screen, (0,0,0))
+        mazeButton.draw(screen, (0,0,0))
+        altPrimButton.draw(screen, (0,0,0))
+        recursiveMazeButton.draw(screen, (0,0,0))
+        terrainButton.draw(screen, (0,0,0))
+        visToggleButton.draw(screen, (0,0,0))
+
+    if draw_grid:
+        began = time.perf_counter()
+        rects = renderer.present(update=False)
+        if draw_background:
+            renderer.redraw()
+        if rects and last_metrics is not None:
+            last_metrics['render_time'] += time.perf_counter() - began
+            hud_dirty = True
+        if crowd is not None:
+            rects += draw_flow(rects, whole=draw_background)
+            rects += draw_agents()
+        if hud_dirty or draw_background or (hud_rect is not None and hud_rect.collidelist(rects) != -1):
+            rects += draw_hud()
+
+    if draw_background or draw_buttons:
+        pygame.display.flip()
+    elif draw_grid and rects:
+        pygame.display.update(rects)
+
+update_gui()
 
 while not done:
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             done = True
         
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+            SHOW_HUD = not SHOW_HUD
+            hud_dirty = True
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_f:
+            toggle_crowd()
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+            save_map()
+
+        elif event.type == pygame.KEYDOWN and event.key == pygame.K_o:
+            cancel_job()
+            finish_playback()
+            opened = open_map()
+            if opened is not None:
+                grid = opened
+                START_POINT = grid.find('start')
+                END_POINT = grid.find('end')
+                path_found = False
+                algorithm_run = False
+                renderer.set_grid(grid)
+                update_gui(draw_background=False, draw_buttons=False)
+
+        elif event.type == pygame.KEYDOWN and player is not None:
+            if event.key == pygame.K_SPACE:
+                player.toggle_pause()
+            elif event.key == pygame.K_RIGHT:
+                player.step()
+            elif event.key == pygame.K_UP:
+                player.faster()
+            elif event.key == pygame.K_DOWN:
+                player.slower()
+            elif event.key == pygame.K_RETURN:
+                finish_playback()
+            if player is not None:
+                playback_speed = player.speed
+                show_status()
+
         elif event.type == pygame.MOUSEBUTTONDOWN:
+            finish_playback()
             pos = pygame.mouse.get_pos()
             pressed = pygame.key.get_pressed()
             if pos[1] <= SCREEN_WIDTH-1:
                 column = pos[0] // (WIDTH + MARGIN)
                 row = pos[1] // (HEIGHT + MARGIN)
 
+                cancel_job()
                 if (row,column) == START_POINT:
                     drag_start_point = True
                 elif (row,column) == END_POINT:
                     drag_end_point = True
                 else:
-                    cell_updated = grid[row][column]
                     if pressed[pygame.K_LCTRL]:
                         update_cell_to = 'mud'
                     else:
                         update_cell_to = 'wall'
-                    cell_updated.update(nodetype=update_cell_to)
+                    grid.set((row,column), update_cell_to)
                     mouse_drag = True
-                    if algorithm_run and cell_updated.is_path == True:
+                    if algorithm_run and grid.path[row, column]:
                         path_found = update_path()
 
             elif dijkstraButton.isOver(pos):
+                cancel_job()
                 clear_visited()
-                update_gui(draw_background=False, draw_buttons=False)
-                if VISUALISE:    
-                    pygame.display.flip()
-                path_found = dijkstra(grid, START_POINT, END_POINT)
-                grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-                algorithm_run = 'dijkstra'
+                path_found = algorithm_run = False
+                run_algorithm('dijkstra', visualise=VISUALISE)
             
             elif dfsButton.isOver(pos):
+                cancel_job()
                 clear_visited()
-                update_gui(draw_background=False, draw_buttons=False)
-                if VISUALISE:
-                    pygame.display.flip()
-                path_found = xfs(grid, START_POINT, END_POINT, x='d')
-                grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-                algorithm_run = 'dfs'
+                path_found = algorithm_run = False
+                run_algorithm('dfs', visualise=VISUALISE)
             
             elif bfsButton.isOver(pos):
+                cancel_job()
                 clear_visited()
-                update_gui(draw_background=False, draw_buttons=False)
-                if VISUALISE:
-                    pygame.display.flip()
-                path_found = xfs(grid, START_POINT, END_POINT, x='b')
-                grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-                algorithm_run = 'bfs'
+                path_found = algorithm_run = False
+                run_algorithm('bfs', visualise=VISUALISE)
 
             elif astarButton.isOver(pos):
+                cancel_job()
                 clear_visited()
-                update_gui(draw_background=False, draw_buttons=False)
-                if VISUALISE:
-                    pygame.display.flip()
-                path_found = dijkstra(grid, START_POINT, END_POINT, astar=True)
-                grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-                algorithm_run = 'astar'
+                path_found = algorithm_run = False
+                run_algorithm(ASTAR, visualise=VISUALISE)
 
             elif resetButton.isOver(pos):
+                cancel_job()
                 path_found = False
                 algorithm_run = False
-                for row in range(ROWS):
-                    for column in range(ROWS):
-                        if (row,column) != START_POINT and (row,column) != END_POINT:
-                            grid[row][column].update(nodetype='blank', is_visited=False, is_path=False)
+                reset_grid()
 
             elif mazeButton.isOver(pos):
                 path_found = False
                 algorithm_run = False
-                for row in range(ROWS):
-                    for column in range(ROWS):
-                        if (row,column) != START_POINT and (row,column) != END_POINT:
-                            grid[row][column].update(nodetype='blank', is_visited=False, is_path=False)
-                grid = better_prim()
+                cancel_job()
+                reset_grid()
+                update_gui(draw_background=False, draw_buttons=False)
+                generate(engine.better_prim, ROWS, START_POINT, END_POINT, view=Grid(ROWS, nodetype='wall'))
 
             elif altPrimButton.isOver(pos):
                 path_found = False
                 algorithm_run = False
-                for row in range(ROWS):
-                    for column in range(ROWS):
-                        if (row,column) != START_POINT and (row,column) != END_POINT:
-                            grid[row][column].update(nodetype='blank', is_visited=False, is_path=False)
-                grid = prim()
+                cancel_job()
+                reset_grid()
+                update_gui(draw_background=False, draw_buttons=False)
+                generate(engine.prim, ROWS, START_POINT, END_POINT, view=Grid(ROWS, nodetype='wall'))
 
             elif recursiveMazeButton.isOver(pos):
                 path_found = False
                 algorithm_run = False
-                for row in range(ROWS):
-                    for column in range(ROWS):
-                        if (row,column) != START_POINT and (row,column) != END_POINT:
-                            grid[row][column].update(nodetype='blank', is_visited=False, is_path=False)
-                            draw_square(row,column)
-                if VISUALISE:
-                    pygame.display.flip()
-                recursive_division()
+                cancel_job()
+                reset_grid()
+                update_gui(draw_background=False, draw_buttons=False)
+                generate(engine.recursive_division, Grid.from_cells(grid.cells.copy()), view=Grid.from_cells(grid.cells.copy()))
         
             elif terrainButton.isOver(pos):
                 path_found = False
                 algorithm_run = False
-                for row in range(ROWS):
-                    for column in range(ROWS):
-                        if (row,column) != START_POINT and (row,column) != END_POINT:
-                            grid[row][column].update(nodetype='blank', is_visited=False, is_path=False)
+                cancel_job()
+                reset_grid()
                 update_gui(draw_background=False, draw_buttons=False)
-                random_terrain()
+                generator = terrain.noise_terrain if TERRAIN_MODE == 'noise' else engine.random_terrain
+                generate(generator, Grid.from_cells(grid.cells.copy()), view=Grid.from_cells(grid.cells.copy()))
 
             elif visToggleButton.isOver(pos):
                 if VISUALISE:
                     VISUALISE = False
                 else:
                     VISUALISE = True
+                update_gui(draw_background=False, draw_grid=False)
 
         
         elif event.type == pygame.MOUSEBUTTONUP:
+            end_drag()
             mouse_drag = drag_end_point = drag_start_point = False
         
         elif event.type == pygame.MOUSEMOTION:
             left, middle, right = pygame.mouse.get_pressed()
             if not left:
+                end_drag()
                 mouse_drag = drag_end_point = drag_start_point = False
                 continue
 
@@ -276,8 +631,6 @@ while not done:
                 mouse_drag = False
                 continue
             
-            cell_updated = grid[row][column]
-
             if mouse_drag == True:
                 if (row,column) == START_POINT:
                     pass
@@ -288,558 +641,45 @@ while not done:
                         update_cell_to = 'mud'
                     else:
                         update_cell_to = 'wall'
-                    cell_updated.update(nodetype=update_cell_to)
+                    grid.set((row,column), update_cell_to)
 
                 mouse_drag = True
                 
                 if algorithm_run:
-                    if cell_updated.is_path == True:
+                    if grid.path[row, column]:
                         path_found = update_path()
             
             elif drag_start_point == True:
-                if grid[row][column].nodetype == "blank":
-                    grid[START_POINT[0]][START_POINT[1]].update(nodetype='blank', is_path=False, is_visited=False)
+                if grid.nodetype((row,column)) == "blank":
+                    grid.set(START_POINT, 'blank')
                     START_POINT = (row,column)
-                    grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
+                    grid.set(START_POINT, 'start')
                     if algorithm_run:
                         path_found = update_path()
-                        grid[START_POINT[0]][START_POINT[1]].update(nodetype='start') 
             
             elif drag_end_point == True:
-                if grid[row][column].nodetype == "blank":
-                    grid[END_POINT[0]][END_POINT[1]].update(nodetype='blank', is_path=False, is_visited=False)
+                if grid.nodetype((row,column)) == "blank":
+                    grid.set(END_POINT, 'blank')
                     END_POINT = (row,column)
-                    grid[END_POINT[0]][END_POINT[1]].update(nodetype='end')
+                    grid.set(END_POINT, 'end')
                     if algorithm_run:
                         path_found = update_path()
-                        grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
 
-            pygame.display.flip()
-
-    def clear_visited():
-        excluded_nodetypes = ['start', 'end', 'wall', 'mud']
-        for row in range(ROWS):
-            for column in range(ROWS):
-                if grid[row][column].nodetype not in excluded_nodetypes:
-                    grid[row][column].update(nodetype="blank", is_visited=False, is_path=False)
-                else:
-                     grid[row][column].update(is_visited=False, is_path=False)
-        update_gui(draw_background=False, draw_buttons=False)
+    poll_job()
 
-    def update_path(algorithm_run=algorithm_run):
-        
-        clear_visited()
-        
-        valid_algorithms = ['dijkstra', 'astar', 'dfs', 'bfs']
-
-        assert algorithm_run in valid_algorithms, f"last algorithm used ({algorithm_run}) is not in valid algorithms: {valid_algorithms}"
-
-        if algorithm_run == 'dijkstra':
-            path_found = dijkstra(grid, START_POINT, END_POINT, visualise=False)
-        elif algorithm_run == 'astar':
-            path_found = dijkstra(grid, START_POINT, END_POINT, visualise=False, astar=True)
-        elif algorithm_run == 'dfs':
-            path_found = xfs(grid, START_POINT, END_POINT, x='d', visualise=False)
-        elif algorithm_run == 'bfs':
-            path_found = xfs(grid, START_POINT, END_POINT, x='b', visualise=False)
-        else:
-            path_found = False
-        return path_found
-
-    def random_terrain(mazearray=grid, num_patches=False, visualise=VISUALISE):
-        if not num_patches:
-            num_patches = random.randrange(int(ROWS/10),int(ROWS/4))
-
-        terrain_nodes = set([])
-
-        if VISUALISE:
-            pygame.display.flip()
-
-        for patch in range(num_patches+1):
-            neighbour_cycles = 0
-            centre_point = (random.randrange(1,ROWS-1),random.randrange(1,ROWS-1))
-            patch_type = 'mud'
-            terrain_nodes.add(centre_point)
-            
-            while len(terrain_nodes) > 0:
-                node = terrain_nodes.pop()
-                
-                if grid[node[0]][node[1]].nodetype != 'start' and grid[node[0]][node[1]].nodetype != 'end':
-                    grid[node[0]][node[1]].update(nodetype=patch_type)
-                    draw_square(node[0],node[1])
-                    
-                    if visualise:
-                        update_square(node[0],node[1])
-                        time.sleep(0.000001)
-                
-                neighbour_cycles += 1
-                
-                for node, ntype in get_neighbours(node):
-                    
-                    if grid[node[0]][node[1]].nodetype == 'mud':
-                        continue
-                    threshold = 700-(neighbour_cycles*10)
-                    
-                    if random.randrange(1,101) <= threshold:
-                        terrain_nodes.add(node)
-
-    def dict_move(from_dict, to_dict, item):
-        to_dict[item] = from_dict[item]
-        from_dict.pop(item)
-        return from_dict, to_dict
-
-
-    def get_neighbours(node, max_width=ROWS-1, diagonals=DIAGONALS):
-        if not diagonals:
-            neighbours = (
-                ((min(max_width,node[0]+1),node[1]),"+"),
-                ((max(0,node[0]-1),node[1]),"+"),
-                ((node[0],min(max_width,node[1]+1)),"+"),
-                ((node[0],max(0,node[1]-1)),"+")
-            )
-        else:
-            neighbours = (
-                ((min(max_width,node[0]+1),node[1]),"+"),
-                ((max(0,node[0]-1),node[1]),"+"),
-                ((node[0],min(max_width,node[1]+1)),"+"),
-                ((node[0],max(0,node[1]-1)),"+"),
-                ((min(max_width,node[0]+1),min(max_width,node[1]+1)),"x"),
-                ((min(max_width,node[0]+1),max(0,node[1]-1)),"x"),
-                ((max(0,node[0]-1),min(max_width,node[1]+1)),"x"),
-                ((max(0,node[0]-1),max(0,node[1]-1)),"x")
-            )
-
-        return (neighbour for neighbour in neighbours if neighbour[0] != node)
-
-    def draw_square(row,column,grid=grid):
-        pygame.draw.rect(
-            screen,
-            grid[row][column].color,
-            [
-                (MARGIN + HEIGHT) * column + MARGIN,
-                (MARGIN + HEIGHT) * row + MARGIN,
-                WIDTH,
-                HEIGHT
-            ]
-        )
-        pygame.event.pump()
-
-    def update_square(row,column):
-        pygame.display.update(
-            (MARGIN + WIDTH) * column + MARGIN,
-            (MARGIN + HEIGHT) * row + MARGIN,
-            WIDTH,
-            HEIGHT
-        )
-        pygame.event.pump()
-
-    def prim(mazearray=False, start_point=False, visualise=VISUALISE):
-        if not mazearray:
-            mazearray = []
-            for row in range(ROWS):
-                mazearray.append([])
-                for column in range(ROWS):
-                    mazearray[row].append(Node('wall'))
-                    if visualise:
-                        draw_square(row,column,grid=mazearray)
-
-        n = len(mazearray) - 1
-
-        if not start_point:
-            start_point = (random.randrange(0,n,2),random.randrange(0,n,2))
-        
-        if visualise:
-            draw_square(start_point[0], start_point[1], grid=mazearray)
-            pygame.display.flip()
-
-        walls = set([])
-
-        neighbours = get_neighbours(start_point, n)
-
-        for neighbour, ntype in neighbours:
-            if mazearray[neighbour[0]][neighbour[1]].nodetype == 'wall':
-                walls.add(neighbour)
-
-        while len(walls) > 0:                
-            wall = random.choice(tuple(walls))
-            wall_neighbours = get_neighbours(wall, n)
-            neighbouring_walls = set()
-            pcount = 0
-            for wall_neighbour, ntype in wall_neighbours:
-                if wall_neighbour == (start_point or END_POINT):
-                    continue
-                if mazearray[wall_neighbour[0]][wall_neighbour[1]].nodetype != 'wall':
-                    pcount += 1
-                else:
-                    neighbouring_walls.add(wall_neighbour)
-                    
-            if pcount <= 1:
-                mazearray[wall[0]][wall[1]].update(nodetype='blank')
-                if visualise:
-                    draw_square(wall[0],wall[1],mazearray)
-                    update_square(wall[0],wall[1])
-                    time.sleep(0.000001)
-
-                walls.update(neighbouring_walls)
-            walls.remove(wall)            
-
-        mazearray[END_POINT[0]][END_POINT[1]].update(nodetype='end')
-        mazearray[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-        return mazearray
-
-    def better_prim(mazearray=False, start_point=False, visualise=VISUALISE):
-        if not mazearray:
-            mazearray = []
-            for row in range(ROWS):
-                mazearray.append([])
-                for column in range(ROWS):
-                    if row % 2 != 0 and column % 2 != 0:
-                        mazearray[row].append(Node('dormant'))
-                    else:
-                        mazearray[row].append(Node('wall'))
-                    if visualise:
-                        draw_square(row,column,grid=mazearray)
-
-        n = len(mazearray) - 1
-
-        if not start_point:
-            start_point = (random.randrange(1,n,2),random.randrange(1,n,2))
-            mazearray[start_point[0]][start_point[1]].update(nodetype='blank')
-        
-        if visualise:
-            draw_square(start_point[0], start_point[1], grid=mazearray)
-            pygame.display.flip()
+    if crowd is not None:
+        step_crowd()
 
-        walls = set()
+    if player is not None:
+        player.advance()
+        if player.done:
+            player = None
+            show_status()
 
-        starting_walls = get_neighbours(start_point, n)
-
-        for wall, ntype in starting_walls:
-            if mazearray[wall[0]][wall[1]].nodetype == 'wall':
-                walls.add(wall)
-
-        while len(walls) > 0:
-            wall = random.choice(tuple(walls))
-            visited = 0
-            add_to_maze = []
-
-            for wall_neighbour, ntype in get_neighbours(wall,n):
-                if mazearray[wall_neighbour[0]][wall_neighbour[1]].nodetype == 'blank':
-                    visited += 1
-
-            if visited <= 1:
-                mazearray[wall[0]][wall[1]].update(nodetype='blank')
-                
-                if visualise:
-                    draw_square(wall[0],wall[1],mazearray)
-                    update_square(wall[0],wall[1])
-                    time.sleep(0.0001)
-
-                for neighbour, ntype in get_neighbours(wall,n):
-                    if mazearray[neighbour[0]][neighbour[1]].nodetype == 'dormant':
-                        add_to_maze.append((neighbour[0],neighbour[1]))
-                
-                if len(add_to_maze) > 0:
-                    cell = add_to_maze.pop()
-                    mazearray[cell[0]][cell[1]].update(nodetype='blank')
-                    
-                    if visualise:
-                        draw_square(cell[0],cell[1],mazearray)
-                        update_square(cell[0],cell[1])
-                        time.sleep(0.0001)
-                    
-                    for cell_neighbour, ntype in get_neighbours(cell,n):
-                        if mazearray[cell_neighbour[0]][cell_neighbour[1]].nodetype == 'wall':
-                            walls.add(cell_neighbour)
-
-            walls.remove(wall)
-
-        mazearray[END_POINT[0]][END_POINT[1]].update(nodetype='end')
-        mazearray[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-        return mazearray
-
-    def gaps_to_offset():
-        return [x for x in range(2, ROWS, 3)]
-
-    def recursive_division(chamber=None, visualise=VISUALISE, gaps_to_offset=gaps_to_offset(), halving=True):
-
-        sleep = 0.001
-        sleep_walls = 0.001
-
-        if chamber == None:
-            chamber_width = len(grid)
-            chamber_height = len(grid[1])
-            chamber_left = 0
-            chamber_top = 0
-        else:
-            chamber_width = chamber[2]
-            chamber_height = chamber[3]
-            chamber_left = chamber[0]
-            chamber_top = chamber[1]
-
-        if halving:
-            x_divide = int(chamber_width/2)
-            y_divide = int(chamber_height/2)
-        
-        if chamber_width < 3:
-            pass
-        else:
-            for y in range(chamber_height):
-                grid[chamber_left + x_divide][chamber_top + y].update(nodetype='wall')
-                draw_square(chamber_left + x_divide, chamber_top + y)
-                if visualise:
-                    update_square(chamber_left + x_divide, chamber_top + y)
-                    time.sleep(sleep_walls)
-         
-        if chamber_height < 3:
-            pass
-        else:
-            for x in range(chamber_width):
-                grid[chamber_left + x][chamber_top + y_divide].update(nodetype='wall')
-                draw_square(chamber_left + x, chamber_top + y_divide)
-                if visualise:
-                    update_square(chamber_left + x, chamber_top + y_divide)
-                    time.sleep(sleep_walls)
-
-        if chamber_width < 3 and chamber_height < 3:
-            return
-
-        top_left =      (chamber_left,                  chamber_top,                x_divide,                       y_divide)
-        top_right =     (chamber_left + x_divide + 1,   chamber_top,                chamber_width - x_divide - 1,   y_divide)
-        bottom_left =   (chamber_left,                  chamber_top + y_divide + 1, x_divide,                       chamber_height - y_divide - 1)
-        bottom_right =  (chamber_left + x_divide + 1,   chamber_top + y_divide + 1, chamber_width - x_divide - 1,   chamber_height - y_divide - 1)
-
-        chambers = (top_left, top_right, bottom_left, bottom_right)
-                
-        left =      (chamber_left,                     chamber_top + y_divide,      x_divide,                       1)
-        right =     (chamber_left + x_divide + 1,      chamber_top + y_divide,      chamber_width - x_divide - 1,   1)
-        top =       (chamber_left + x_divide,          chamber_top,                 1,                              y_divide)
-        bottom =    (chamber_left + x_divide,          chamber_top + y_divide + 1,  1,                              chamber_height - y_divide - 1)
-        
-        walls = (left, right, top, bottom)
-
-        gaps = 3
-        for wall in random.sample(walls, gaps):
-            if wall[3] == 1:
-                x = random.randrange(wall[0],wall[0]+wall[2])
-                y = wall[1]
-                if x in gaps_to_offset and y in gaps_to_offset:
-                    if wall[2] == x_divide:
-                        x -= 1
-                    else:
-                        x += 1
-                if x >= ROWS:
-                    x = ROWS -1
-            else: 
-                x = wall[0]
-                y = random.randrange(wall[1],wall[1]+wall[3])
-                if y in gaps_to_offset and x in gaps_to_offset:
-                    if wall[3] == y_divide:
-                        y -=1
-                    else:
-                        y += 1
-                if y >= ROWS:
-                    y = ROWS-1
-            grid[x][y].update(nodetype="blank")
-            draw_square(x, y)
-            if visualise:
-                update_square(x, y)
-                time.sleep(sleep)
-
-        for num, chamber in enumerate(chambers):
-            recursive_division(chamber)
-
-    def dijkstra(mazearray, start_point=(0,0), goal_node=False, display=pygame.display, visualise=VISUALISE, diagonals=DIAGONALS, astar=False):
-
-        heuristic = 0
-        distance = 0
-
-        n = len(mazearray) - 1
-        
-        visited_nodes = set()
-        unvisited_nodes = set([(x,y) for x in range(n+1) for y in range(n+1)])
-        queue = AStarQueue()
-
-        queue.push(distance+heuristic, distance, start_point)
-        v_distances = {}
-
-        if not goal_node:
-            goal_node = (n,n)
-        priority, current_distance, current_node = queue.pop()
-        start = time.perf_counter()
-        
-        while current_node != goal_node and len(unvisited_nodes) > 0:
-            if current_node in visited_nodes:
-                if len(queue.show()) == 0:
-                    return False
-                else:
-                    priority, current_distance, current_node = queue.pop()
-                    continue
-            
-            for neighbour in get_neighbours(current_node, n, diagonals=diagonals):
-                neighbours_loop(
-                    neighbour, 
-                    mazearr=mazearray, 
-                    visited_nodes=visited_nodes, 
-                    unvisited_nodes=unvisited_nodes, 
-                    queue=queue, 
-                    v_distances=v_distances, 
-                    current_node=current_node,
-                    current_distance=current_distance,
-                    astar=astar
-                )
-
-            visited_nodes.add(current_node)
-            unvisited_nodes.discard(current_node)
-            
-            v_distances[current_node] = current_distance
-
-            if (current_node[0],current_node[1]) != start_point:
-                mazearray[current_node[0]][current_node[1]].update(is_visited = True)
-                draw_square(current_node[0],current_node[1],grid=mazearray)
-
-                if visualise:
-                    update_square(current_node[0],current_node[1])
-                    time.sleep(0.000001)
-            
-            if len(queue.show()) == 0:
-                return False
-            else:
-                priority, current_distance, current_node = queue.pop()
-        
-        v_distances[goal_node] = current_distance + (1 if not diagonals else 2**0.5)
-        visited_nodes.add(goal_node)
-
-        trace_back(goal_node, start_point, v_distances, visited_nodes, n, mazearray, diags=diagonals, visualise=visualise)
-
-        end = time.perf_counter()
-        num_visited = len(visited_nodes)
-        time_taken = end-start
-
-        print(f"Program finished in {time_taken:.4f} seconds after checking {num_visited} nodes. That is {time_taken/num_visited:.8f} seconds per node.")
-        
-        return False if v_distances[goal_node] == float('inf') else True
-
-    def neighbours_loop(neighbour, mazearr, visited_nodes, unvisited_nodes, queue, v_distances, current_node, current_distance, diags=DIAGONALS, astar=False):
-        neighbour, ntype = neighbour
-        heuristic = 0
-
-        if astar:
-            heuristic += abs(END_POINT[0] - neighbour[0]) + abs(END_POINT[1] - neighbour[1])
-            heuristic *= 1
-         
-        if neighbour in visited_nodes:
-            pass
-        elif mazearr[neighbour[0]][neighbour[1]].nodetype == 'wall':
-            visited_nodes.add(neighbour)
-            unvisited_nodes.discard(neighbour)
-        else:
-            modifier = mazearr[neighbour[0]][neighbour[1]].distance_modifier
-            if ntype == "+":
-                queue.push(current_distance+(1*modifier)+heuristic, current_distance+(1*modifier), neighbour)
-            elif ntype == "x": 
-                queue.push(current_distance+((2**0.5)*modifier)+heuristic, current_distance+((2**0.5)*modifier), neighbour)
-
-    def trace_back(goal_node, start_node, v_distances, visited_nodes, n, mazearray, diags=False, visualise=VISUALISE):
-        path = [goal_node]
-        current_node = goal_node
-        
-        while current_node != start_node:
-            neighbour_distances = PriorityQueue()
-            neighbours = get_neighbours(current_node, n, diags)
-            try:
-                distance = v_distances[current_node]
-            except Exception as e:
-                print(e)
-
-            for neighbour, ntype in neighbours:
-                if neighbour in v_distances:
-                    distance = v_distances[neighbour]
-                    neighbour_distances.push(distance, neighbour)
-            
-            distance, smallest_neighbour = neighbour_distances.pop()
-            mazearray[smallest_neighbour[0]][smallest_neighbour[1]].update(is_path=True)
-            draw_square(smallest_neighbour[0],smallest_neighbour[1],grid=mazearray)
-            path.append(smallest_neighbour)
-            current_node = smallest_neighbour
-
-        pygame.display.flip()
-        mazearray[start_node[0]][start_node[1]].update(is_path=True)
-
-    def xfs(mazearray, start_point, goal_node, x, display=pygame.display, visualise=VISUALISE, diagonals=DIAGONALS):
-        assert x == 'b' or x == 'd', "x should equal 'b' or 'd' to make this bfs or dfs"
-        n = len(mazearray) - 1
-        mydeque = deque()
-        mydeque.append(start_point)
-        visited_nodes = set([])
-        path_dict = {start_point: None}
-
-        while len(mydeque) > 0:
-            if x == 'd':
-                current_node = mydeque.pop()
-            elif x == 'b':
-                current_node = mydeque.popleft()
-          
-            if current_node == goal_node:
-                path_node = goal_node
-                while True:
-                    path_node = path_dict[path_node]
-                    mazearray[path_node[0]][path_node[1]].update(is_path = True)
-                    draw_square(path_node[0],path_node[1],grid=mazearray)
-                    if visualise:
-                        update_square(path_node[0],path_node[1])
-                    if path_node == start_point:
-                        return True
-            
-            if mazearray[current_node[0]][current_node[1]].nodetype == 'wall':
-                continue
-            
-            if current_node not in visited_nodes:
-                visited_nodes.add(current_node)
-                mazearray[current_node[0]][current_node[1]].update(is_visited = True)
-                draw_square(current_node[0],current_node[1],grid=mazearray)
-                if visualise:
-                    update_square(current_node[0],current_node[1])
-                    time.sleep(0.001)
-                
-                for neighbour, ntype in get_neighbours(current_node, n):
-                    mydeque.append(neighbour)
-                    if neighbour not in visited_nodes:
-                        path_dict[neighbour] = current_node
-        
-        pygame.display.flip()
-        return False
-
-    grid[START_POINT[0]][START_POINT[1]].update(nodetype='start')
-    grid[END_POINT[0]][END_POINT[1]].update(nodetype='end')
-
-    def update_gui(draw_background=True, draw_buttons=True, draw_grid=True):
-        
-        if draw_background:
-            screen.fill(BLACK)
-            pass
-
-        if draw_buttons:
-            visToggleButton = Button(GREY, SCREEN_WIDTH/3, SCREEN_WIDTH + BUTTON_HEIGHT*2, SCREEN_WIDTH/3, BUTTON_HEIGHT, f"Visualise: {str(VISUALISE)}")
-            dijkstraButton.draw(screen, (0,0,0))
-            dfsButton.draw(screen, (0,0,0))
-            bfsButton.draw(screen, (0,0,0))
-            astarButton.draw(screen, (0,0,0))
-            resetButton.draw(screen, (0,0,0))
-            mazeButton.draw(screen, (0,0,0))
-            altPrimButton.draw(screen, (0,0,0))
-            recursiveMazeButton.draw(screen, (0,0,0))
-            terrainButton.draw(screen, (0,0,0))
-            visToggleButton.draw(screen, (0,0,0))
-
-        if draw_grid:
-            for row in range(ROWS):
-                for column in range(ROWS):
-                    color = grid[row][column].color
-                    draw_square(row,column)
-
-    update_gui()
-    pygame.display.flip()
+    update_gui(draw_background=False, draw_buttons=False)
     clock.tick(60)
 
-pygame.quit()
\ No newline at end of file
+if metrics_log:
+    if last_metrics is not None:
+        metrics_log.write(last_metrics, run=last_label)
+    metrics_log.close()
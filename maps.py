@@ -0,0 +1,172 @@
+import struct
+import sys
+import numpy as np
+from node import Node
+from grid import Grid, NODETYPES, CELL, COSTS
+
+# Text map formats. Our own format is one character per cell, taken from
+# Node.symbols, one row per line. MovingAI benchmark maps (.map) have a short
+# header followed by the rows; their scenario files (.scen) list one query per
+# line as columns/rows, which load_scenarios turns into (row, column) pairs.
+
+SYMBOLS = {Node.symbols[nodetype]: CELL[nodetype] for nodetype in NODETYPES}
+MOVINGAI = {'.': 'blank', 'G': 'blank', 'S': 'blank', '@': 'wall', 'O': 'wall', 'T': 'wall', 'W': 'wall'}
+
+# Binary maps (.grid) are a fixed header, a table of the cell types the map
+# was saved with, and then the raw uint8 cells row by row from DATA_ALIGN
+# bytes in. The header holds the magic, the format version, where the cells
+# start, the shape, the start and end ((-1, -1) when absent) and the number
+# of cell types. The table records each type's cost as float32 and its text
+# symbol; cells are matched to the current types by symbol, so a map saved
+# under another set of cell types still reads correctly. Costs belong to the
+# cell types rather than to a grid, so a map whose table gives a type another
+# cost than COSTS is refused instead of loaded with the wrong weights. The
+# cells are opened with numpy.memmap: nothing is read until it is used, and
+# every process that opens the same map shares its pages.
+
+MAGIC = b'PFGRID\0\0'
+VERSION = 1
+HEADER = struct.Struct('<8sIIqqqqqqI')
+DATA_ALIGN = 64
+BINARY_SUFFIX = '.grid'
+
+def _rows_to_grid(rows, table, path):
+    width = max(len(row) for row in rows)
+    assert all(len(row) == width for row in rows), f"{path}: rows have different lengths"
+    lookup = np.full(256, 255, dtype=np.uint8)
+    for symbol, code in table.items():
+        lookup[ord(symbol)] = code
+    raw = np.frombuffer(''.join(rows).encode('ascii'), dtype=np.uint8).reshape(len(rows), width)
+    cells = lookup[raw]
+    unknown = cells == 255
+    assert not unknown.any(), f"{path}: unknown map symbol {chr(raw[unknown][0])!r}"
+    return Grid.from_cells(cells)
+
+def load_text(path):
+    with open(path) as handle:
+        rows = [line.rstrip('\r\n') for line in handle if line.strip()]
+    return _rows_to_grid(rows, SYMBOLS, path)
+
+def save_text(grid, path):
+    symbols = np.array([ord(Node.symbols[nodetype]) for nodetype in NODETYPES], dtype=np.uint8)
+    raw = symbols[grid.cells]
+    with open(path, 'w') as handle:
+        for row in raw:
+            handle.write(row.tobytes().decode('ascii') + '\n')
+
+def load_movingai(path):
+    with open(path) as handle:
+        lines = [line.rstrip('\r\n') for line in handle]
+    header = {}
+    index = 0
+    while lines[index].strip() != 'map':
+        parts = lines[index].split()
+        if parts:
+            header[parts[0]] = parts[1:]
+        index += 1
+    height, width = int(header['height'][0]), int(header['width'][0])
+    rows = lines[index + 1:index + 1 + height]
+    assert len(rows) == height and all(len(row) == width for row in rows), f"{path}: map is not {width}x{height}"
+    table = {symbol: CELL[nodetype] for symbol, nodetype in MOVINGAI.items()}
+    return _rows_to_grid(rows, table, path)
+
+def save_binary(grid, path):
+    start = grid.find('start') or (-1, -1)
+    end = grid.find('end') or (-1, -1)
+    table = COSTS.astype('<f4').tobytes() + bytes(ord(Node.symbols[nodetype]) for nodetype in NODETYPES)
+    offset = -(-(HEADER.size + len(table)) // DATA_ALIGN) * DATA_ALIGN
+    header = HEADER.pack(MAGIC, VERSION, offset, grid.rows, grid.columns, *start, *end, len(NODETYPES))
+    with open(path, 'wb') as handle:
+        handle.write(header + table)
+        handle.write(bytes(offset - len(header) - len(table)))
+        np.ascontiguousarray(grid.cells, dtype=np.uint8).tofile(handle)
+
+def read_header(path):
+    with open(path, 'rb') as handle:
+        fields = HEADER.unpack(handle.read(HEADER.size))
+        magic, version, offset, rows, columns, start_row, start_column, end_row, end_column, kinds = fields
+        assert magic == MAGIC, f"{path}: not a binary map"
+        assert version <= VERSION, f"{path}: map format version {version} is newer than this reader ({VERSION})"
+        costs = np.frombuffer(handle.read(4 * kinds), dtype='<f4')
+        symbols = handle.read(kinds).decode('ascii')
+    return {
+        'version': version,
+        'offset': offset,
+        'shape': (rows, columns),
+        'start': (start_row, start_column) if start_row >= 0 else None,
+        'end': (end_row, end_column) if end_row >= 0 else None,
+        'costs': dict(zip(symbols, costs.tolist())),
+    }
+
+def map_cells(path, mode='r'):
+    # (cells, lookup): the memory-mapped cells of a binary map as stored, and
+    # the array that translates them to the current cell types, or None when
+    # they already match. Lets callers that read a piece at a time translate
+    # only that piece.
+    header = read_header(path)
+    cells = np.memmap(path, dtype=np.uint8, mode=mode, offset=header['offset'], shape=header['shape'])
+    symbols = list(header['costs'])
+    unknown = [symbol for symbol in symbols if symbol not in SYMBOLS]
+    assert not unknown, f"{path}: unknown cell types {unknown}"
+    changed = {symbol: cost for symbol, cost in header['costs'].items() if cost != float(COSTS[SYMBOLS[symbol]])}
+    assert not changed, f"{path}: saved with costs {changed} that differ from the current ones"
+    if symbols == [Node.symbols[nodetype] for nodetype in NODETYPES]:
+        return cells, None
+    lookup = np.arange(256, dtype=np.uint8)
+    lookup[:len(symbols)] = [SYMBOLS[symbol] for symbol in symbols]
+    return cells, lookup
+
+def open_cells(path, mode='c'):
+    # The cell array of a binary map, memory-mapped. The default copy-on-write
+    # mode lets the grid be edited in memory without changing the file; 'r'
+    # maps it read-only and 'r+' writes edits back. A map saved with another
+    # set of cell types is translated, which reads and copies every cell.
+    cells, lookup = map_cells(path, mode)
+    return cells if lookup is None else lookup[cells]
+
+def load_binary(path, mode='c'):
+    return Grid.from_cells(open_cells(path, mode))
+
+def is_binary(path):
+    with open(path, 'rb') as handle:
+        return handle.read(len(MAGIC)) == MAGIC
+
+def load(path):
+    if path.endswith('.map'):
+        return load_movingai(path)
+    if path.endswith(BINARY_SUFFIX) or is_binary(path):
+        return load_binary(path)
+    return load_text(path)
+
+def save(grid, path):
+    if path.endswith(BINARY_SUFFIX):
+        save_binary(grid, path)
+    else:
+        save_text(grid, path)
+
+def load_scenarios(path):
+    # Returns a list of (start, goal, optimal) with optimal None when unknown.
+    scenarios = []
+    with open(path) as handle:
+        for line in handle:
+            parts = line.split()
+            if not parts or parts[0] == 'version' or parts[0].startswith('#'):
+                continue
+            if path.endswith('.scen'):
+                start_column, start_row, goal_column, goal_row = (int(value) for value in parts[4:8])
+                scenarios.append(((start_row, start_column), (goal_row, goal_column), float(parts[8])))
+            else:
+                start_row, start_column, goal_row, goal_column = (int(value) for value in parts[:4])
+                optimal = float(parts[4]) if len(parts) > 4 else None
+                scenarios.append(((start_row, start_column), (goal_row, goal_column), optimal))
+    return scenarios
+
+def main(argv):
+    # Converts between map formats by file name: python maps.py arena.map arena.grid
+    assert len(argv) == 2, "usage: python maps.py SOURCE DESTINATION"
+    grid = load(argv[0])
+    save(grid, argv[1])
+    print(f"{argv[0]} -> {argv[1]}: {grid.rows}x{grid.columns}")
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,95 @@
+import json
+import time
+import tracemalloc
+
+# Counters and timings of one run, shared by every solver. Metrics is a dict,
+# so result.stats['expanded'] keeps working, and every key below is always
+# present; solvers add their own extras (mode, layers, scanned, ...) on top.
+#
+#   expanded     nodes taken off the open set and expanded
+#   generated    passable, unclosed neighbours looked at while expanding
+#   pushes       insertions into the open set, decrease-keys included
+#   stale_pops   entries popped for nodes that were already closed
+#   peak_open    largest size the open set reached
+#   search_time  seconds spent searching
+#   path_time    seconds spent rebuilding the path afterwards
+#   render_time  seconds the GUI spent drawing the run
+#   time         search_time + path_time
+#   peak_memory  bytes allocated at the peak, when run through measure()
+#                with memory=True; None otherwise
+
+COUNTERS = ('expanded', 'generated', 'pushes', 'stale_pops', 'peak_open')
+TIMINGS = ('search_time', 'path_time', 'render_time', 'time')
+
+class Metrics(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__({name: 0 for name in COUNTERS})
+        self.update({name: 0.0 for name in TIMINGS})
+        self['peak_memory'] = None
+        self.update(*args, **kwargs)
+
+    def end_search(self, start):
+        now = time.perf_counter()
+        self['search_time'] = now - start
+        self['time'] = self['search_time'] + self['path_time']
+        return now
+
+    def end_path(self, start):
+        self['path_time'] = time.perf_counter() - start
+        self['time'] = self['search_time'] + self['path_time']
+
+    def json(self, **labels):
+        return json.dumps({**labels, **self}, default=_plain)
+
+    def lines(self):
+        # Short text lines for an on-screen overlay.
+        lines = [
+            f"expanded {self['expanded']}  generated {self['generated']}",
+            f"pushes {self['pushes']}  stale pops {self['stale_pops']}  peak open {self['peak_open']}",
+            f"search {self['search_time'] * 1000:.2f} ms  path {self['path_time'] * 1000:.2f} ms  render {self['render_time'] * 1000:.1f} ms",
+        ]
+        if self['peak_memory'] is not None:
+            lines.append(f"peak memory {self['peak_memory'] / 1024:.0f} KiB")
+        return lines
+
+def _plain(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def measure(function, *args, memory=False, **kwargs):
+    # Runs function(*args, **kwargs) and returns (its value, Metrics). A
+    # SearchResult's own stats are used when it has them; anything else, such
+    # as a maze generator, gets its wall time. With memory the peak Python
+    # allocation is traced as well, which slows the run down noticeably.
+    tracing = memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    if memory:
+        tracemalloc.reset_peak()
+    start = time.perf_counter()
+    value = function(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    stats = getattr(value, 'stats', None)
+    if not isinstance(stats, Metrics):
+        stats = Metrics(stats or {}, search_time=elapsed, time=elapsed)
+        if hasattr(value, 'stats'):
+            value.stats = stats
+    if memory:
+        stats['peak_memory'] = tracemalloc.get_traced_memory()[1]
+    if tracing:
+        tracemalloc.stop()
+    return value, stats
+
+class JsonLines():
+    # Appends one JSON object per run to a file.
+    def __init__(self, path):
+        self.path = path
+        self.handle = open(path, 'a')
+
+    def write(self, metrics, **labels):
+        self.handle.write(metrics.json(**labels) + '\n')
+        self.handle.flush()
+
+    def close(self):
+        self.handle.close()
@@ -0,0 +1,69 @@
+from math import inf
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+LIGHT_BLUE = (0, 111, 255)
+ORANGE = (255, 128, 0)
+PURPLE = (128, 0, 255)
+YELLOW = (255, 255, 0)
+GREY = (143, 143, 143)
+BROWN = (186, 127, 50)
+DARK_GREEN = (0, 128, 0)
+DARKER_GREEN = (0, 50, 0)
+DARK_BLUE = (0, 0, 128)
+SAND = (230, 210, 140)
+PALE_GREEN = (150, 220, 90)
+MID_BLUE = (70, 70, 230)
+FOREST = (34, 110, 60)
+NAVY = (0, 0, 80)
+WATER = (90, 150, 220)
+TEAL = (0, 150, 130)
+DEEP_BLUE = (0, 40, 160)
+
+class Node():
+
+    nodetypes = ['blank', 'start', 'end', 'wall', 'mud', 'dormant', 'sand', 'forest', 'water']
+
+    colors = {  'regular': {'blank': WHITE, 'start': RED, 'end': LIGHT_BLUE, 'wall': BLACK, 'mud': BROWN, 'dormant': GREY, 'sand': SAND, 'forest': FOREST, 'water': WATER},
+                'visited': {'blank': GREEN, 'start': RED, 'end': LIGHT_BLUE, 'wall': BLACK, 'mud': DARK_GREEN, 'dormant': GREY, 'sand': PALE_GREEN, 'forest': DARKER_GREEN, 'water': TEAL},
+                'path': {'blank': BLUE, 'start': RED, 'end': LIGHT_BLUE, 'wall': BLACK, 'mud': DARK_BLUE, 'dormant': GREY, 'sand': MID_BLUE, 'forest': NAVY, 'water': DEEP_BLUE}
+            }
+
+    distance_modifiers = {'blank': 1, 'start': 1, 'end': 1, 'wall': inf, 'mud': 3, 'dormant': inf, 'sand': 2, 'forest': 4, 'water': 6}
+
+    symbols = {'blank': '.', 'start': 'S', 'end': 'E', 'wall': '#', 'mud': '~', 'dormant': '+', 'sand': ':', 'forest': '%', 'water': '='}
+
+    def __init__(self, nodetype, text='', colors=colors, dmf=distance_modifiers):
+        self.nodetype = nodetype
+        self.rcolor = colors['regular'][self.nodetype]
+        self.vcolor = colors['visited'][self.nodetype]
+        self.pcolor = colors['path'][self.nodetype]
+        self.is_visited = True if nodetype == 'start' else True if nodetype == 'end' else False
+        self.is_path = True if nodetype == 'start' else True if nodetype == 'end' else False
+        self.distance_modifier = dmf[self.nodetype]
+        self.color = self.pcolor if self.is_path else self.vcolor if self.is_visited else self.rcolor
+
+    def update(self, nodetype=False, is_visited='unchanged', is_path='unchanged', colors=colors, dmf=distance_modifiers, nodetypes=nodetypes):
+        if nodetype:
+            assert nodetype in nodetypes, f"nodetype must be one of: {nodetypes}"
+            if (self.nodetype == ('start' or 'end')) and (nodetype == ('wall' or 'mud')):
+                pass
+            else:
+                self.nodetype = nodetype        
+
+        if is_visited != 'unchanged':
+            assert type(is_visited) == bool, "'is_visited' must be boolean: True or False" 
+            self.is_visited = is_visited
+
+        if is_path != 'unchanged':
+            assert type(is_path) == bool, "'is_path' must be boolean: True or False" 
+            self.is_path = is_path
+
+        self.rcolor = colors['regular'][self.nodetype]
+        self.vcolor = colors['visited'][self.nodetype]
+        self.pcolor = colors['path'][self.nodetype]
+        self.distance_modifier = dmf[self.nodetype]
+        self.color = self.pcolor if self.is_path else self.vcolor if self.is_visited else self.rcolor
@@ -0,0 +1,126 @@
+import time
+from array import array
+import numpy as np
+from grid import BLANK, WALL, MUD
+
+# Visualisation by replay. A Trace is an observer that records the events of
+# a solver or generator run as compact arrays, so the run itself goes at full
+# speed. A Player then applies a fixed number of those events to a grid per
+# frame, with pause, single step and speed controls, and the renderer draws
+# whatever changed.
+#
+# Searches are played onto the grid they ran on, since they only add visited
+# and path shading. Generators have already written their final cells when
+# the trace is played, so they are played onto a scratch grid that starts as
+# the generator did. A 'terrain' event does not say which terrain, so given
+# the finished grid as final the player takes the cell type from there, and
+# otherwise shows mud.
+
+EVENTS = ('visit', 'path', 'carve', 'wall', 'terrain')
+CODE = {event: code for code, event in enumerate(EVENTS)}
+VISIT, PATH, TERRAIN = CODE['visit'], CODE['path'], CODE['terrain']
+NOT_A_CELL = 255
+EVENT_CELLS = np.array([NOT_A_CELL, NOT_A_CELL, BLANK, WALL, MUD], dtype=np.uint8)
+
+SPEED = 64
+MAX_SPEED = 2**16
+
+class Trace():
+    def __init__(self):
+        self.codes = array('B')
+        self.rows = array('i')
+        self.columns = array('i')
+
+    def __call__(self, event, node):
+        if event == 'layer':
+            self.codes.extend([VISIT] * len(node))
+            self.rows.extend(int(row) for row in node[:, 0])
+            self.columns.extend(int(column) for column in node[:, 1])
+            return
+        self.codes.append(CODE[event])
+        self.rows.append(node[0])
+        self.columns.append(node[1])
+
+    def arrays(self):
+        codes = np.frombuffer(self.codes, dtype=np.uint8) if len(self.codes) else np.zeros(0, dtype=np.uint8)
+        rows = np.frombuffer(self.rows, dtype=np.int32) if len(self.rows) else np.zeros(0, dtype=np.int32)
+        columns = np.frombuffer(self.columns, dtype=np.int32) if len(self.columns) else np.zeros(0, dtype=np.int32)
+        return codes, rows, columns
+
+def record(function, *args, **kwargs):
+    # Runs function(*args, observer=trace, **kwargs) and returns
+    # (its return value, the trace, the seconds it took).
+    trace = Trace()
+    start = time.perf_counter()
+    value = function(*args, observer=trace, **kwargs)
+    return value, trace, time.perf_counter() - start
+
+class Player():
+    def __init__(self, trace, grid, speed=SPEED, on_finish=None, final=None):
+        self.codes, self.rows, self.columns = trace.arrays()
+        self.grid = grid
+        self.final = final
+        self.speed = speed
+        self.on_finish = on_finish
+        self.position = 0
+        self.paused = False
+        self.frames = 0
+        self.started = None
+        self.elapsed = 0
+
+    @property
+    def done(self):
+        return self.position >= len(self.codes)
+
+    def advance(self, count=None):
+        # Applies the next count events, or the next speed events per frame
+        # unless paused. Returns how many were applied.
+        if count is None:
+            if self.paused:
+                return 0
+            count = self.speed
+        if self.started is None:
+            self.started = time.perf_counter()
+        end = min(self.position + count, len(self.codes))
+        self._apply(self.position, end)
+        applied = end - self.position
+        self.position = end
+        self.frames += 1
+        self.elapsed = time.perf_counter() - self.started
+        if self.done and self.on_finish:
+            on_finish, self.on_finish = self.on_finish, None
+            on_finish(self)
+        return applied
+
+    def _apply(self, start, end):
+        codes = self.codes[start:end]
+        rows = self.rows[start:end]
+        columns = self.columns[start:end]
+        grid = self.grid
+        for code, plane in ((VISIT, grid.visited), (PATH, grid.path)):
+            mask = codes == code
+            plane[rows[mask], columns[mask]] = True
+        cells = EVENT_CELLS[codes]
+        if self.final is not None:
+            terrain = codes == TERRAIN
+            cells[terrain] = self.final.cells[rows[terrain], columns[terrain]]
+        mask = cells != NOT_A_CELL
+        grid.cells[rows[mask], columns[mask]] = cells[mask]
+        grid.touch(rows, columns)
+
+    def toggle_pause(self):
+        self.paused = not self.paused
+
+    def step(self):
+        self.paused = True
+        return self.advance(1)
+
+    def faster(self):
+        self.speed = min(self.speed * 2, MAX_SPEED)
+
+    def slower(self):
+        self.speed = max(self.speed // 2, 1)
+
+    def finish(self):
+        if not self.done:
+            self.advance(len(self.codes) - self.position)
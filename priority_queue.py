@@ -44,4 +44,164 @@ class PrioritySet(object):
     def pop(self):
         priority, node = heapq.heappop(self.myheap)
         self.myset.remove(node)
-        return priority, node
\ No newline at end of file
+        return priority, node
+
+class _Positions(dict):
+    # Heap slots of the ids in a sparse IndexedHeap; ids not in it are -1.
+    def __missing__(self, node):
+        return -1
+
+class IndexedHeap(object):
+    # Binary min-heap over integer node ids in [0, capacity). heap holds the
+    # ids, keys the matching priorities, and position maps an id to its slot in
+    # heap (-1 when absent), so a queued node can be found and re-keyed in
+    # place instead of being pushed again. Without a capacity position is a
+    # dict, for searches over a few ids spread across a large range.
+    def __init__(self, capacity=None):
+        self.heap = []
+        self.keys = []
+        self.position = [-1] * capacity if capacity is not None else _Positions()
+
+    def show(self):
+        return self.heap
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, node):
+        return self.position[node] >= 0
+
+    def contains(self, node):
+        return self.position[node] >= 0
+
+    def key(self, node):
+        return self.keys[self.position[node]]
+
+    def peek(self):
+        return self.keys[0], self.heap[0]
+
+    def push(self, priority, node):
+        index = self.position[node]
+        if index < 0:
+            self.heap.append(node)
+            self.keys.append(priority)
+            self._sift_up(len(self.heap) - 1)
+            return True
+        if priority < self.keys[index]:
+            self.keys[index] = priority
+            self._sift_up(index)
+            return True
+        return False
+
+    def decrease_key(self, priority, node):
+        index = self.position[node]
+        assert index >= 0, f"node {node} is not in the heap"
+        assert priority <= self.keys[index], "decrease_key cannot raise a priority"
+        self.keys[index] = priority
+        self._sift_up(index)
+
+    def pop(self):
+        heap, keys = self.heap, self.keys
+        node, priority = heap[0], keys[0]
+        last_node, last_key = heap.pop(), keys.pop()
+        self.position[node] = -1
+        if heap:
+            heap[0], keys[0] = last_node, last_key
+            self.position[last_node] = 0
+            self._sift_down(0)
+        return priority, node
+
+    def remove(self, node):
+        index = self.position[node]
+        if index < 0:
+            return False
+        heap, keys = self.heap, self.keys
+        last_node, last_key = heap.pop(), keys.pop()
+        self.position[node] = -1
+        if index < len(heap):
+            heap[index], keys[index] = last_node, last_key
+            self.position[last_node] = index
+            self._sift_up(index)
+            self._sift_down(self.position[last_node])
+        return True
+
+    def _sift_up(self, index):
+        heap, keys, position = self.heap, self.keys, self.position
+        node, priority = heap[index], keys[index]
+        while index > 0:
+            parent = (index - 1) >> 1
+            if keys[parent] <= priority:
+                break
+            heap[index], keys[index] = heap[parent], keys[parent]
+            position[heap[index]] = index
+            index = parent
+        heap[index], keys[index] = node, priority
+        position[node] = index
+
+    def _sift_down(self, index):
+        heap, keys, position = self.heap, self.keys, self.position
+        size = len(heap)
+        node, priority = heap[index], keys[index]
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+            if child + 1 < size and keys[child + 1] < keys[child]:
+                child += 1
+            if priority <= keys[child]:
+                break
+            heap[index], keys[index] = heap[child], keys[child]
+            position[heap[index]] = index
+            index = child
+        heap[index], keys[index] = node, priority
+        position[node] = index
+
+class BucketQueue(object):
+    # Dial's bucket queue for small non-negative integer priorities that never
+    # fall below the last one popped. Live priorities must stay within span of
+    # the cursor, so the buckets are reused as a ring. Lowering a priority is a
+    # second push; the caller skips the stale copy when it is popped.
+    def __init__(self, span, cursor=0):
+        self.buckets = [[] for bucket in range(span)]
+        self.span = span
+        self.cursor = cursor
+        self.size = 0
+
+    def show(self):
+        return self.buckets
+
+    def __len__(self):
+        return self.size
+
+    def push(self, priority, node):
+        assert self.cursor <= priority < self.cursor + self.span, f"priority {priority} outside [{self.cursor}, {self.cursor + self.span})"
+        self.buckets[priority % self.span].append(node)
+        self.size += 1
+
+    def pop(self):
+        buckets, span = self.buckets, self.span
+        cursor = self.cursor
+        while not buckets[cursor % span]:
+            cursor += 1
+        self.cursor = cursor
+        self.size -= 1
+        return cursor, buckets[cursor % span].pop()
+
+class TiedBucketQueue(BucketQueue):
+    # BucketQueue whose buckets are small heaps of (tie, node), so nodes of
+    # one priority come out smallest tie first instead of last in first out.
+    # A* passes -g as the tie: among equal f it expands the node furthest
+    # along, which heads for the goal instead of widening the front.
+    def push(self, priority, node, tie=0):
+        assert self.cursor <= priority < self.cursor + self.span, f"priority {priority} outside [{self.cursor}, {self.cursor + self.span})"
+        heapq.heappush(self.buckets[priority % self.span], (tie, node))
+        self.size += 1
+
+    def pop(self):
+        buckets, span = self.buckets, self.span
+        cursor = self.cursor
+        while not buckets[cursor % span]:
+            cursor += 1
+        self.cursor = cursor
+        self.size -= 1
+        return cursor, heapq.heappop(buckets[cursor % span])[1]
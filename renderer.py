@@ -0,0 +1,141 @@
+import numpy as np
+import pygame
+from grid import NODETYPES, PALETTE
+
+# Draws a Grid through an off-screen surface. Each frame the colour state
+# (type plus visited/path shading) of the cells the grid lists as changed is
+# compared with what the surface already shows, only the cells that differ
+# are filled, and only their rectangles are copied to the screen and updated.
+# After refresh(), or on a new grid, every cell is compared instead. When
+# most of the grid changed the whole surface is rebuilt in one go through
+# surfarray.
+#
+# Cells drawn straight away with paint(), as the search and maze observers
+# do, are repainted from the grid on the next present() in case the colour
+# they were given is not the one the grid ends up with.
+
+STATES = ('regular', 'visited', 'path')
+COLORS = np.concatenate([PALETTE[state] for state in STATES])
+FULL_REPAINT = 0.25
+MAX_RECTS = 256
+
+class GridRenderer():
+    def __init__(self, grid, screen, cell_width, cell_height=None, margin=0, origin=(0, 0), background=(0, 0, 0)):
+        self.screen = screen
+        self.width = cell_width
+        self.height = cell_height or cell_width
+        self.margin = margin
+        self.origin = origin
+        self.background = background
+        self.cells_drawn = 0
+        self.set_grid(grid)
+
+    def set_grid(self, grid):
+        # A new grid of the same shape is diffed against what is on show.
+        previous = getattr(self, 'grid', None)
+        self.grid = grid
+        self.compare_all = True
+        if previous is not None and previous.shape == grid.shape:
+            return
+        rows, columns = grid.shape
+        self.size = (columns * (self.width + self.margin) + self.margin, rows * (self.height + self.margin) + self.margin)
+        self.surface = pygame.Surface(self.size)
+        self.surface.fill(self.background)
+        self.shown = None
+        self.painted = set()
+
+    def cell_rect(self, row, column):
+        return pygame.Rect(self.margin + (self.margin + self.width) * column, self.margin + (self.margin + self.height) * row, self.width, self.height)
+
+    def screen_rect(self, row, column):
+        return self.cell_rect(row, column).move(self.origin)
+
+    def _state(self, rows=slice(None), columns=slice(None)):
+        grid = self.grid
+        state = np.where(grid.path[rows, columns], 2, grid.visited[rows, columns]).astype(np.uint8)
+        return state * len(NODETYPES) + grid.cells[rows, columns]
+
+    def paint(self, node, color=None):
+        # Draws one cell now, on the surface and the screen.
+        row, column = node
+        rect = self.cell_rect(row, column)
+        self.surface.fill(color or self.grid.color(node), rect)
+        self.screen.blit(self.surface, rect.move(self.origin), rect)
+        self.painted.add((int(row), int(column)))
+        return rect.move(self.origin)
+
+    def _repaint(self, state):
+        # Whole surface from the state array: each pixel row and column maps
+        # to a cell, or to the margin between cells.
+        def cell_index(pixels, cell, count):
+            offset = np.arange(pixels) - self.margin
+            inside = (offset >= 0) & (offset % (cell + self.margin) < cell)
+            return inside, np.minimum(offset // (cell + self.margin), count - 1)
+        rows, columns = state.shape
+        keep_y, cell_y = cell_index(self.size[1], self.height, rows)
+        keep_x, cell_x = cell_index(self.size[0], self.width, columns)
+        pixels = np.empty((self.size[1], self.size[0], 3), dtype=np.uint8)
+        pixels[:] = self.background
+        pixels[np.ix_(keep_y, keep_x)] = COLORS[state[cell_y[keep_y]][:, cell_x[keep_x]]]
+        pygame.surfarray.blit_array(self.surface, pixels.transpose(1, 0, 2))
+        self.cells_drawn += state.size
+
+    def present(self, update=True):
+        # Brings the surface and screen up to date with the grid and returns
+        # the screen rectangles that changed.
+        dirty = self.grid.take_dirty()
+        rects = []
+        if self.shown is None or self.shown.shape != self.grid.shape or dirty is None or self.compare_all:
+            state = self._state()
+            if self.shown is None or self.shown.shape != state.shape:
+                changed = None
+            else:
+                changed = state != self.shown
+                for node in self.painted:
+                    changed[node] = True
+            if changed is None or changed.sum() > FULL_REPAINT * state.size:
+                self._repaint(state)
+                rects = [pygame.Rect(0, 0, *self.size)]
+            else:
+                rects = self._fill(*np.nonzero(changed), state)
+            self.shown = state
+        else:
+            width = self.shown.shape[1]
+            painted = np.array([row * width + column for row, column in self.painted], dtype=np.intp)
+            cells = np.unique(np.concatenate([dirty[0] * width + dirty[1], painted]))
+            rows, columns = np.divmod(cells, width)
+            state = self._state(rows, columns)
+            changed = (state != self.shown[rows, columns]) | np.isin(cells, painted)
+            self.shown[rows, columns] = state
+            rows, columns = rows[changed], columns[changed]
+            if rows.size > FULL_REPAINT * self.shown.size:
+                self._repaint(self.shown)
+                rects = [pygame.Rect(0, 0, *self.size)]
+            else:
+                rects = self._fill(rows, columns, self.shown)
+        self.painted = set()
+        self.compare_all = False
+
+        rects = [rect.move(self.origin) for rect in rects]
+        for rect in rects:
+            self.screen.blit(self.surface, rect, rect.move(-self.origin[0], -self.origin[1]))
+        if update and rects:
+            pygame.display.update(rects)
+        return rects
+
+    def _fill(self, rows, columns, state):
+        rects = []
+        for row, column in zip(rows.tolist(), columns.tolist()):
+            rect = self.cell_rect(row, column)
+            self.surface.fill(tuple(int(channel) for channel in COLORS[state[row, column]]), rect)
+            rects.append(rect)
+        self.cells_drawn += len(rects)
+        if len(rects) > MAX_RECTS:
+            rects = [rects[0].unionall(rects)]
+        return rects
+
+    def redraw(self):
+        # Copies the whole surface to the screen, after the screen was cleared.
+        rect = pygame.Rect(self.origin, self.size)
+        self.screen.blit(self.surface, rect)
+        return rect
@@ -0,0 +1,48 @@
+import time
+from math import inf
+import engine
+import wavefront
+import jps
+import bidirectional
+import hpa
+import anytime
+import components
+import landmarks
+from metrics import Metrics
+
+# Every path query the GUI, the cache and the batch runner can make, keyed by
+# the name they use for it. Each entry takes (grid, start, goal, diagonals,
+# observer) and returns an engine.SearchResult.
+#
+# Entries in BUDGETED also take a time_limit in seconds and a max_expanded
+# count, which solve() passes on; they return the best path found within it.
+#
+# solve() asks the grid's component index first, so a query between two open
+# cells that no path joins is answered without a search; its stats have mode
+# 'components'.
+
+ALGORITHMS = {
+    'dijkstra': lambda grid, start, goal, diagonals, observer: engine.dijkstra(grid, start, goal, diagonals=diagonals, observer=observer),
+    'astar': lambda grid, start, goal, diagonals, observer: engine.dijkstra(grid, start, goal, diagonals=diagonals, astar=True, observer=observer),
+    'dfs': lambda grid, start, goal, diagonals, observer: engine.xfs(grid, start, goal, x='d', diagonals=diagonals, observer=observer),
+    'bfs': lambda grid, start, goal, diagonals, observer: wavefront.bfs(grid, start, goal, diagonals=diagonals, observer=observer),
+    'jps': lambda grid, start, goal, diagonals, observer: jps.search(grid, start, goal, diagonals=diagonals, observer=observer),
+    'bidijkstra': lambda grid, start, goal, diagonals, observer: bidirectional.search(grid, start, goal, diagonals=diagonals, observer=observer),
+    'biastar': lambda grid, start, goal, diagonals, observer: bidirectional.search(grid, start, goal, diagonals=diagonals, astar=True, observer=observer),
+    'hpa': lambda grid, start, goal, diagonals, observer: hpa.search(grid, start, goal, diagonals=diagonals, observer=observer),
+    'ara': lambda grid, start, goal, diagonals, observer, time_limit=None, max_expanded=None: anytime.search(grid, start, goal, diagonals=diagonals, time_limit=time_limit, max_expanded=max_expanded, observer=observer),
+    'alt': lambda grid, start, goal, diagonals, observer: engine.dijkstra(grid, start, goal, diagonals=diagonals, astar=True, heuristic=landmarks.heuristic(grid, goal, diagonals), observer=observer),
+}
+
+BUDGETED = {'ara'}
+
+def solve(grid, algorithm, start_point, goal_node, diagonals=False, observer=None, time_limit=None, max_expanded=None):
+    assert algorithm in ALGORITHMS, f"algorithm must be one of: {list(ALGORITHMS)}"
+    start = time.perf_counter()
+    if grid.is_passable(start_point) and not components.connected(grid, start_point, goal_node, diagonals):
+        stats = Metrics(mode='components')
+        stats.end_search(start)
+        return engine.SearchResult(False, [], inf, stats)
+    if algorithm in BUDGETED:
+        return ALGORITHMS[algorithm](grid, start_point, goal_node, diagonals, observer, time_limit=time_limit, max_expanded=max_expanded)
+    return ALGORITHMS[algorithm](grid, start_point, goal_node, diagonals, observer)
@@ -0,0 +1,89 @@
+import numpy as np
+from grid import Grid, CELL, WALL, PROTECTED
+
+# Terrain built a whole map at a time from fractal value noise. Each octave
+# is a lattice of random values, smoothly interpolated up to the grid: first
+# down the rows of the small lattice, then out along the columns, so the only
+# full size work is a few array operations per octave. Octaves get finer by
+# half and weaker by PERSISTENCE each time.
+#
+# The noise is cut into terrain classes by BANDS, which give each class the
+# share of cells it should cover, from the lowest noise to the highest. The
+# cuts are quantiles of the noise, so the shares hold whatever the seed or
+# scale. Each class moves at the cost Node.distance_modifiers gives it, and
+# the grid's cost array follows from the cells as always.
+
+BANDS = (('water', 0.10), ('sand', 0.08), ('blank', 0.42), ('mud', 0.15), ('forest', 0.25))
+SCALE = 32
+OCTAVES = 4
+PERSISTENCE = 0.5
+QUANTILE_SAMPLE = 2**18
+
+def _fade(t):
+    return t * t * (3 - 2 * t)
+
+def value_noise(shape, scale, rng):
+    # One octave: lattice points every scale cells, values in [0, 1).
+    # Everything stays float32, and the full size arrays are worked on in
+    # place.
+    rows, columns = shape
+    y = np.arange(rows, dtype=np.float32) / np.float32(scale)
+    x = np.arange(columns, dtype=np.float32) / np.float32(scale)
+    y0 = y.astype(np.int64)
+    x0 = x.astype(np.int64)
+    lattice = rng.random((y0[-1] + 2, x0[-1] + 2), dtype=np.float32)
+    ty = _fade(y - y0.astype(np.float32))[:, None]
+    tx = _fade(x - x0.astype(np.float32))
+    down = lattice[y0] + (lattice[y0 + 1] - lattice[y0]) * ty
+    left = np.take(down, x0, axis=1)
+    right = np.take(down, x0 + 1, axis=1)
+    right -= left
+    right *= tx
+    left += right
+    return left
+
+def fractal_noise(shape, seed=None, scale=SCALE, octaves=OCTAVES, persistence=PERSISTENCE):
+    rng = np.random.default_rng(seed)
+    total = np.zeros(shape, dtype=np.float32)
+    amplitude = 1.0
+    for octave in range(octaves):
+        layer = value_noise(shape, max(scale / 2**octave, 1), rng)
+        layer *= np.float32(amplitude)
+        total += layer
+        amplitude *= persistence
+    return total
+
+def terrain_cells(shape, seed=None, bands=BANDS, scale=SCALE, octaves=OCTAVES, persistence=PERSISTENCE):
+    # A uint8 cell array of the given shape, ready for Grid.from_cells.
+    names = [name for name, share in bands]
+    assert all(name in CELL for name in names), f"terrain classes must be among: {list(CELL)}"
+    shares = np.array([share for name, share in bands], dtype=np.float64)
+    assert shares.min() >= 0 and shares.sum() > 0, "band shares must be non-negative and not all zero"
+    noise = fractal_noise(shape, seed, scale, octaves, persistence)
+    # Cuts from an even sample of at most QUANTILE_SAMPLE cells, then each
+    # cell's band is the number of cuts below it.
+    sample = noise.ravel()[::max(noise.size // QUANTILE_SAMPLE, 1)]
+    cuts = np.quantile(sample, np.cumsum(shares)[:-1] / shares.sum()).astype(np.float32)
+    band = np.zeros(shape, dtype=np.uint8)
+    for cut in cuts:
+        band += noise > cut
+    codes = np.array([CELL[name] for name in names], dtype=np.uint8)
+    return codes[band]
+
+def noise_terrain(grid, observer=None, seed=None, bands=BANDS, scale=SCALE, octaves=OCTAVES, persistence=PERSISTENCE):
+    # Lays terrain over every open cell of grid. Walls, the start and the end
+    # are left as they are.
+    cells = grid.cells
+    terrain = terrain_cells(grid.shape, seed, bands, scale, octaves, persistence)
+    keep = np.isin(cells, PROTECTED + (WALL,))
+    changed = ~keep & (cells != terrain)
+    cells[changed] = terrain[changed]
+    grid.refresh()
+    if observer:
+        for node in zip(*(axis.tolist() for axis in np.nonzero(changed))):
+            observer('terrain', node)
+    return grid
+
+def terrain_map(rows, columns=None, seed=None, **options):
+    # A fresh terrain Grid, for large maps and benchmarks.
+    return Grid.from_cells(terrain_cells((rows, columns or rows), seed, **options))
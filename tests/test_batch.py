@@ -0,0 +1,43 @@
+import json
+import batch
+
+# A wall down the middle leaves the two halves unreachable from each other.
+ROWS = [
+    '....#....',
+    '....#....',
+    '....#....',
+]
+
+def write_map(tmp_path):
+    path = tmp_path / 'split.txt'
+    path.write_text('\n'.join(ROWS) + '\n')
+    return str(path)
+
+def test_anytime_summary_with_unreachable_query(tmp_path):
+    scenarios = tmp_path / 'split.queries'
+    scenarios.write_text('0 0 2 3 5\n0 0 2 8\n')
+    summary, = batch.main([write_map(tmp_path), '-s', str(scenarios), '-a', 'ara', '--json'])
+    assert summary['unreachable'] == 1
+    assert summary['skipped'] == 1
+    assert summary['correct'] == 1
+    assert summary['anytime']['out_of_budget'] == 0
+    assert summary['anytime']['worst_bound'] == 1.0
+
+def test_movingai_lengths_are_skipped(tmp_path):
+    path = tmp_path / 'open.map'
+    path.write_text('type octile\nheight 3\nwidth 3\nmap\n...\n...\n...\n')
+    scenarios = tmp_path / 'open.map.scen'
+    scenarios.write_text('version 1\n0 open.map 3 3 0 0 2 2 2.82842712\n')
+    summary, = batch.main([str(path), '-s', str(scenarios), '--json'])
+    assert not summary['checked']
+    assert summary['unchecked'] == 1
+    assert summary['wrong'] == 0
+
+def test_metrics_log_compares_each_query(tmp_path):
+    scenarios = tmp_path / 'split.queries'
+    scenarios.write_text('0 0 2 3 5\n0 0 0 3 4\n')
+    log = tmp_path / 'metrics.jsonl'
+    batch.main([write_map(tmp_path), '-s', str(scenarios), '-m', str(log), '--json'])
+    lines = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [line['optimal'] for line in lines] == [5, 4]
+    assert [line['correct'] for line in lines] == [True, False]
@@ -0,0 +1,16 @@
+import random
+import numpy as np
+from grid import Grid, NODETYPES
+
+def test_set_keeps_flat_lists_in_step():
+    rng = random.Random(3)
+    grid = Grid(12, 9)
+    width, cost = grid.flat_costs()
+    passable = grid.flat_passable()
+    for edit in range(200):
+        grid.set((rng.randrange(grid.rows), rng.randrange(grid.columns)), rng.choice(NODETYPES))
+    padded = np.pad(grid.cost, 1, constant_values=np.inf)
+    assert grid.flat_costs() == (width, padded.ravel().tolist())
+    assert grid.flat_costs()[1] is cost
+    assert grid.flat_passable() is passable
+    assert passable == (padded != np.inf).ravel().tolist()
@@ -0,0 +1,38 @@
+import random
+import pytest
+import engine
+import heuristics
+import terrain
+
+CASES = [(name, diagonals) for name in heuristics.HEURISTICS for diagonals in (False, True) if heuristics.admissible(name, diagonals)]
+
+@pytest.fixture(scope='module')
+def grid():
+    return terrain.terrain_map(40, seed=7)
+
+@pytest.mark.parametrize('name, diagonals', CASES)
+def test_tables_never_overestimate(grid, name, diagonals):
+    goal = (31, 17)
+    estimates = heuristics.table(grid, goal, name, diagonals)
+    estimate = heuristics.estimator(grid, name, diagonals)
+    remaining = heuristics.toward(grid, goal, name, diagonals)
+    distances = engine.sweep(grid, goal, diagonals, reverse=True)[0]
+    for node_id, distance in distances.items():
+        assert estimates[node_id] == pytest.approx(estimate(node_id, grid.node_id(goal)))
+        assert remaining(node_id) == pytest.approx(estimates[node_id])
+        assert estimates[node_id] <= distance + 1e-9
+
+@pytest.mark.parametrize('name, diagonals', CASES)
+def test_astar_matches_dijkstra(grid, name, diagonals):
+    rng = random.Random(name)
+    cells = [(row, column) for row in range(grid.rows) for column in range(grid.columns) if grid.is_passable((row, column))]
+    for query in range(10):
+        start, goal = rng.choice(cells), rng.choice(cells)
+        expected = engine.dijkstra(grid, start, goal, diagonals=diagonals).distance
+        assert engine.dijkstra(grid, start, goal, diagonals=diagonals, heuristic=name).distance == pytest.approx(expected)
+        estimates = heuristics.table(grid, goal, name, diagonals)
+        assert engine.dijkstra(grid, start, goal, diagonals=diagonals, heuristic=estimates).distance == pytest.approx(expected)
+
+def test_manhattan_is_refused_with_diagonals(grid):
+    with pytest.raises(AssertionError):
+        heuristics.table(grid, (0, 0), 'manhattan', diagonals=True)
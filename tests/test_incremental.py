@@ -0,0 +1,60 @@
+import random
+from math import inf
+import pytest
+import engine
+import incremental
+from grid import Grid
+
+EDITS = ('wall', 'mud', 'blank')
+
+def reference(grid, start_point, goal_node, diagonals):
+    distances = engine.sweep(grid, start_point, diagonals)[0]
+    return distances.get(grid.node_id(goal_node), inf)
+
+def path_cost(grid, path, diagonals):
+    total = 0
+    for a, b in zip(path, path[1:]):
+        assert max(abs(a[0] - b[0]), abs(a[1] - b[1])) == 1
+        assert diagonals or a[0] == b[0] or a[1] == b[1]
+        length = engine.DIAGONAL if a[0] != b[0] and a[1] != b[1] else 1
+        total += length * float(grid.cost[b])
+    return total
+
+@pytest.mark.parametrize('diagonals', [False, True])
+@pytest.mark.parametrize('seed', range(4))
+def test_plan_matches_sweep_after_edits_and_moves(diagonals, seed):
+    rng = random.Random(seed)
+    size = 24
+    grid = Grid(size)
+    for edit in range(size * size // 3):
+        grid.set((rng.randrange(size), rng.randrange(size)), rng.choice(EDITS))
+    planner = incremental.Planner(grid, diagonals=diagonals)
+    start_point, goal_node = (0, 0), (size - 1, size - 1)
+    for step in range(60):
+        action = rng.random()
+        if action < 0.4:
+            node = (rng.randrange(size), rng.randrange(size))
+            if node not in (start_point, goal_node):
+                grid.set(node, rng.choice(EDITS))
+        elif action < 0.7:
+            start_point = (rng.randrange(size), rng.randrange(size))
+        else:
+            goal_node = (rng.randrange(size), rng.randrange(size))
+        if not grid.is_passable(start_point) or not grid.is_passable(goal_node):
+            continue
+        result = planner.plan(start_point, goal_node)
+        expected = reference(grid, start_point, goal_node, diagonals)
+        assert result.distance == pytest.approx(expected)
+        if result.found:
+            assert result.path[0] == start_point and result.path[-1] == goal_node
+            assert path_cost(grid, result.path, diagonals) == pytest.approx(expected)
+
+def test_dragging_the_root_reroots_once():
+    grid = Grid(60)
+    planner = incremental.Planner(grid)
+    planner.plan((0, 0), (59, 59))
+    full = planner.plan((0, 0), (58, 59)).stats['expanded']
+    assert planner.root == planner.grid.node_id((0, 0))
+    moved = planner.plan((0, 0), (57, 59)).stats['expanded']
+    assert moved < full / 10
+    assert planner.plan((0, 0), (57, 59)).distance == reference(grid, (0, 0), (57, 59), False)
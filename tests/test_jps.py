@@ -0,0 +1,19 @@
+import random
+import numpy as np
+import pytest
+import engine
+import jps
+from grid import Grid
+
+@pytest.mark.parametrize('diagonals', [False, True])
+def test_jps_matches_dijkstra_with_numpy_endpoints(diagonals):
+    rng = random.Random(diagonals)
+    grid = Grid(30, 30)
+    for wall in range(200):
+        grid.set((rng.randrange(30), rng.randrange(30)), 'wall')
+    cells = np.argwhere(grid.cost != np.inf)
+    for query in range(20):
+        start = tuple(cells[rng.randrange(len(cells))])
+        goal = tuple(cells[rng.randrange(len(cells))])
+        expected = engine.dijkstra(grid, start, goal, diagonals=diagonals).distance
+        assert jps.search(grid, start, goal, diagonals=diagonals).distance == pytest.approx(expected)
@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+import maps
+from grid import Grid, CELL
+
+def test_binary_map_round_trip(tmp_path):
+    grid = Grid(5, 7)
+    grid.set((1, 2), 'wall')
+    grid.set((3, 4), 'mud')
+    path = str(tmp_path / 'small.grid')
+    maps.save(grid, path)
+    assert np.array_equal(maps.load(path).cells, grid.cells)
+
+def test_binary_map_with_other_costs_is_refused(tmp_path):
+    path = tmp_path / 'small.grid'
+    maps.save(Grid(5, 7), str(path))
+    data = bytearray(path.read_bytes())
+    at = maps.HEADER.size + 4 * CELL['mud']
+    data[at:at + 4] = np.array([2.5], dtype='<f4').tobytes()
+    path.write_bytes(bytes(data))
+    with pytest.raises(AssertionError, match='costs'):
+        maps.load(str(path))
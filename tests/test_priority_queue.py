@@ -0,0 +1,16 @@
+import random
+import pytest
+from priority_queue import IndexedHeap
+
+@pytest.mark.parametrize('capacity', [1000, None])
+def test_indexed_heap_pops_lowest_key_per_node(capacity):
+    rng = random.Random(5)
+    queue = IndexedHeap(capacity)
+    best = {}
+    for push in range(2000):
+        node, priority = rng.randrange(1000), rng.random()
+        queue.push(priority, node)
+        best[node] = min(priority, best.get(node, priority))
+    popped = [queue.pop() for item in range(len(queue))]
+    assert popped == sorted((priority, node) for node, priority in best.items())
+    assert all(node not in queue for node in best)
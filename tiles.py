@@ -0,0 +1,257 @@
+import heapq
+import os
+import resource
+import time
+from collections import OrderedDict
+from math import inf
+import numpy as np
+import maps
+import heuristics
+from heuristics import DIAGONAL
+from engine import SearchResult, trace_back
+from grid import COSTS, WALL
+from metrics import Metrics
+from priority_queue import TiedBucketQueue
+
+# Out-of-core grids. A TiledGrid reads a binary map in square tiles of
+# TILE_SIZE cells, read from the file the first time they are needed and kept
+# in a least recently used cache of at most MAX_TILES. Each tile is held as
+# the bytes of its cell codes, row by row, and edge tiles are filled out with
+# walls, as is every tile key outside the map, so a search never needs a
+# bounds check.
+#
+# search() keeps all of its state in dicts and sets keyed by row * columns +
+# column, so a query costs memory for the cells it reaches and the tiles its
+# frontier crosses, not for the size of the map.
+
+TILE_SIZE = 256
+MAX_TILES = 256
+STRAIGHT_MOVES = ((1, 0, 1), (-1, 0, 1), (0, 1, 1), (0, -1, 1))
+DIAGONAL_MOVES = ((1, 1, DIAGONAL), (1, -1, DIAGONAL), (-1, 1, DIAGONAL), (-1, -1, DIAGONAL))
+COST = COSTS.tolist()
+# A tiled map is never scanned as a whole, so the heuristic is scaled by the
+# smallest cost any cell type can have.
+MIN_COST = min(COST)
+
+class TileCache():
+    def __init__(self, path, tile_size=TILE_SIZE, max_tiles=MAX_TILES):
+        assert tile_size > 1 and tile_size & (tile_size - 1) == 0, "tile_size must be a power of two"
+        header = maps.read_header(path)
+        self.rows, self.columns = header['shape']
+        self.offset = header['offset']
+        self.lookup = maps.map_cells(path)[1]
+        self.file = open(path, 'rb')
+        self.size = tile_size
+        self.shift = tile_size.bit_length() - 1
+        self.max_tiles = max_tiles
+        self.down = -(-self.rows // tile_size)
+        self.across = -(-self.columns // tile_size)
+        self.tiles = OrderedDict()
+        self.outside = bytes([WALL]) * tile_size * tile_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.peak_tiles = 0
+
+    def tile(self, tile_row, tile_column):
+        if not (0 <= tile_row < self.down and 0 <= tile_column < self.across):
+            return self.outside
+        key = (tile_row, tile_column)
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.hits += 1
+            self.tiles.move_to_end(key)
+            return tile
+        self.misses += 1
+        tile = self._load(tile_row, tile_column)
+        self.tiles[key] = tile
+        if len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+            self.evictions += 1
+        self.peak_tiles = max(self.peak_tiles, len(self.tiles))
+        return tile
+
+    def _load(self, tile_row, tile_column):
+        # Tile rows are read with pread rather than through a memory map, so
+        # the process only ever holds the tiles in the cache; the file's pages
+        # stay in the shared page cache.
+        size = self.size
+        top, left = tile_row * size, tile_column * size
+        height, width = min(size, self.rows - top), min(size, self.columns - left)
+        descriptor = self.file.fileno()
+        start = self.offset + top * self.columns + left
+        data = b''.join(os.pread(descriptor, width, start + row * self.columns) for row in range(height))
+        block = np.frombuffer(data, dtype=np.uint8).reshape(height, width)
+        if self.lookup is not None:
+            block = self.lookup[block]
+        if block.shape != (size, size):
+            full = np.full((size, size), WALL, dtype=np.uint8)
+            full[:height, :width] = block
+            block = full
+        return block.tobytes()
+
+    def close(self):
+        self.tiles.clear()
+        self.file.close()
+
+    def stats(self):
+        accesses = self.hits + self.misses
+        return {
+            'tile_hits': self.hits,
+            'tile_misses': self.misses,
+            'tile_hit_rate': self.hits / accesses if accesses else 0.0,
+            'tile_evictions': self.evictions,
+            'tiles_resident': len(self.tiles),
+            'tile_bytes': len(self.tiles) * self.size * self.size,
+            'peak_tile_bytes': self.peak_tiles * self.size * self.size,
+        }
+
+class TiledGrid():
+    # Read-only grid over a binary map. Only the search in this module and
+    # the few methods below work on it; everything else wants a Grid.
+    def __init__(self, path, tile_size=TILE_SIZE, max_tiles=MAX_TILES):
+        self.path = path
+        self.header = maps.read_header(path)
+        self.cache = TileCache(path, tile_size, max_tiles)
+
+    @property
+    def shape(self):
+        return self.header['shape']
+
+    @property
+    def rows(self):
+        return self.shape[0]
+
+    @property
+    def columns(self):
+        return self.shape[1]
+
+    def in_bounds(self, node):
+        return 0 <= node[0] < self.rows and 0 <= node[1] < self.columns
+
+    def code(self, node):
+        cache = self.cache
+        row, column = node
+        tile = cache.tile(row >> cache.shift, column >> cache.shift)
+        return tile[((row & (cache.size - 1)) << cache.shift) + (column & (cache.size - 1))]
+
+    def cost_at(self, node):
+        return COST[self.code(node)]
+
+    def is_passable(self, node):
+        return self.cost_at(node) != inf
+
+    def find(self, nodetype):
+        return self.header.get(nodetype)
+
+def peak_rss():
+    # Peak resident set size of this process in bytes (Linux reports KiB).
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def search(grid, start_point, goal_node, diagonals=False, astar=True, observer=None):
+    # Dijkstra, or A* with the Manhattan distance (octile with diagonals),
+    # over a TiledGrid. Integer costs on 4-connected moves use a bucket queue,
+    # anything else a binary heap; both take a second push to lower a key.
+    start = time.perf_counter()
+    cache = grid.cache
+    size, shift, mask = cache.size, cache.shift, cache.size - 1
+    columns = grid.columns
+    hits, misses, evictions = cache.hits, cache.misses, cache.evictions
+    assert grid.in_bounds(start_point) and grid.in_bounds(goal_node), "start and goal must be on the map"
+
+    steps = [(row_step, column_step, length, row_step * size + column_step, row_step * columns + column_step)
+             for row_step, column_step, length in (STRAIGHT_MOVES + DIAGONAL_MOVES if diagonals else STRAIGHT_MOVES)]
+    goal_row, goal_column = goal_node
+    steps_apart = heuristics.STEPS[heuristics.default(diagonals)]
+    def heuristic(row, column):
+        if not astar:
+            return 0
+        return MIN_COST * steps_apart(abs(goal_row - row), abs(goal_column - column))
+
+    source = start_point[0] * columns + start_point[1]
+    target = goal_row * columns + goal_column
+    buckets = not diagonals and all(cost == int(cost) for cost in COST if cost != inf)
+    # Among equal f the node with the larger g comes out first, as in
+    # engine.dijkstra.
+    if buckets:
+        cursor = int(heuristic(*start_point))
+        queue = TiedBucketQueue(int(max(cost for cost in COST if cost != inf) + MIN_COST) + 1, cursor=cursor)
+        push, pop = queue.push, queue.pop
+        push(cursor, source)
+    else:
+        heap = [(heuristic(*start_point), 0, source)]
+        push = lambda priority, node, tie: heapq.heappush(heap, (priority, tie, node))
+        pop = lambda: heapq.heappop(heap)[::2]
+        queue = heap
+
+    distances = {source: 0}
+    parents = {}
+    closed = set()
+    generated = pushes = stale_pops = 0
+    peak_open = 1
+
+    while queue:
+        priority, node = pop()
+        if node in closed:
+            stale_pops += 1
+            continue
+        closed.add(node)
+        if node == target:
+            break
+        row, column = divmod(node, columns)
+        if observer and node != source:
+            observer('visit', (row, column))
+
+        # Neighbours inside the current tile are read from it directly; only
+        # cells on a tile edge go back through the cache.
+        tile = cache.tile(row >> shift, column >> shift)
+        local_row, local_column = row & mask, column & mask
+        inside = 0 < local_row < mask and 0 < local_column < mask
+        local = (local_row << shift) + local_column
+        current_distance = distances[node]
+        for row_step, column_step, length, tile_step, step in steps:
+            if inside:
+                code = tile[local + tile_step]
+            else:
+                next_row, next_column = row + row_step, column + column_step
+                code = cache.tile(next_row >> shift, next_column >> shift)[((next_row & mask) << shift) + (next_column & mask)]
+            modifier = COST[code]
+            neighbour = node + step
+            if modifier == inf or neighbour in closed:
+                continue
+            generated += 1
+            distance = current_distance + length * modifier
+            if distance < distances.get(neighbour, inf):
+                pushes += 1
+                distances[neighbour] = distance
+                parents[neighbour] = node
+                estimate = distance + heuristic(row + row_step, column + column_step)
+                push(int(estimate) if buckets else round(estimate, 9), neighbour, -distance)
+        if len(queue) > peak_open:
+            peak_open = len(queue)
+
+    stats = Metrics(expanded=len(closed), generated=generated, pushes=pushes + 1, stale_pops=stale_pops, peak_open=peak_open,
+                    queue='bucket' if buckets else 'heap', state_entries=len(distances) + len(closed) + len(parents))
+    # Hits, misses and evictions are this query's; the rest is the cache as
+    # the query left it.
+    stats.update(cache.stats(), tile_hits=cache.hits - hits, tile_misses=cache.misses - misses, tile_evictions=cache.evictions - evictions, peak_rss=peak_rss())
+    accesses = stats['tile_hits'] + stats['tile_misses']
+    stats['tile_hit_rate'] = stats['tile_hits'] / accesses if accesses else 0.0
+    finished = stats.end_search(start)
+    if target not in closed:
+        return SearchResult(False, [], inf, stats)
+    path = [divmod(node, columns) for node in trace_back(target, source, parents)]
+    stats.end_path(finished)
+    if observer:
+        for node in path:
+            observer('path', node)
+    return SearchResult(True, path, distances[target], stats)
+
+ALGORITHMS = {
+    'dijkstra': lambda grid, start, goal, diagonals, observer: search(grid, start, goal, diagonals=diagonals, astar=False, observer=observer),
+    'astar': lambda grid, start, goal, diagonals, observer: search(grid, start, goal, diagonals=diagonals, observer=observer),
+}
+
+def solve(grid, algorithm, start_point, goal_node, diagonals=False, observer=None):
+    assert algorithm in ALGORITHMS, f"tiled grids support: {list(ALGORITHMS)}"
+    return ALGORITHMS[algorithm](grid, start_point, goal_node, diagonals, observer)
@@ -0,0 +1,88 @@
+import time
+from math import inf
+import numpy as np
+from engine import SearchResult
+from metrics import Metrics
+
+# Breadth first search done a whole layer at a time. The open cells are a
+# boolean mask over the padded, row-major grid, so moving the frontier one step
+# in every direction is a shift of its flat ids by the row width or by one.
+# Each layer is grown, masked against the open cells and deduplicated with a
+# handful of array operations, with no per-cell Python work.
+
+STRAIGHT_MOVES = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIAGONAL_MOVES = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+def _shifts(width, diagonals=False):
+    steps = STRAIGHT_MOVES + DIAGONAL_MOVES if diagonals else STRAIGHT_MOVES
+    return np.array([row * width + column for row, column in steps], dtype=np.int64)
+
+def hop_field(grid, source, diagonals=False, goal=None, on_layer=None, stats=None):
+    rows, columns = grid.shape
+    width = columns + 2
+    open_cells = np.pad(grid.cost != np.inf, 1, constant_values=False).ravel()
+    distances = np.full(open_cells.size, -1, dtype=np.int32)
+    stamp = np.zeros(open_cells.size, dtype=np.int64)
+    shifts = _shifts(width, diagonals)
+
+    source_id = grid.node_id(source)
+    goal_id = grid.node_id(goal) if goal is not None else None
+    open_cells[source_id] = False
+    distances[source_id] = 0
+    frontier = np.array([source_id], dtype=np.int64)
+
+    layer = 0
+    while frontier.size and (goal_id is None or distances[goal_id] < 0):
+        layer += 1
+        grown = (frontier[:, None] + shifts).ravel()
+        grown = grown[open_cells[grown]]
+        order = np.arange(grown.size)
+        stamp[grown] = order
+        frontier = grown[stamp[grown] == order]
+        open_cells[frontier] = False
+        distances[frontier] = layer
+        if stats is not None:
+            stats['generated'] += int(grown.size)
+            stats['pushes'] += int(frontier.size)
+            stats['peak_open'] = max(stats['peak_open'], int(frontier.size))
+        if on_layer and frontier.size:
+            on_layer(layer, np.stack(np.divmod(frontier, width), axis=1) - 1)
+
+    return distances.reshape(rows + 2, width)[1:-1, 1:-1]
+
+def walk_down(distances, goal, diagonals=False):
+    steps = STRAIGHT_MOVES + DIAGONAL_MOVES if diagonals else STRAIGHT_MOVES
+    rows, columns = distances.shape
+    path = [goal]
+    node = goal
+    while distances[node] > 0:
+        wanted = distances[node] - 1
+        for row_step, column_step in steps:
+            neighbour = (node[0] + row_step, node[1] + column_step)
+            if 0 <= neighbour[0] < rows and 0 <= neighbour[1] < columns and distances[neighbour] == wanted:
+                node = neighbour
+                break
+        path.append(node)
+    path.reverse()
+    return path
+
+def bfs(grid, start_point, goal_node, diagonals=False, observer=None):
+    start = time.perf_counter()
+    on_layer = None
+    if observer:
+        on_layer = lambda layer, nodes: observer('layer', nodes)
+
+    stats = Metrics(pushes=1, peak_open=1)
+    distances = hop_field(grid, start_point, diagonals=diagonals, goal=goal_node, on_layer=on_layer, stats=stats)
+
+    stats.update(expanded=int(np.count_nonzero(distances >= 0)), layers=int(distances.max()))
+    finished = stats.end_search(start)
+    if distances[goal_node] < 0:
+        return SearchResult(False, [], inf, stats)
+
+    path = walk_down(distances, goal_node, diagonals)
+    stats.end_path(finished)
+    if observer:
+        for node in path:
+            observer('path', node)
+    return SearchResult(True, path, int(distances[goal_node]), stats)
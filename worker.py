@@ -0,0 +1,85 @@
+import queue
+import threading
+import time
+import playback
+
+# Background runs for the GUI. A Job calls a solver or generator on a daemon
+# thread with an observer that records its events into a playback.Trace, and
+# posts what it has to report to a queue, which the main loop empties once a
+# frame. The window keeps drawing and taking input however long the run is.
+#
+# Cancelling is cooperative: the observer checks a flag on every event and
+# raises Cancelled out of the run, so a cancelled job stops at its next event.
+# A run should only write to grids the main thread does not draw from, so
+# that stopping it part way leaves nothing to clean up.
+#
+# A thread rather than a process keeps the grid shared instead of pickled both
+# ways. The GUI sets the interpreter's switch interval to SWITCH_INTERVAL so
+# that a busy run hands the GIL back quickly enough for the main loop to hold
+# 60 frames a second; at the default 5ms, frames stretch by about that much.
+
+PROGRESS_EVERY = 2048
+SWITCH_INTERVAL = 0.001
+
+class Cancelled(Exception):
+    pass
+
+class Job():
+    def __init__(self, function, *args, label='', **kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.label = label or function.__name__
+        self.trace = playback.Trace()
+        self.events = 0
+        self.reported = 0
+        self.messages = queue.Queue()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f"job {self.label}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    @property
+    def running(self):
+        return self.thread.is_alive()
+
+    def _observe(self, event, node):
+        if self.cancelled.is_set():
+            raise Cancelled()
+        self.trace(event, node)
+        self.events += len(node) if event == 'layer' else 1
+        if self.events - self.reported >= PROGRESS_EVERY:
+            self.reported = self.events
+            self.messages.put(('progress', self.events))
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            value = self.function(*self.args, observer=self._observe, **self.kwargs)
+        except Cancelled:
+            self.messages.put(('cancelled', self.events))
+            return
+        except Exception as error:
+            self.messages.put(('failed', error))
+            return
+        self.messages.put(('done', (value, self.trace, time.perf_counter() - start)))
+
+    def cancel(self, wait=True):
+        # With wait, returns once the run has stopped, so the caller may
+        # change whatever it was reading.
+        self.cancelled.set()
+        if wait and self.running and threading.current_thread() is not self.thread:
+            self.thread.join()
+
+    def poll(self):
+        # Messages posted since the last poll, without blocking: any number of
+        # ('progress', events), then one of ('done', (value, trace, seconds)),
+        # ('cancelled', events) or ('failed', exception).
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages